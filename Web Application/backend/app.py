@@ -1,33 +1,429 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
-import openai
 from dotenv import load_dotenv
 import os
+import sys
+import asyncio
+import atexit
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+# Helpers import each other as top-level modules (as in the notebooks), so put the
+# utils directories on the path before importing them.
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BACKEND_DIR, "utils"))
+sys.path.append(os.path.join(BACKEND_DIR, "utils", "agents"))
+
 from utils.outline_generation import generate_sitcom_pitch, generate_pilot_episode_outline
 from utils.script_review import validate_episode_outline
-from utils.screen_writing import generate_scene_1_script, generate_scene
-from utils.text_utils import extract_scene, extract_title
-from utils.vector_db_utils import summarize_scene, add_scene_to_vector_db
-from sentence_transformers import SentenceTransformer
-import faiss
+from utils.screen_writing import generate_scene_1_script, generate_scene, stream_scene_1_script, stream_scene
+from utils.text_utils import extract_scene, extract_title, get_scene_numbers
+from utils.vector_db_utils import (
+    summarize_scene, analyze_scene, asummarize_scene, aanalyze_scene, add_scene_to_vector_db,
+    remove_scene_from_vector_db, load_embedding_backend
+)
+from utils.project_registry import ProjectRegistry, PROJECT_ID_PATTERN
+from utils.vector_index import DEFAULT_TRAIN_THRESHOLD
+from utils.embedding_cache import EmbeddingCache, CachedEmbeddingModel
+from utils.embedding_loader import LazyEmbeddingModel
+from utils.episode_jobs import EpisodeJobManager, JOB_ID_PATTERN
+from utils.openai_clients import OpenAIClientPool
 from utils.agents.character_agent import CharacterAgent
 from utils.agents.comedy_agent import ComedicAgent
 from utils.agents.environment_agent import EnvironmentAgent
 from utils.agents.scene_planner_agent import ScenePlannerAgent
+# The helpers import the gateway as a top-level module, so configure that instance
+import llm_gateway
 
 app = Flask(__name__)
 CORS(app)
 load_dotenv()
 
-# Initialize embedding model and FAISS index once (global)
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-dimension = embedding_model.get_sentence_embedding_dimension()
-index = faiss.IndexFlatL2(dimension)
-scene_metadata = []  # In-memory metadata list
+# The embedding model is loaded on first use (or by the warm-up thread below) so the server
+# starts immediately; identical summaries are served from the on-disk embedding cache
+EMBEDDING_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", os.path.join(BACKEND_DIR, "embedding_cache"))
+# "sentence-transformers" (PyTorch), "onnx" or "onnx-int8" (ONNX Runtime, lighter and faster on CPU)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+
+def load_embedding_model():
+    backend_kwargs = {"cache_dir": EMBEDDING_CACHE_DIR} if EMBEDDING_BACKEND == "onnx-int8" else {}
+    backend = load_embedding_backend(EMBEDDING_BACKEND, EMBEDDING_MODEL_NAME, **backend_kwargs)
+    dimension = backend.get_sentence_embedding_dimension()
+    # Cached vectors are keyed by backend variant, since quantized embeddings differ slightly
+    return CachedEmbeddingModel(
+        backend,
+        EmbeddingCache(EMBEDDING_CACHE_DIR, backend.name, dimension)
+    )
+
+embedding_model = LazyEmbeddingModel(load_embedding_model)
+
+# Start loading the model in the background right away (set to "0" to load it on the first request)
+if os.getenv("EMBEDDING_WARMUP", "1") != "0":
+    embedding_model.warm_up()
+
+# Each project gets its own FAISS index, scene metadata and character profiles, loaded
+# lazily and evicted to disk (PROJECT_STORE_DIR) when idle or over the in-memory limit.
+# VECTOR_INDEX_TYPE selects "flat" (exact), "hnsw" or "ivfpq" (trained once
+# VECTOR_INDEX_TRAIN_THRESHOLD scenes exist) for season- and corpus-scale projects.
+PROJECT_STORE_DIR = os.getenv("PROJECT_STORE_DIR", os.path.join(BACKEND_DIR, "project_data"))
+projects = ProjectRegistry(
+    PROJECT_STORE_DIR,
+    embedding_model.get_sentence_embedding_dimension,
+    max_projects=int(os.getenv("MAX_LOADED_PROJECTS", "16")),
+    idle_timeout=float(os.getenv("PROJECT_IDLE_TIMEOUT", "1800")),
+    index_type=os.getenv("VECTOR_INDEX_TYPE", "flat"),
+    train_threshold=int(os.getenv("VECTOR_INDEX_TRAIN_THRESHOLD", str(DEFAULT_TRAIN_THRESHOLD)))
+)
+atexit.register(projects.close)
+DEFAULT_PROJECT_ID = "default"
+
+# Per API key and model quotas for the shared LLM rate limiter; unset, they are learned from
+# the x-ratelimit-* response headers. LLM_MAX_CONCURRENCY caps in-flight LLM requests per process.
+llm_gateway.configure_gateway(
+    max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "0")) or None,
+    requests_per_minute=int(os.getenv("LLM_REQUESTS_PER_MINUTE", "0")) or None,
+    tokens_per_minute=int(os.getenv("LLM_TOKENS_PER_MINUTE", "0")) or None
+)
+
+# One keep-alive OpenAI client per API key (up to OPENAI_CLIENT_POOL_SIZE keys), shared by every
+# route and episode job, so requests reuse open connections instead of repeating TLS handshakes
+openai_clients = OpenAIClientPool(
+    max_size=int(os.getenv("OPENAI_CLIENT_POOL_SIZE", "32")),
+    max_connections=int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+)
+atexit.register(openai_clients.close)
+
+# Run the Character, Comedic and Environment agents in parallel (set to "0" to run them one after another)
+WRITERS_ROOM_CONCURRENT = os.getenv("WRITERS_ROOM_CONCURRENT", "1") != "0"
+
+# Set to "1" to analyze each scene (summary, characters, location, props, jokes, tone) in one
+# structured call, which the agents reuse instead of extracting characters and environment separately
+FUSED_SCENE_ANALYSIS = os.getenv("FUSED_SCENE_ANALYSIS", "0") == "1"
+
+# Set to "1" to run the Character agent as a single structured call over the stored profiles
+CHARACTER_AGENT_FUSED = os.getenv("CHARACTER_AGENT_FUSED", "0") == "1"
+
+# The agents search the project's index for the prior scenes most relevant to the planned scene
+# (set to "0" to give them the most recent scenes instead)
+SEMANTIC_RETRIEVAL = os.getenv("SEMANTIC_RETRIEVAL", "1") != "0"
+
+def writers_room_agents(client, project, num_scenes, scene_analysis=None):
+    """Creates the Character, Comedic and Environment agents over a project's scene history."""
+    retrieval = {'embedding_model': embedding_model, 'index': project.index} if SEMANTIC_RETRIEVAL else {}
+    return {
+        'character': CharacterAgent(
+            client=client,
+            vector_metadata=project.metadata,
+            num_scenes=num_scenes,
+            profile_store=project.profile_store,
+            scene_analysis=scene_analysis,
+            fused=CHARACTER_AGENT_FUSED,
+            **retrieval
+        ),
+        'comedic': ComedicAgent(client=client, vector_metadata=project.metadata, num_scenes=num_scenes, **retrieval),
+        'environment': EnvironmentAgent(
+            client=client,
+            vector_metadata=project.metadata,
+            num_scenes=num_scenes,
+            scene_analysis=scene_analysis,
+            **retrieval
+        )
+    }
+
+def run_writers_room(client, project, scene_desc, scene_number, num_scenes, concurrent=WRITERS_ROOM_CONCURRENT,
+                     fused_analysis=FUSED_SCENE_ANALYSIS, sitcom_title=""):
+    """
+    Runs the Character, Comedic and Environment agents on a scene and merges their results.
+
+    The three ReAct cycles only read the project's scene metadata, so in concurrent mode they run
+    on separate threads and the total latency is that of the slowest agent. In fused mode the
+    scene description is analyzed once up front, and the Character and Environment agents use
+    that analysis instead of making their own extraction calls.
+
+    Args:
+        client: OpenAI client instance.
+        project (Project): Project whose scene history the agents use.
+        scene_desc (str): Description of the scene being planned.
+        scene_number (int): Number of the scene being planned.
+        num_scenes (int): Number of prior scenes each agent considers.
+        concurrent (bool): Run the agents in parallel (default: WRITERS_ROOM_CONCURRENT).
+        fused_analysis (bool): Analyze the scene in one structured call first (default: FUSED_SCENE_ANALYSIS).
+        sitcom_title (str): Title of the sitcom (used by the fused analysis prompt).
+
+    Returns:
+        dict: Writers' room results keyed by 'character', 'comedic' and 'environment'.
+    """
+    scene_analysis = None
+    if fused_analysis:
+        scene_analysis = analyze_scene(
+            client,
+            sitcom_title,
+            scene_desc,
+            prior_characters=project.metadata.characters(),
+            scene_number=scene_number
+        )
+
+    agents = writers_room_agents(client, project, num_scenes, scene_analysis)
+
+    if concurrent:
+        with ThreadPoolExecutor(max_workers=len(agents)) as executor:
+            futures = {
+                name: executor.submit(agent.run, scene_description=scene_desc, scene_number=scene_number)
+                for name, agent in agents.items()
+            }
+            results = {name: future.result() for name, future in futures.items()}
+    else:
+        results = {
+            name: agent.run(scene_description=scene_desc, scene_number=scene_number)
+            for name, agent in agents.items()
+        }
+
+    return writers_room_payload(results)
+
+async def arun_writers_room(client, project, scene_desc, scene_number, num_scenes, concurrent=WRITERS_ROOM_CONCURRENT,
+                            fused_analysis=FUSED_SCENE_ANALYSIS, sitcom_title=""):
+    """
+    Async version of `run_writers_room` for the ASGI server (asgi.py).
+
+    The agents' `arun` cycles await their LLM calls, so in concurrent mode the three agents
+    share the event loop instead of occupying three threads.
+    """
+    scene_analysis = None
+    if fused_analysis:
+        scene_analysis = await aanalyze_scene(
+            client,
+            sitcom_title,
+            scene_desc,
+            prior_characters=project.metadata.characters(),
+            scene_number=scene_number
+        )
+
+    agents = writers_room_agents(client, project, num_scenes, scene_analysis)
+
+    if concurrent:
+        outputs = await asyncio.gather(*(
+            agent.arun(scene_description=scene_desc, scene_number=scene_number) for agent in agents.values()
+        ))
+        results = dict(zip(agents, outputs))
+    else:
+        results = {
+            name: await agent.arun(scene_description=scene_desc, scene_number=scene_number)
+            for name, agent in agents.items()
+        }
+    return writers_room_payload(results)
+
+def writers_room_payload(results):
+    """Formats the agents' `run` tuples (keyed by 'character', 'comedic', 'environment') for the frontend."""
+    character_histories, char_is_consistent, char_explanation, char_recommendations, char_thoughts = results['character']
+    com_context, com_is_consistent, com_analysis_text, com_recommendations, com_thoughts = results['comedic']
+    context, env_is_consistent, env_explanation, env_recommendations, env_thoughts = results['environment']
+
+    return {
+        'character': {
+            'is_consistent': char_is_consistent,
+            'explanation': char_explanation,
+            'recommendations': char_recommendations,
+            'thoughts': char_thoughts
+        },
+        'comedic': {
+            'is_consistent': com_is_consistent,
+            'analysis': com_analysis_text,
+            'recommendations': com_recommendations,
+            'thoughts': com_thoughts
+        },
+        'environment': {
+            'is_consistent': env_is_consistent,
+            'explanation': env_explanation,
+            'details_suggestions': env_recommendations,
+            'thoughts': env_thoughts
+        }
+    }
+
+def project_characters(project_id):
+    """Returns the characters seen so far in a project (loading it if needed)."""
+    with projects.project(project_id) as project:
+        return project.metadata.characters()
+
+def store_scene(client, project_id, sitcom_title, scene_script, scene_number, episode=1):
+    """
+    Summarizes a scene and stores (or replaces, if it was regenerated) it in the project's vector DB.
+
+    Returns:
+        dict: The stored metadata record.
+    """
+    if FUSED_SCENE_ANALYSIS:
+        # Also stores the scene's key props and scenery
+        scene_summary = analyze_scene(
+            client,
+            sitcom_title,
+            scene_script,
+            prior_characters=project_characters(project_id),
+            scene_number=scene_number
+        )
+    else:
+        scene_summary = summarize_scene(client, sitcom_title, scene_script)
+
+    with projects.project(project_id) as project:
+        return add_scene_to_vector_db(
+            scene_summary,
+            full_script=scene_script,
+            embedding_model=embedding_model,
+            profile_store=project.profile_store,
+            vector_store=project.vector_store,
+            scene_number=scene_number,
+            episode=episode,
+            script_store=project.script_store
+        )
+
+async def astore_scene(client, project_id, sitcom_title, scene_script, scene_number, episode=1):
+    """
+    Async version of `store_scene`: the LLM call is awaited, and loading the project,
+    embedding the summary and writing the stores run on worker threads.
+    """
+    if FUSED_SCENE_ANALYSIS:
+        scene_summary = await aanalyze_scene(
+            client,
+            sitcom_title,
+            scene_script,
+            prior_characters=await asyncio.to_thread(project_characters, project_id),
+            scene_number=scene_number
+        )
+    else:
+        scene_summary = await asummarize_scene(client, sitcom_title, scene_script)
 
-def setup_openai(api_key):
-    openai.api_key = api_key
-    return openai.OpenAI(api_key=api_key)
+    def add():
+        with projects.project(project_id) as project:
+            return add_scene_to_vector_db(
+                scene_summary,
+                full_script=scene_script,
+                embedding_model=embedding_model,
+                profile_store=project.profile_store,
+                vector_store=project.vector_store,
+                scene_number=scene_number,
+                episode=episode,
+                script_store=project.script_store
+            )
+
+    return await asyncio.to_thread(add)
+
+def scene_info_payload(info):
+    """Formats a stored metadata record for the frontend."""
+    return {
+        'summary': info.get('summary', ''),
+        'characters': ', '.join(info.get('characters', [])),
+        'location': info.get('location', ''),
+        'recurring_joke': info.get('recurring_joke', ''),
+        'emotional_tone': info.get('emotional_tone', '')
+    }
+
+def run_episode_scene(client, job, scene_number, report):
+    """
+    One step of a full-episode job: writers' room -> plan -> write -> store for `scene_number`.
+
+    Mirrors the flow App.js drives scene by scene (scene 1 is written straight from the outline),
+    with the outline and prior scenes taken from the job instead of being re-sent per request.
+    """
+    outline = job['outline']
+    title = job['title']
+    writers_room = None
+
+    if scene_number == 1:
+        report('writing')
+        script = generate_scene_1_script(
+            client=client,
+            sitcom_title=title,
+            scene_description=extract_scene(outline, 1),
+            scene_index=0
+        )
+    else:
+        report('writers_room')
+        with projects.project(job['project_id']) as project:
+            writers_room = run_writers_room(
+                client=client,
+                project=project,
+                scene_desc=extract_scene(outline, scene_number),
+                scene_number=scene_number,
+                num_scenes=1 if scene_number == 2 else 3,
+                sitcom_title=title
+            )
+        report('planning')
+        scene_plan = ScenePlannerAgent(client=client).plan_next_scene(
+            character_recommendations=writers_room['character']['recommendations'],
+            comedic_recommendations=writers_room['comedic']['recommendations'],
+            environment_recommendations=writers_room['environment']['details_suggestions'],
+            scene_number=scene_number
+        )
+        report('writing')
+        script = generate_scene(client=client, scene_plan=scene_plan, scene_number=scene_number)
+
+    report('storing')
+    info = store_scene(client, job['project_id'], title, script, scene_number, job['episode'])
+    return {'script': script, 'writers_room': writers_room, 'metadata': scene_info_payload(info)}
+
+# Full episodes generated server-side (POST /api/episodes); each job is checkpointed after every
+# scene under EPISODE_JOB_DIR and can be resumed after a failure or restart
+episode_jobs = EpisodeJobManager(
+    os.getenv("EPISODE_JOB_DIR", os.path.join(PROJECT_STORE_DIR, "_episode_jobs")),
+    run_episode_scene,
+    max_workers=int(os.getenv("EPISODE_JOB_WORKERS", "2"))
+)
+
+def parse_keywords(keywords):
+    """
+    Normalizes the concept form's keywords ({category: list or comma-separated string}) for
+    `generate_sitcom_pitch`, returning None if every category is empty.
+    """
+    keywords_dict = {}
+    for category, words in keywords.items():
+        if isinstance(words, list):
+            keywords_dict[category] = [w.strip() for w in words if w.strip()]
+        elif isinstance(words, str):
+            keywords_dict[category] = [w.strip() for w in words.split(',') if w.strip()]
+        else:
+            keywords_dict[category] = []
+
+    # Pass None if all lists are empty
+    return keywords_dict if any(keywords_dict.values()) else None
+
+def sse_event(data, event=None):
+    """Formats one Server-Sent Event with a JSON payload."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+def stream_scene_events(scene_key, make_chunks):
+    """
+    Streams a scene script as Server-Sent Events.
+
+    Emits a 'delta' payload per chunk as the model writes, then a 'done' event carrying the full
+    script under `scene_key` (the same payload as the non-streaming route), or an 'error' event.
+    `make_chunks` is called inside the stream, so slow preparation (e.g., scene planning) does
+    not delay the response headers.
+    """
+    def events():
+        pieces = []
+        try:
+            for chunk in make_chunks():
+                pieces.append(chunk)
+                yield sse_event({'delta': chunk})
+            yield sse_event({scene_key: ''.join(pieces)}, event='done')
+        except Exception as e:
+            yield sse_event({'error': str(e)}, event='error')
+
+    return Response(
+        events(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/health', methods=['GET'])
+def health():
+    """Reports liveness and whether the embedding model has finished loading."""
+    return jsonify({
+        'status': 'ok',
+        'embedding_model_ready': embedding_model.is_ready,
+        'embedding_model_error': embedding_model.error
+    })
 
 @app.route('/api/generate-concept', methods=['POST'])
 def generate_concept():
@@ -45,22 +441,8 @@ def generate_concept():
         return jsonify({'error': 'Missing required fields'}), 400
     
     try:
-        client = openai.OpenAI(api_key=api_key)
-        # Flatten keywords dict to a list
-        keywords_dict = {}
-        for category, words in keywords.items():
-            if isinstance(words, list):
-                keywords_dict[category] = [w.strip() for w in words if w.strip()]
-            elif isinstance(words, str):
-                keywords_dict[category] = [w.strip() for w in words.split(',') if w.strip()]
-            else:
-                keywords_dict[category] = []
-
-        # Pass None if all lists are empty
-        if not any(keywords_dict.values()):
-            keywords_dict = None
-
-        sitcom_pitch = generate_sitcom_pitch(client, keywords_dict)
+        client = openai_clients.get(api_key)
+        sitcom_pitch = generate_sitcom_pitch(client, parse_keywords(keywords))
         return jsonify({'concept': sitcom_pitch})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -75,7 +457,7 @@ def generate_outline():
         return jsonify({'error': 'Missing required fields'}), 400
     
     try:
-        client = openai.OpenAI(api_key=api_key)
+        client = openai_clients.get(api_key)
         outline = generate_pilot_episode_outline(client, concept)
         return jsonify({'outline': outline})
     except Exception as e:
@@ -91,7 +473,7 @@ def validate_outline():
     if not api_key or not concept or not outline:
         return jsonify({'error': 'Missing required fields'}), 400
     try:
-        client = openai.OpenAI(api_key=api_key)
+        client = openai_clients.get(api_key)
         validation = validate_episode_outline(client, concept, outline)
         return jsonify({'validation': validation})
     except Exception as e:
@@ -105,7 +487,7 @@ def generate_scene_1():
     if not api_key or not outline:
         return jsonify({'error': 'Missing required fields'}), 400
     try:
-        client = openai.OpenAI(api_key=api_key)
+        client = openai_clients.get(api_key)
         scene_1_desc = extract_scene(outline, 1)
         script_title = extract_title(outline)
         scene1 = generate_scene_1_script(
@@ -118,6 +500,22 @@ def generate_scene_1():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/generate-scene-1/stream', methods=['POST'])
+def generate_scene_1_stream():
+    data = request.json
+    api_key = data.get('apiKey')
+    outline = data.get('outline')
+    if not api_key or not outline:
+        return jsonify({'error': 'Missing required fields'}), 400
+
+    client = openai_clients.get(api_key)
+    return stream_scene_events('scene1', lambda: stream_scene_1_script(
+        client=client,
+        sitcom_title=extract_title(outline),
+        scene_description=extract_scene(outline, 1),
+        scene_index=0
+    ))
+
 @app.route('/api/generate-scene/<int:scene_number>', methods=['POST'])
 def generate_scene_route(scene_number):
     # Validate scene number
@@ -134,7 +532,7 @@ def generate_scene_route(scene_number):
         return jsonify({'error': 'Missing required fields'}), 400
     
     try:
-        client = openai.OpenAI(api_key=api_key)
+        client = openai_clients.get(api_key)
         
         # Initialize scene planner agent
         scene_planner_agent = ScenePlannerAgent(client=client)
@@ -158,6 +556,34 @@ def generate_scene_route(scene_number):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/generate-scene/<int:scene_number>/stream', methods=['POST'])
+def generate_scene_stream(scene_number):
+    # Validate scene number
+    if scene_number < 2 or scene_number > 20:
+        return jsonify({'error': 'Scene number must be between 2 and 20'}), 400
+
+    data = request.json
+    api_key = data.get('apiKey')
+    outline = data.get('outline')
+    previous_scene = data.get('previousScene')
+    writers_room_results = data.get('writersRoomResults')
+
+    if not api_key or not outline or not previous_scene or not writers_room_results:
+        return jsonify({'error': 'Missing required fields'}), 400
+
+    client = openai_clients.get(api_key)
+
+    def chunks():
+        scene_plan = ScenePlannerAgent(client=client).plan_next_scene(
+            character_recommendations=writers_room_results['character']['recommendations'],
+            comedic_recommendations=writers_room_results['comedic']['recommendations'],
+            environment_recommendations=writers_room_results['environment']['details_suggestions'],
+            scene_number=scene_number
+        )
+        return stream_scene(client=client, scene_plan=scene_plan, scene_number=scene_number)
+
+    return stream_scene_events(f'scene{scene_number}', chunks)
+
 @app.route('/api/scene-vector-info/<int:scene_number>', methods=['POST'])
 def scene_vector_info(scene_number):
     # Validate scene number
@@ -168,33 +594,46 @@ def scene_vector_info(scene_number):
     api_key = data.get('apiKey')
     outline = data.get('outline')
     scene_script = data.get('sceneScript')
+    project_id = data.get('projectId', DEFAULT_PROJECT_ID)
+    episode = data.get('episode', 1)
     
     if not api_key or not outline or not scene_script:
         return jsonify({'error': 'Missing required fields'}), 400
+    if not isinstance(project_id, str) or not PROJECT_ID_PATTERN.match(project_id):
+        return jsonify({'error': 'Invalid project ID'}), 400
+    if not isinstance(episode, int) or episode < 1:
+        return jsonify({'error': 'Episode must be a positive integer'}), 400
     
     try:
-        client = openai.OpenAI(api_key=api_key)
-        script_title = extract_title(outline)
-        scene_summary = summarize_scene(client, script_title, scene_script)
-        
-        # Add to vector DB with real model and index
-        add_scene_to_vector_db(
-            scene_summary,
-            full_script=scene_script,
-            embedding_model=embedding_model,
-            index=index,
-            vector_metadata=scene_metadata
-        )
-        
-        # Return the info for the scene
-        info = scene_metadata[-1]  # Use the last added scene
-        return jsonify({
-            'summary': info.get('summary', ''),
-            'characters': ', '.join(info.get('characters', [])),
-            'location': info.get('location', ''),
-            'recurring_joke': info.get('recurring_joke', ''),
-            'emotional_tone': info.get('emotional_tone', '')
-        })
+        client = openai_clients.get(api_key)
+        info = store_scene(client, project_id, extract_title(outline), scene_script, scene_number, episode)
+        return jsonify(scene_info_payload(info))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/scene-vector-info/<int:scene_number>', methods=['DELETE'])
+def delete_scene_vector_info(scene_number):
+    data = request.json or {}
+    project_id = data.get('projectId', DEFAULT_PROJECT_ID)
+    episode = data.get('episode', 1)
+
+    if not isinstance(project_id, str) or not PROJECT_ID_PATTERN.match(project_id):
+        return jsonify({'error': 'Invalid project ID'}), 400
+    if not isinstance(episode, int) or episode < 1:
+        return jsonify({'error': 'Episode must be a positive integer'}), 400
+
+    try:
+        with projects.project(project_id) as project:
+            removed = remove_scene_from_vector_db(
+                project.vector_store,
+                scene_number,
+                episode=episode,
+                profile_store=project.profile_store,
+                script_store=project.script_store
+            )
+        if removed is None:
+            return jsonify({'error': 'Scene not found'}), 404
+        return jsonify({'removed': True})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -207,65 +646,29 @@ def scene_writers_room(scene_number):
     data = request.json
     api_key = data.get('apiKey')
     outline = data.get('outline')
+    project_id = data.get('projectId', DEFAULT_PROJECT_ID)
     
     if not api_key or not outline:
         return jsonify({'error': 'Missing required fields'}), 400
+    if not isinstance(project_id, str) or not PROJECT_ID_PATTERN.match(project_id):
+        return jsonify({'error': 'Invalid project ID'}), 400
     
     try:
-        client = openai.OpenAI(api_key=api_key)
+        client = openai_clients.get(api_key)
         # Extract scene description
         scene_desc = extract_scene(outline, scene_number + 1)  # Get next scene's description
-        # Character Agent
-        character_agent = CharacterAgent(
-            client=client,
-            vector_metadata=scene_metadata,
-            num_scenes=3
-        )
-        character_histories, char_is_consistent, char_explanation, char_recommendations, char_thoughts = character_agent.run(
-            scene_description=scene_desc,
-            scene_number=scene_number + 1
-        )        
-        # Comedic Agent
-        comedic_agent = ComedicAgent(
-            client=client,
-            vector_metadata=scene_metadata,
-            num_scenes=3
-        )
-        com_context, com_is_consistent, com_analysis_text, com_recommendations, com_thoughts = comedic_agent.run(
-            scene_description=scene_desc,
-            scene_number=scene_number + 1
-        )
-        
-        # Environment Agent
-        environment_agent = EnvironmentAgent(
-            client=client,
-            vector_metadata=scene_metadata,
-            num_scenes=3
-        )
-        context, env_is_consistent, env_explanation, env_recommendations, env_thoughts = environment_agent.run(
-            scene_description=scene_desc,
-            scene_number=scene_number + 1
-        )
-        return jsonify({
-            'character': {
-                'is_consistent': char_is_consistent,
-                'explanation': char_explanation,
-                'recommendations': char_recommendations,
-                'thoughts': char_thoughts
-            },
-            'comedic': {
-                'is_consistent': com_is_consistent,
-                'analysis': com_analysis_text,
-                'recommendations': com_recommendations,
-                'thoughts': com_thoughts
-            },
-            'environment': {
-                'is_consistent': env_is_consistent,
-                'explanation': env_explanation,
-                'details_suggestions': env_recommendations,
-                'thoughts': env_thoughts
-            }
-        })
+        with projects.project(project_id) as project:
+            results = run_writers_room(
+                client=client,
+                project=project,
+                scene_desc=scene_desc,
+                scene_number=scene_number + 1,
+                num_scenes=3,
+                concurrent=data.get('concurrent', WRITERS_ROOM_CONCURRENT),
+                fused_analysis=data.get('fusedAnalysis', FUSED_SCENE_ANALYSIS),
+                sitcom_title=extract_title(outline)
+            )
+        return jsonify(results)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -274,70 +677,96 @@ def scene_1_writers_room():
     data = request.json
     api_key = data.get('apiKey')
     outline = data.get('outline')
+    project_id = data.get('projectId', DEFAULT_PROJECT_ID)
     
     if not api_key or not outline:
         return jsonify({'error': 'Missing required fields'}), 400
+    if not isinstance(project_id, str) or not PROJECT_ID_PATTERN.match(project_id):
+        return jsonify({'error': 'Invalid project ID'}), 400
     
     try:
-        client = openai.OpenAI(api_key=api_key)
+        client = openai_clients.get(api_key)
         # Extract scene 2 description since we're planning scene 2
         scene_desc = extract_scene(outline, 2)
-        
-        # Character Agent
-        character_agent = CharacterAgent(
-            client=client,
-            vector_metadata=scene_metadata,
-            num_scenes=1  # Only look at scene 1 since it's the first scene
-        )
-        character_histories, char_is_consistent, char_explanation, char_recommendations, char_thoughts = character_agent.run(
-            scene_description=scene_desc,
-            scene_number=2  # Planning scene 2
-        )
-        
-        # Comedic Agent
-        comedic_agent = ComedicAgent(
-            client=client,
-            vector_metadata=scene_metadata,
-            num_scenes=1
-        )
-        com_context, com_is_consistent, com_analysis_text, com_recommendations, com_thoughts = comedic_agent.run(
-            scene_description=scene_desc,
-            scene_number=2  # Planning scene 2
-        )
-        
-        # Environment Agent
-        environment_agent = EnvironmentAgent(
-            client=client,
-            vector_metadata=scene_metadata,
-            num_scenes=1  # Only look at scene 1 since it's the first scene
-        )
-        context, env_is_consistent, env_explanation, env_recommendations, env_thoughts = environment_agent.run(
-            scene_description=scene_desc,
-            scene_number=2  # Planning scene 2
-        )
-        
-        return jsonify({
-            'character': {
-                'is_consistent': char_is_consistent,
-                'explanation': char_explanation,
-                'recommendations': char_recommendations,
-                'thoughts': char_thoughts
-            },
-            'comedic': {
-                'is_consistent': com_is_consistent,
-                'analysis': com_analysis_text,
-                'recommendations': com_recommendations,
-                'thoughts': com_thoughts
-            },
-            'environment': {
-                'is_consistent': env_is_consistent,
-                'explanation': env_explanation,
-                'details_suggestions': env_recommendations,
-                'thoughts': env_thoughts
-            }
-        })
+        with projects.project(project_id) as project:
+            results = run_writers_room(
+                client=client,
+                project=project,
+                scene_desc=scene_desc,
+                scene_number=2,  # Planning scene 2
+                num_scenes=1,  # Only look at scene 1 since it's the first scene
+                concurrent=data.get('concurrent', WRITERS_ROOM_CONCURRENT),
+                fused_analysis=data.get('fusedAnalysis', FUSED_SCENE_ANALYSIS),
+                sitcom_title=extract_title(outline)
+            )
+        return jsonify(results)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/episodes', methods=['POST'])
+def create_episode_job():
+    data = request.json
+    api_key = data.get('apiKey')
+    outline = data.get('outline')
+    project_id = data.get('projectId', DEFAULT_PROJECT_ID)
+    episode = data.get('episode', 1)
+
+    if not api_key or not outline:
+        return jsonify({'error': 'Missing required fields'}), 400
+    if not isinstance(project_id, str) or not PROJECT_ID_PATTERN.match(project_id):
+        return jsonify({'error': 'Invalid project ID'}), 400
+    if not isinstance(episode, int) or episode < 1:
+        return jsonify({'error': 'Episode must be a positive integer'}), 400
+
+    scene_numbers = [number for number in get_scene_numbers(outline) if 1 <= number <= 20]
+    if not scene_numbers or scene_numbers[0] != 1:
+        return jsonify({'error': 'Outline must contain scenes starting at Scene 1'}), 400
+
+    job = episode_jobs.submit(
+        openai_clients.get(api_key),
+        project_id,
+        outline,
+        scene_numbers,
+        title=extract_title(outline),
+        episode=episode
+    )
+    return jsonify(job), 202
+
+@app.route('/api/episodes/<job_id>', methods=['GET'])
+def episode_job_status(job_id):
+    if not JOB_ID_PATTERN.match(job_id):
+        return jsonify({'error': 'Invalid job ID'}), 400
+    include_scenes = request.args.get('includeScenes', '0') == '1'
+    job = episode_jobs.status(job_id, include_scenes=include_scenes)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/api/episodes/<job_id>/resume', methods=['POST'])
+def resume_episode_job(job_id):
+    data = request.json or {}
+    api_key = data.get('apiKey')
+    if not JOB_ID_PATTERN.match(job_id):
+        return jsonify({'error': 'Invalid job ID'}), 400
+    if not api_key:
+        return jsonify({'error': 'Missing required fields'}), 400
+
+    try:
+        job = episode_jobs.resume(job_id, openai_clients.get(api_key))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 409
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job), 202
+
+@app.route('/api/episodes/<job_id>/cancel', methods=['POST'])
+def cancel_episode_job(job_id):
+    if not JOB_ID_PATTERN.match(job_id):
+        return jsonify({'error': 'Invalid job ID'}), 400
+    job = episode_jobs.cancel(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
 if __name__ == '__main__':
     app.run(debug=True, port=5000) 
\ No newline at end of file
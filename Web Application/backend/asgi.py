@@ -0,0 +1,409 @@
+# ASGI version of the API in app.py, for serving many long LLM chains from one process:
+#
+#     uvicorn asgi:app --port 5000
+#
+# The routes, request fields and responses are the same as app.py's. Each request runs as a
+# coroutine with a pooled AsyncOpenAI client and the agents' async paths, so a request waiting on
+# GPT-4 holds no thread; capacity is bounded by the LLM gateway's concurrency cap and rate
+# limiter instead of a WSGI thread count. Projects, the embedding model and episode jobs are
+# the ones app.py sets up (see load_test.py for a side-by-side capacity test).
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+# Importing app.py puts utils/ on the path and creates the shared project registry,
+# embedding model, OpenAI client pool, gateway configuration and episode job manager
+from app import (
+    DEFAULT_PROJECT_ID, WRITERS_ROOM_CONCURRENT, FUSED_SCENE_ANALYSIS, projects, embedding_model, episode_jobs,
+    openai_clients, arun_writers_room, astore_scene, scene_info_payload, parse_keywords, sse_event
+)
+from utils.outline_generation import agenerate_sitcom_pitch, agenerate_pilot_episode_outline
+from utils.script_review import avalidate_episode_outline
+from utils.screen_writing import agenerate_scene_1_script, agenerate_scene, astream_scene_1_script, astream_scene
+from utils.text_utils import extract_scene, extract_title, get_scene_numbers
+from utils.vector_db_utils import remove_scene_from_vector_db
+from utils.project_registry import PROJECT_ID_PATTERN
+from utils.episode_jobs import JOB_ID_PATTERN
+from utils.agents.scene_planner_agent import ScenePlannerAgent
+import llm_gateway
+
+# Waiting requests no longer hold threads, so allow more in-flight LLM calls than the
+# gateway's default (the per-key rate limiter still paces them against the quota).
+# As in app.py, LLM_MAX_CONCURRENCY=0 (or unset) keeps the default.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "0")) or 64
+if LLM_MAX_CONCURRENCY < 1:
+    raise ValueError(f"LLM_MAX_CONCURRENCY must be a positive number (or 0 for the default), got {LLM_MAX_CONCURRENCY}.")
+llm_gateway.configure_gateway(max_concurrency=LLM_MAX_CONCURRENCY)
+
+def make_client(api_key):
+    return openai_clients.get_async(api_key)
+
+async def json_body(request):
+    """Returns the request's JSON object, or {} if the body is missing or not a JSON object."""
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+def error(message, status_code):
+    return JSONResponse({'error': message}, status_code=status_code)
+
+def stream_scene_events(scene_key, make_chunks):
+    """Async version of app.stream_scene_events; `make_chunks` returns an async iterator."""
+    async def events():
+        pieces = []
+        try:
+            async for chunk in make_chunks():
+                pieces.append(chunk)
+                yield sse_event({'delta': chunk})
+            yield sse_event({scene_key: ''.join(pieces)}, event='done')
+        except Exception as e:
+            yield sse_event({'error': str(e)}, event='error')
+
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+async def health(request):
+    return JSONResponse({
+        'status': 'ok',
+        'embedding_model_ready': embedding_model.is_ready,
+        'embedding_model_error': embedding_model.error
+    })
+
+async def generate_concept(request):
+    data = await json_body(request)
+    api_key = data.get('apiKey')
+    keywords = data.get('keywords')
+
+    # Handle both dict and list for keywords
+    if isinstance(keywords, list):
+        keywords = {"keywords": keywords}
+    if not isinstance(keywords, dict):
+        return error('Keywords must be a dictionary or list', 400)
+
+    if not api_key:
+        return error('Missing required fields', 400)
+
+    try:
+        sitcom_pitch = await agenerate_sitcom_pitch(make_client(api_key), parse_keywords(keywords))
+        return JSONResponse({'concept': sitcom_pitch})
+    except Exception as e:
+        return error(str(e), 500)
+
+async def generate_outline(request):
+    data = await json_body(request)
+    api_key = data.get('apiKey')
+    concept = data.get('concept')
+
+    if not api_key or not concept:
+        return error('Missing required fields', 400)
+
+    try:
+        outline = await agenerate_pilot_episode_outline(make_client(api_key), concept)
+        return JSONResponse({'outline': outline})
+    except Exception as e:
+        return error(str(e), 500)
+
+async def validate_outline(request):
+    data = await json_body(request)
+    api_key = data.get('apiKey')
+    concept = data.get('concept')
+    outline = data.get('outline')
+
+    if not api_key or not concept or not outline:
+        return error('Missing required fields', 400)
+    try:
+        validation = await avalidate_episode_outline(make_client(api_key), concept, outline)
+        return JSONResponse({'validation': validation})
+    except Exception as e:
+        return error(str(e), 500)
+
+async def generate_scene_1(request):
+    data = await json_body(request)
+    api_key = data.get('apiKey')
+    outline = data.get('outline')
+    if not api_key or not outline:
+        return error('Missing required fields', 400)
+    try:
+        scene1 = await agenerate_scene_1_script(
+            client=make_client(api_key),
+            sitcom_title=extract_title(outline),
+            scene_description=extract_scene(outline, 1),
+            scene_index=0
+        )
+        return JSONResponse({'scene1': scene1})
+    except Exception as e:
+        return error(str(e), 500)
+
+async def generate_scene_1_stream(request):
+    data = await json_body(request)
+    api_key = data.get('apiKey')
+    outline = data.get('outline')
+    if not api_key or not outline:
+        return error('Missing required fields', 400)
+
+    client = make_client(api_key)
+    return stream_scene_events('scene1', lambda: astream_scene_1_script(
+        client=client,
+        sitcom_title=extract_title(outline),
+        scene_description=extract_scene(outline, 1),
+        scene_index=0
+    ))
+
+async def scene_request(request):
+    """Validates a scene 2-20 generation request; returns (scene_number, data, error response)."""
+    scene_number = request.path_params['scene_number']
+    if scene_number < 2 or scene_number > 20:
+        return scene_number, None, error('Scene number must be between 2 and 20', 400)
+
+    data = await json_body(request)
+    if not data.get('apiKey') or not data.get('outline') or not data.get('previousScene') \
+            or not data.get('writersRoomResults'):
+        return scene_number, None, error('Missing required fields', 400)
+    return scene_number, data, None
+
+async def plan_scene(client, writers_room_results, scene_number):
+    return await ScenePlannerAgent(client=client).aplan_next_scene(
+        character_recommendations=writers_room_results['character']['recommendations'],
+        comedic_recommendations=writers_room_results['comedic']['recommendations'],
+        environment_recommendations=writers_room_results['environment']['details_suggestions'],
+        scene_number=scene_number
+    )
+
+async def generate_scene_route(request):
+    scene_number, data, invalid = await scene_request(request)
+    if invalid is not None:
+        return invalid
+
+    try:
+        client = make_client(data['apiKey'])
+        scene_plan = await plan_scene(client, data['writersRoomResults'], scene_number)
+        scene = await agenerate_scene(client=client, scene_plan=scene_plan, scene_number=scene_number)
+        return JSONResponse({f'scene{scene_number}': scene})
+    except Exception as e:
+        return error(str(e), 500)
+
+async def generate_scene_stream(request):
+    scene_number, data, invalid = await scene_request(request)
+    if invalid is not None:
+        return invalid
+
+    client = make_client(data['apiKey'])
+
+    async def chunks():
+        scene_plan = await plan_scene(client, data['writersRoomResults'], scene_number)
+        async for chunk in astream_scene(client=client, scene_plan=scene_plan, scene_number=scene_number):
+            yield chunk
+
+    return stream_scene_events(f'scene{scene_number}', chunks)
+
+async def scene_vector_info(request):
+    scene_number = request.path_params['scene_number']
+    if scene_number < 1 or scene_number > 20:
+        return error('Scene number must be between 1 and 20', 400)
+
+    data = await json_body(request)
+    api_key = data.get('apiKey')
+    outline = data.get('outline')
+    scene_script = data.get('sceneScript')
+    project_id = data.get('projectId', DEFAULT_PROJECT_ID)
+    episode = data.get('episode', 1)
+
+    if not api_key or not outline or not scene_script:
+        return error('Missing required fields', 400)
+    if not isinstance(project_id, str) or not PROJECT_ID_PATTERN.match(project_id):
+        return error('Invalid project ID', 400)
+    if not isinstance(episode, int) or episode < 1:
+        return error('Episode must be a positive integer', 400)
+
+    try:
+        info = await astore_scene(
+            make_client(api_key), project_id, extract_title(outline), scene_script, scene_number, episode
+        )
+        return JSONResponse(scene_info_payload(info))
+    except Exception as e:
+        return error(str(e), 500)
+
+async def delete_scene_vector_info(request):
+    scene_number = request.path_params['scene_number']
+    data = await json_body(request)
+    project_id = data.get('projectId', DEFAULT_PROJECT_ID)
+    episode = data.get('episode', 1)
+
+    if not isinstance(project_id, str) or not PROJECT_ID_PATTERN.match(project_id):
+        return error('Invalid project ID', 400)
+    if not isinstance(episode, int) or episode < 1:
+        return error('Episode must be a positive integer', 400)
+
+    def remove():
+        with projects.project(project_id) as project:
+            return remove_scene_from_vector_db(
+                project.vector_store,
+                scene_number,
+                episode=episode,
+                profile_store=project.profile_store,
+                script_store=project.script_store
+            )
+
+    try:
+        removed = await asyncio.to_thread(remove)
+        if removed is None:
+            return error('Scene not found', 404)
+        return JSONResponse({'removed': True})
+    except Exception as e:
+        return error(str(e), 500)
+
+async def writers_room(data, scene_number, num_scenes):
+    api_key = data.get('apiKey')
+    outline = data.get('outline')
+    project_id = data.get('projectId', DEFAULT_PROJECT_ID)
+
+    if not api_key or not outline:
+        return error('Missing required fields', 400)
+    if not isinstance(project_id, str) or not PROJECT_ID_PATTERN.match(project_id):
+        return error('Invalid project ID', 400)
+
+    try:
+        # Loading an evicted project reads its index from disk, so do it off the event loop
+        project_context = projects.project(project_id)
+        project = await asyncio.to_thread(project_context.__enter__)
+        try:
+            results = await arun_writers_room(
+                client=make_client(api_key),
+                project=project,
+                scene_desc=extract_scene(outline, scene_number),
+                scene_number=scene_number,
+                num_scenes=num_scenes,
+                concurrent=data.get('concurrent', WRITERS_ROOM_CONCURRENT),
+                fused_analysis=data.get('fusedAnalysis', FUSED_SCENE_ANALYSIS),
+                sitcom_title=extract_title(outline)
+            )
+        finally:
+            project_context.__exit__(None, None, None)
+        return JSONResponse(results)
+    except Exception as e:
+        return error(str(e), 500)
+
+async def scene_writers_room(request):
+    scene_number = request.path_params['scene_number']
+    if scene_number < 1 or scene_number > 20:
+        return error('Scene number must be between 1 and 20', 400)
+    # Plans the next scene from the last 3 scenes
+    return await writers_room(await json_body(request), scene_number + 1, 3)
+
+async def scene_1_writers_room(request):
+    # Plans scene 2; only scene 1 exists so far
+    return await writers_room(await json_body(request), 2, 1)
+
+# Episode jobs run on app.py's background workers with a synchronous client, so these routes
+# only queue, poll and cancel them
+async def create_episode_job(request):
+    data = await json_body(request)
+    api_key = data.get('apiKey')
+    outline = data.get('outline')
+    project_id = data.get('projectId', DEFAULT_PROJECT_ID)
+    episode = data.get('episode', 1)
+
+    if not api_key or not outline:
+        return error('Missing required fields', 400)
+    if not isinstance(project_id, str) or not PROJECT_ID_PATTERN.match(project_id):
+        return error('Invalid project ID', 400)
+    if not isinstance(episode, int) or episode < 1:
+        return error('Episode must be a positive integer', 400)
+
+    scene_numbers = [number for number in get_scene_numbers(outline) if 1 <= number <= 20]
+    if not scene_numbers or scene_numbers[0] != 1:
+        return error('Outline must contain scenes starting at Scene 1', 400)
+
+    job = episode_jobs.submit(
+        openai_clients.get(api_key),
+        project_id,
+        outline,
+        scene_numbers,
+        title=extract_title(outline),
+        episode=episode
+    )
+    return JSONResponse(job, status_code=202)
+
+async def episode_job_status(request):
+    job_id = request.path_params['job_id']
+    if not JOB_ID_PATTERN.match(job_id):
+        return error('Invalid job ID', 400)
+    include_scenes = request.query_params.get('includeScenes', '0') == '1'
+    job = episode_jobs.status(job_id, include_scenes=include_scenes)
+    if job is None:
+        return error('Job not found', 404)
+    return JSONResponse(job)
+
+async def resume_episode_job(request):
+    job_id = request.path_params['job_id']
+    data = await json_body(request)
+    api_key = data.get('apiKey')
+    if not JOB_ID_PATTERN.match(job_id):
+        return error('Invalid job ID', 400)
+    if not api_key:
+        return error('Missing required fields', 400)
+
+    try:
+        job = episode_jobs.resume(job_id, openai_clients.get(api_key))
+    except ValueError as e:
+        return error(str(e), 409)
+    if job is None:
+        return error('Job not found', 404)
+    return JSONResponse(job, status_code=202)
+
+async def cancel_episode_job(request):
+    job_id = request.path_params['job_id']
+    if not JOB_ID_PATTERN.match(job_id):
+        return error('Invalid job ID', 400)
+    job = episode_jobs.cancel(job_id)
+    if job is None:
+        return error('Job not found', 404)
+    return JSONResponse(job)
+
+routes = [
+    Route('/api/health', health, methods=['GET']),
+    Route('/api/generate-concept', generate_concept, methods=['POST']),
+    Route('/api/generate-outline', generate_outline, methods=['POST']),
+    Route('/api/validate-outline', validate_outline, methods=['POST']),
+    Route('/api/generate-scene-1', generate_scene_1, methods=['POST']),
+    Route('/api/generate-scene-1/stream', generate_scene_1_stream, methods=['POST']),
+    Route('/api/generate-scene/{scene_number:int}', generate_scene_route, methods=['POST']),
+    Route('/api/generate-scene/{scene_number:int}/stream', generate_scene_stream, methods=['POST']),
+    Route('/api/scene-vector-info/{scene_number:int}', scene_vector_info, methods=['POST']),
+    Route('/api/scene-vector-info/{scene_number:int}', delete_scene_vector_info, methods=['DELETE']),
+    Route('/api/scene-writers-room/{scene_number:int}', scene_writers_room, methods=['POST']),
+    Route('/api/scene-1-writers-room', scene_1_writers_room, methods=['POST']),
+    Route('/api/episodes', create_episode_job, methods=['POST']),
+    Route('/api/episodes/{job_id}', episode_job_status, methods=['GET']),
+    Route('/api/episodes/{job_id}/resume', resume_episode_job, methods=['POST']),
+    Route('/api/episodes/{job_id}/cancel', cancel_episode_job, methods=['POST'])
+]
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    # app.py's atexit hooks close the sync clients, projects and jobs; async clients
+    # have to be closed on the loop that opened them
+    await openai_clients.aclose()
+
+app = Starlette(
+    routes=routes,
+    lifespan=lifespan,
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])]
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, port=5000)
@@ -0,0 +1,53 @@
+# Latency/quality benchmark of the character agent's multi-step and fused modes.
+#
+#     python benchmark_character_agent.py <scene_metadata.json> <scenes.json> [--num-scenes 1]
+#
+# scene_metadata.json: list of stored scene metadata (summary, characters, scene_number, ...)
+# scenes.json: list of {"scene_number": int, "scene_description": str} to review
+#
+# Needs OPENAI_API_KEY. See `benchmark_character_agent_modes` for how each mode is measured.
+import argparse
+import json
+import os
+import sys
+
+# Helpers import each other as top-level modules (as in app.py), so put the utils
+# directories on the path before importing them.
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BACKEND_DIR, "utils"))
+sys.path.append(os.path.join(BACKEND_DIR, "utils", "agents"))
+
+import openai
+
+from character_agent import benchmark_character_agent_modes
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Multi-step vs fused character agent benchmark')
+    parser.add_argument('scene_metadata', help='JSON list of stored scene metadata')
+    parser.add_argument('scenes', help='JSON list of {"scene_number", "scene_description"} to review')
+    parser.add_argument('--num-scenes', type=int, default=1, help='Prior scenes the agents consider')
+    parser.add_argument('--judge-model', default='gpt-4', help="Judge model, or 'none' to skip judging")
+    args = parser.parse_args()
+
+    if not os.getenv('OPENAI_API_KEY'):
+        sys.exit('OPENAI_API_KEY is not set')
+
+    with open(args.scene_metadata, 'r', encoding='utf-8') as f:
+        prior_metadata = json.load(f)
+    with open(args.scenes, 'r', encoding='utf-8') as f:
+        planned_scenes = [(scene['scene_number'], scene['scene_description']) for scene in json.load(f)]
+
+    results = benchmark_character_agent_modes(
+        openai.OpenAI(api_key=os.environ['OPENAI_API_KEY']),
+        prior_metadata,
+        planned_scenes,
+        num_scenes=args.num_scenes,
+        judge_model=None if args.judge_model.lower() == 'none' else args.judge_model
+    )
+
+    print(f"{'scene':<7}{'multi s':>9}{'fused s':>9}{'multi req':>11}{'fused req':>11}"
+          f"{'agree':>7}{'overlap':>9}{'multi q':>9}{'fused q':>9}")
+    for row in results:
+        print(f"{row['scene_number']:<7}{row['multi_step_seconds']:>9.2f}{row['fused_seconds']:>9.2f}"
+              f"{row['multi_step_requests']:>11}{row['fused_requests']:>11}{str(row['verdict_agreement']):>7}"
+              f"{row['character_overlap']:>9.2f}{str(row['multi_step_score']):>9}{str(row['fused_score']):>9}")
@@ -0,0 +1,334 @@
+# Concurrent request capacity of one process: Flask (app.py, thread per request) vs ASGI (asgi.py).
+#
+#     python load_test.py [--scenario generate-scene] [--requests 200] [--threads 16] [--latency 2.0]
+#     python load_test.py --url http://localhost:5000 --api-key sk-... [--requests 50]
+#
+# By default both apps run in-process against a simulated OpenAI API: every completion
+# sleeps `--latency` seconds, like a GPT-4 call, and no key or network is needed. The
+# Flask app is driven by a pool of `--threads` workers (a threaded WSGI server's worker
+# count) and the ASGI app by one event loop. Scenarios:
+#
+#   generate-scene  POST /api/generate-scene/2: plans the scene, then writes it (two LLM calls)
+#   writers-room    POST /api/scene-writers-room/3: the three agents review scene 4 against a
+#                   seeded project, with semantic retrieval (embeds queries) and character
+#                   profile updates
+#   store-scene     POST /api/scene-vector-info/4: summarizes a scene, embeds it and stores it
+#
+# In the simulation the embedding model is replaced by one whose `encode` takes
+# `--encode-latency` seconds, so retrieval that blocked the event loop would show up as
+# ASGI throughput collapsing. With --url the requests are sent to a running server instead,
+# using real OpenAI calls.
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import numpy as np
+
+SCENE_REQUEST = {
+    'outline': "Title: Load Test\n\nScene 1: Two roommates argue over a thermostat.\n\n"
+               "Scene 2: The landlord arrives to settle the dispute.",
+    'previousScene': "INT. APARTMENT - DAY\n\nDANA and MIKE glare at the thermostat.",
+    'writersRoomResults': {
+        'character': {'recommendations': "Keep Dana stubborn and Mike passive-aggressive."},
+        'comedic': {'recommendations': "Escalate the thermostat war with the landlord caught in the middle."},
+        'environment': {'details_suggestions': "The apartment is either freezing or sweltering."}
+    }
+}
+
+OUTLINE = SCENE_REQUEST['outline'] + "\n\nScene 3: Mike hides the thermostat.\n\nScene 4: Dana finds it in the freezer."
+SCENE_SCRIPT = "INT. APARTMENT - NIGHT\n\nDANA opens the freezer. The thermostat stares back at her.\n\nMIKE: I can explain."
+PROJECT_ID = 'load-test'
+SCHEMA_MARKER = "matching this JSON Schema:\n"
+
+SCENARIOS = {
+    'generate-scene': ('/api/generate-scene/2', SCENE_REQUEST),
+    'writers-room': ('/api/scene-writers-room/3', {'outline': OUTLINE, 'projectId': PROJECT_ID, 'fusedAnalysis': True}),
+    'store-scene': ('/api/scene-vector-info/4', {'outline': OUTLINE, 'sceneScript': SCENE_SCRIPT, 'projectId': PROJECT_ID})
+}
+
+def _sample(schema):
+    """Returns a minimal value matching a JSON Schema (subset), for structured-output prompts."""
+    kind = schema.get('type')
+    if kind == 'object':
+        return {name: _sample(property_schema) for name, property_schema in schema.get('properties', {}).items()}
+    if kind == 'array':
+        return [_sample(schema.get('items', {'type': 'string'}))]
+    if kind == 'boolean':
+        return True
+    if kind in ('integer', 'number'):
+        return 1
+    return 'Dana'
+
+def _fake_response(prompt_messages):
+    prompt = prompt_messages[-1]['content']
+    if SCHEMA_MARKER in prompt:
+        content = _sample(json.loads(prompt.split(SCHEMA_MARKER, 1)[1]))
+        if 'summary' in content:
+            # A distinct summary per scene, so storing it really embeds it
+            content['summary'] = f"Simulated summary {hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]}"
+        content = json.dumps(content)
+    else:
+        # Free-text helpers parse a verdict line ("Yes"/"No") under a heading
+        content = f"Consistent\nYes\nSimulated response to a {len(prompt)}-character prompt."
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(total_tokens=100)
+    )
+
+def fake_openai_clients(latency):
+    """Returns (OpenAI, AsyncOpenAI) stand-ins whose completions take `latency` seconds."""
+    class FakeOpenAI:
+        def __init__(self, api_key=None, **kwargs):
+            self.api_key = api_key
+
+            def create(messages, **request):
+                time.sleep(latency)
+                return _fake_response(messages)
+
+            self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+        def close(self):
+            pass
+
+    class FakeAsyncOpenAI:
+        def __init__(self, api_key=None, **kwargs):
+            self.api_key = api_key
+
+            async def create(messages, **request):
+                await asyncio.sleep(latency)
+                return _fake_response(messages)
+
+            self.chat = SimpleNamespace(completions=SimpleNamespace(create=create))
+
+    return FakeOpenAI, FakeAsyncOpenAI
+
+class FakeEmbeddingBackend:
+    """Embedding backend whose `encode` takes `latency` seconds, like a small model on a CPU."""
+
+    name = 'load-test'
+
+    def __init__(self, latency, dimension=384):
+        self.latency = latency
+        self.dimension = dimension
+
+    def get_sentence_embedding_dimension(self):
+        return self.dimension
+
+    def _vector(self, text):
+        seed = int.from_bytes(hashlib.sha256(text.encode('utf-8')).digest()[:4], 'little')
+        vector = np.random.default_rng(seed).normal(size=self.dimension).astype('float32')
+        return vector / np.linalg.norm(vector)
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        time.sleep(self.latency)
+        if isinstance(sentences, str):
+            return self._vector(sentences)
+        return np.stack([self._vector(text) for text in sentences])
+
+def seed_project(projects, embedding_model, num_scenes=3):
+    """Stores `num_scenes` prior scenes in the load-test project so agents have history to retrieve."""
+    from vector_db_utils import add_scene_to_vector_db
+
+    with projects.project(PROJECT_ID) as project:
+        for scene_number in range(1, num_scenes + 1):
+            add_scene_to_vector_db(
+                {
+                    'summary': f"Scene {scene_number}: Dana and Mike escalate the thermostat war.",
+                    'characters': ['Dana', 'Mike'],
+                    'location': 'Apartment',
+                    'recurring_joke': 'The thermostat',
+                    'emotional_tone': 'Petty'
+                },
+                full_script=SCENE_SCRIPT,
+                embedding_model=embedding_model,
+                profile_store=project.profile_store,
+                vector_store=project.vector_store,
+                scene_number=scene_number,
+                script_store=project.script_store
+            )
+
+class ThreadSampler:
+    """Records the peak number of live threads while in use."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+def summarize(mode, latencies, failures, wall_seconds, peak_threads=None):
+    latencies = sorted(latencies)
+    return {
+        'mode': mode,
+        'requests': len(latencies) + failures,
+        'failures': failures,
+        'wall_seconds': wall_seconds,
+        'throughput': len(latencies) / wall_seconds if wall_seconds else 0.0,
+        'p50_seconds': statistics.median(latencies) if latencies else None,
+        'p95_seconds': latencies[min(len(latencies) - 1, int(0.95 * len(latencies)))] if latencies else None,
+        'peak_threads': peak_threads
+    }
+
+_takes = itertools.count(1)
+
+def request_payloads(payload, num_requests):
+    """Gives every request (across modes) its own scene text, so embeddings are not served from the cache."""
+    payloads = []
+    for _ in range(num_requests):
+        take = next(_takes)
+        payloads.append({
+            **payload,
+            **{field: f"{payload[field]} (take {take})" for field in ('outline', 'sceneScript') if field in payload}
+        })
+    return payloads
+
+def run_flask(flask_app, num_requests, threads, path, payload):
+    """Sends `num_requests` POSTs to `path` through the Flask app on `threads` worker threads."""
+    payloads = request_payloads(payload, num_requests)
+
+    def send(i):
+        start = time.perf_counter()
+        response = flask_app.test_client().post(path, json=payloads[i])
+        return response.status_code == 200, time.perf_counter() - start
+
+    with ThreadSampler() as sampler:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            outcomes = list(executor.map(send, range(num_requests)))
+        wall_seconds = time.perf_counter() - start
+
+    latencies = [seconds for ok, seconds in outcomes if ok]
+    return summarize(f'flask ({threads} threads)', latencies, num_requests - len(latencies), wall_seconds,
+                     sampler.peak)
+
+async def send_concurrently(client, num_requests, path, payload):
+    async def send(body):
+        start = time.perf_counter()
+        try:
+            response = await client.post(path, json=body)
+            ok = response.status_code == 200
+        except Exception:
+            ok = False
+        return ok, time.perf_counter() - start
+
+    return await asyncio.gather(*(send(body) for body in request_payloads(payload, num_requests)))
+
+def run_asgi(asgi_app, num_requests, path, payload):
+    """Sends `num_requests` POSTs to `path` on the ASGI app concurrently on one event loop."""
+    import httpx
+
+    async def main():
+        transport = httpx.ASGITransport(app=asgi_app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://load-test', timeout=None) as client:
+            return await send_concurrently(client, num_requests, path, payload)
+
+    with ThreadSampler() as sampler:
+        start = time.perf_counter()
+        outcomes = asyncio.run(main())
+        wall_seconds = time.perf_counter() - start
+
+    latencies = [seconds for ok, seconds in outcomes if ok]
+    return summarize('asgi', latencies, num_requests - len(latencies), wall_seconds, sampler.peak)
+
+def run_live(url, num_requests, path, payload):
+    """Sends `num_requests` concurrent POSTs to `path` on a running server."""
+    import httpx
+
+    async def main():
+        async with httpx.AsyncClient(base_url=url, timeout=None) as client:
+            return await send_concurrently(client, num_requests, path, payload)
+
+    start = time.perf_counter()
+    outcomes = asyncio.run(main())
+    wall_seconds = time.perf_counter() - start
+    latencies = [seconds for ok, seconds in outcomes if ok]
+    return summarize(url, latencies, num_requests - len(latencies), wall_seconds)
+
+def simulate(num_requests=200, threads=16, latency=2.0, scenario='generate-scene', encode_latency=0.05):
+    """
+    Runs the in-process comparison against a simulated OpenAI API and embedding model.
+
+    Args:
+        num_requests (int): Concurrent requests per mode (default: 200).
+        threads (int): Worker threads serving the Flask app (default: 16).
+        latency (float): Seconds per simulated completion (default: 2.0).
+        scenario (str): Key of SCENARIOS to send (default: 'generate-scene').
+        encode_latency (float): Seconds per simulated `encode` call (default: 0.05).
+
+    Returns:
+        List[dict]: One row per mode with 'mode', 'requests', 'failures', 'wall_seconds',
+        'throughput' (requests/s), 'p50_seconds', 'p95_seconds' and 'peak_threads'.
+    """
+    import openai
+
+    # Let the concurrency cap admit every request so the serving model is what is measured
+    os.environ.setdefault('LLM_MAX_CONCURRENCY', str(2 * num_requests))
+    os.environ.setdefault('EMBEDDING_WARMUP', '0')
+    # Keep the simulated projects and embedding cache out of the real data directories
+    data_dir = tempfile.mkdtemp(prefix='load-test-')
+    os.environ['PROJECT_STORE_DIR'] = os.path.join(data_dir, 'projects')
+    os.environ['EMBEDDING_CACHE_DIR'] = os.path.join(data_dir, 'embedding_cache')
+    openai.OpenAI, openai.AsyncOpenAI = fake_openai_clients(latency)
+
+    import app
+    from asgi import app as asgi_app
+
+    # The lazily loaded embedding model is built by app.load_embedding_backend on first use
+    app.load_embedding_backend = lambda *args, **kwargs: FakeEmbeddingBackend(encode_latency)
+    seed_project(app.projects, app.embedding_model)
+
+    path, request = SCENARIOS[scenario]
+    payload = {**request, 'apiKey': 'sk-load-test'}
+    return [
+        run_flask(app.app, num_requests, threads, path, payload),
+        run_asgi(asgi_app, num_requests, path, payload)
+    ]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Concurrent request capacity of app.py vs asgi.py')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), default='generate-scene', help='Route to load')
+    parser.add_argument('--requests', type=int, default=200, help='Concurrent requests per mode')
+    parser.add_argument('--threads', type=int, default=16, help='Flask worker threads (simulation only)')
+    parser.add_argument('--latency', type=float, default=2.0, help='Seconds per simulated completion')
+    parser.add_argument('--encode-latency', type=float, default=0.05, help='Seconds per simulated embedding call')
+    parser.add_argument('--url', help='Load test a running server instead of simulating')
+    parser.add_argument('--api-key', default=os.getenv('OPENAI_API_KEY'), help='API key sent with --url')
+    args = parser.parse_args()
+
+    if args.url:
+        if not args.api_key:
+            sys.exit('--url needs --api-key or OPENAI_API_KEY')
+        path, request = SCENARIOS[args.scenario]
+        rows = [run_live(args.url, args.requests, path, {**request, 'apiKey': args.api_key})]
+    else:
+        rows = simulate(args.requests, args.threads, args.latency, args.scenario, args.encode_latency)
+
+    print(f"{'mode':<28}{'ok':>6}{'failed':>8}{'wall s':>9}{'req/s':>9}{'p50 s':>8}{'p95 s':>8}{'threads':>9}")
+    for row in rows:
+        p50 = f"{row['p50_seconds']:.2f}" if row['p50_seconds'] is not None else '-'
+        p95 = f"{row['p95_seconds']:.2f}" if row['p95_seconds'] is not None else '-'
+        threads = row['peak_threads'] if row['peak_threads'] is not None else '-'
+        print(f"{row['mode']:<28}{row['requests'] - row['failures']:>6}{row['failures']:>8}"
+              f"{row['wall_seconds']:>9.2f}{row['throughput']:>9.2f}{p50:>8}{p95:>8}{threads:>9}")
@@ -0,0 +1,280 @@
+import asyncio
+import json
+import os
+import threading
+from typing import Dict, List, Optional
+
+from character_helpers import (
+    aretrieve_character_history,
+    aupdate_character_profile,
+    retrieve_character_history,
+    update_character_profile
+)
+from rate_limiter import FairSemaphore
+
+REFOLD_CHUNK_SCENES = 5  # Scene summaries sent per profile call, so a rebuild costs more calls rather than a longer prompt
+
+
+def _scene_fields(key: str) -> Dict:
+    """Splits a scene key ("<episode>:<scene_number>" or "<scene_number>") into scene metadata fields."""
+    episode, _, scene_number = key.rpartition(":")
+    fields = {"scene_number": int(scene_number) if scene_number.isdigit() else scene_number}
+    if episode:
+        fields["episode"] = int(episode) if episode.isdigit() else episode
+    return fields
+
+
+class CharacterProfileStore:
+    """
+    Persistent per-character profiles that are updated incrementally as scenes are ingested.
+
+    `add_scene_to_vector_db` calls `record_scene` for every new scene. Each character in the
+    scene gets the scene queued as a new appearance. The next time the profile is read, only
+    the queued summaries are folded into it (one LLM call). A profile is rebuilt from scratch
+    only when a scene that already contained the character changes. Summaries are folded
+    REFOLD_CHUNK_SCENES at a time, so neither a rebuild nor a large backlog ever sends the
+    whole season in one prompt. Every update bumps the profile's `version`.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initializes the CharacterProfileStore.
+
+        Args:
+            path: Optional JSON file used to persist profiles across runs. If the file exists,
+                  profiles are loaded from it.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._character_locks = {}
+        self._profiles = {}         # character -> profile entry
+        self._scene_characters = {} # scene key -> characters in that scene
+
+        if path and os.path.exists(path):
+            self.load()
+
+    def record_scene(self, scene_key, scene_metadata: Dict) -> None:
+        """
+        Registers a newly ingested (or re-ingested) scene.
+
+        Args:
+            scene_key: Stable identifier of the scene (e.g., its scene number).
+            scene_metadata: Scene metadata containing 'summary' and 'characters'.
+        """
+        key = str(scene_key)
+        summary = scene_metadata.get("summary", "")
+        characters = list(scene_metadata.get("characters", []))
+
+        with self._lock:
+            # Characters dropped from a changed scene must be rebuilt without it
+            for character in self._scene_characters.get(key, []):
+                if character not in characters and character in self._profiles:
+                    entry = self._profiles[character]
+                    entry["scenes"].pop(key, None)
+                    entry["needs_rebuild"] = True
+
+            for character in characters:
+                entry = self._profiles.setdefault(character, {
+                    "character": character,
+                    "profile": None,
+                    "version": 0,
+                    "scenes": {},
+                    "folded": [],
+                    "needs_rebuild": False
+                })
+                if key in entry["scenes"] and entry["scenes"][key] != summary:
+                    entry["needs_rebuild"] = True
+                entry["scenes"][key] = summary
+
+            self._scene_characters[key] = characters
+
+        self.save()
+
+    def remove_scene(self, scene_key) -> None:
+        """
+        Forgets a deleted scene; profiles of the characters in it are rebuilt without it.
+
+        Args:
+            scene_key: Identifier the scene was recorded under.
+        """
+        key = str(scene_key)
+        with self._lock:
+            for character in self._scene_characters.pop(key, []):
+                entry = self._profiles.get(character)
+                if entry is not None and key in entry["scenes"]:
+                    entry["scenes"].pop(key)
+                    entry["needs_rebuild"] = True
+
+        self.save()
+
+    def is_stale(self, character: str) -> bool:
+        """Returns True if the character's profile has unfolded scenes or needs a rebuild."""
+        with self._lock:
+            entry = self._profiles.get(character)
+            if entry is None:
+                return False
+            return (
+                entry["profile"] is None
+                or entry["needs_rebuild"]
+                or any(key not in entry["folded"] for key in entry["scenes"])
+            )
+
+    def get_profile(self, client, character: str) -> Optional[Dict]:
+        """
+        Returns the up-to-date profile for a character, folding in any new appearances first.
+
+        Args:
+            client: OpenAI client instance (only used if the profile needs updating).
+            character: Name of the character.
+
+        Returns:
+            Dict with 'character', 'profile', 'source_summaries', 'source_scenes' (the 'episode'
+            and 'scene_number' of each appearance) and 'version', or None if
+            the character has not appeared in any ingested scene.
+        """
+        with self._lock:
+            if character not in self._profiles or not self._profiles[character]["scenes"]:
+                return None
+            character_lock = self._character_locks.setdefault(character, FairSemaphore(1))
+
+        with character_lock:
+            if self.is_stale(character):
+                self._update(client, character)
+            return self._profile_result(character)
+
+    async def aget_profile(self, client, character: str) -> Optional[Dict]:
+        """
+        Async version of `get_profile` (see `achat_completion` for client handling).
+
+        If another update of the same profile is in flight, this waits for it on the event
+        loop instead of blocking it.
+        """
+        with self._lock:
+            if character not in self._profiles or not self._profiles[character]["scenes"]:
+                return None
+            character_lock = self._character_locks.setdefault(character, FairSemaphore(1))
+
+        async with character_lock:
+            if self.is_stale(character):
+                await self._aupdate(client, character)
+            return self._profile_result(character)
+
+    def _profile_result(self, character: str) -> Dict:
+        with self._lock:
+            entry = self._profiles[character]
+            return {
+                "character": character,
+                "profile": entry["profile"],
+                "source_summaries": list(entry["scenes"].values()),
+                "source_scenes": [_scene_fields(key) for key in entry["scenes"]],
+                "version": entry["version"]
+            }
+
+    def refresh(self, client, characters: Optional[List[str]] = None) -> None:
+        """
+        Eagerly updates stale profiles.
+
+        Args:
+            client: OpenAI client instance.
+            characters: Characters to refresh (default: every stored character).
+        """
+        with self._lock:
+            names = list(self._profiles.keys()) if characters is None else list(characters)
+
+        for character in names:
+            if self.is_stale(character):
+                self.get_profile(client, character)
+
+    def _update_plan(self, character: str):
+        with self._lock:
+            entry = self._profiles[character]
+            scenes = dict(entry["scenes"])
+            rebuild = entry["profile"] is None or entry["needs_rebuild"]
+            keys = list(scenes) if rebuild else [key for key in scenes if key not in entry["folded"]]
+            profile = None if rebuild else entry["profile"]
+
+        chunks = [keys[i:i + REFOLD_CHUNK_SCENES] for i in range(0, len(keys), REFOLD_CHUNK_SCENES)]
+        return scenes, profile, chunks
+
+    @staticmethod
+    def _history_kwargs(character: str, scenes: Dict, chunk: List[str]) -> Dict:
+        return {
+            "character": character,
+            "vector_metadata": [
+                {**_scene_fields(key), "summary": scenes[key], "characters": [character]}
+                for key in chunk
+            ],
+            "current_scene_description": "",
+            "num_scenes": len(chunk)
+        }
+
+    @staticmethod
+    def _fold_kwargs(character: str, scenes: Dict, profile: str, chunk: List[str]) -> Dict:
+        return {
+            "character": character,
+            "existing_profile": profile,
+            "new_scenes": [{**_scene_fields(key), "summary": scenes[key]} for key in chunk]
+        }
+
+    def _update(self, client, character: str) -> None:
+        scenes, profile, chunks = self._update_plan(character)
+        for chunk in chunks:
+            if profile is None:
+                profile = retrieve_character_history(
+                    client=client, **self._history_kwargs(character, scenes, chunk)
+                )["profile"]
+            else:
+                profile = update_character_profile(client=client, **self._fold_kwargs(character, scenes, profile, chunk))
+        self._apply_update(character, scenes, profile)
+        self.save()
+
+    async def _aupdate(self, client, character: str) -> None:
+        scenes, profile, chunks = self._update_plan(character)
+        for chunk in chunks:
+            if profile is None:
+                profile = (await aretrieve_character_history(
+                    client=client, **self._history_kwargs(character, scenes, chunk)
+                ))["profile"]
+            else:
+                profile = await aupdate_character_profile(
+                    client=client, **self._fold_kwargs(character, scenes, profile, chunk)
+                )
+        self._apply_update(character, scenes, profile)
+        await asyncio.to_thread(self.save)  # Serializes every profile; keep it off the event loop
+
+    def _apply_update(self, character: str, scenes: Dict, profile: str) -> None:
+        with self._lock:
+            entry = self._profiles[character]
+            entry["profile"] = profile
+            entry["folded"] = list(scenes.keys())
+            entry["version"] += 1
+            # A scene may have changed again while the LLM call was in flight
+            entry["needs_rebuild"] = any(entry["scenes"].get(key) != summary for key, summary in scenes.items())
+
+    def save(self) -> None:
+        """Writes all profiles to `path` (no-op for in-memory stores)."""
+        if not self.path:
+            return
+        with self._lock:
+            payload = {"profiles": self._profiles, "scene_characters": self._scene_characters}
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.path)
+
+    def copy(self) -> "CharacterProfileStore":
+        """Returns an in-memory copy of the store (e.g., to give several runs the same starting profiles)."""
+        with self._lock:
+            payload = json.loads(json.dumps({"profiles": self._profiles, "scene_characters": self._scene_characters}))
+        store = CharacterProfileStore()
+        store._profiles = payload["profiles"]
+        store._scene_characters = payload["scene_characters"]
+        return store
+
+    def load(self) -> None:
+        """Loads profiles from `path`."""
+        with open(self.path, "r", encoding="utf-8") as f:
+            payload = json.load(f)
+        with self._lock:
+            self._profiles = payload.get("profiles", {})
+            self._scene_characters = payload.get("scene_characters", {})
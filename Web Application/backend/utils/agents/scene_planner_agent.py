@@ -1,6 +1,48 @@
 
-import time
 from typing import List
+from llm_gateway import achat_completion, chat_completion
+
+def _scene_plan_prompt(character_recommendations, comedic_recommendations, environment_recommendations, scene_number):
+    return f"""
+You are the Executive Producer of a sitcom. Your agents have just provided feedback on Scene {scene_number}.
+
+They offered targeted **recommendations** in three categories: character, comedy, and environment.
+
+Your job is to **synthesize** these inputs — don't just repeat them. Instead, extract the most relevant themes and rewrite them as clear, concise next-scene objectives.
+
+Character Recommendations:
+{character_recommendations}
+
+Comedic Recommendations:
+{comedic_recommendations}
+
+Environment Recommendations:
+{environment_recommendations}
+
+Tasks:
+- Write **2 Character Goals** based on the above character recommendations.
+- Write **1 Comedic Goal** inspired by the tone, running gags, or humor critiques above.
+- Write **1 Environment Detail** that builds on the suggestions without repeating them verbatim.
+- Propose **1 Creative Suggestion** for how the scene could naturally progress, integrating the above goals.
+
+Each should be specific, natural, and sitcom-appropriate for a 2–3 minute scene.
+
+Format:
+Scene Plan:
+Character Goals:
+- [Goal 1]
+- [Goal 2]
+
+Comedic Goal:
+- [Goal]
+
+Environment Detail:
+- [Detail]
+
+Creative Suggestion:
+- [Suggestion]
+"""
+
 
 class ScenePlannerAgent:
     def __init__(self, client):
@@ -48,65 +90,58 @@ class ScenePlannerAgent:
             ValueError: If the API response is empty or malformed.
             Exception: After 3 failed retry attempts or other runtime issues.
         """
-        prompt = f"""
-You are the Executive Producer of a sitcom. Your agents have just provided feedback on Scene {scene_number}.
-
-They offered targeted **recommendations** in three categories: character, comedy, and environment.
-
-Your job is to **synthesize** these inputs — don't just repeat them. Instead, extract the most relevant themes and rewrite them as clear, concise next-scene objectives.
-
-Character Recommendations:
-{character_recommendations}
-
-Comedic Recommendations:
-{comedic_recommendations}
-
-Environment Recommendations:
-{environment_recommendations}
-
-Tasks:
-- Write **2 Character Goals** based on the above character recommendations.
-- Write **1 Comedic Goal** inspired by the tone, running gags, or humor critiques above.
-- Write **1 Environment Detail** that builds on the suggestions without repeating them verbatim.
-- Propose **1 Creative Suggestion** for how the scene could naturally progress, integrating the above goals.
-
-Each should be specific, natural, and sitcom-appropriate for a 2–3 minute scene.
-
-Format:
-Scene Plan:
-Character Goals:
-- [Goal 1]
-- [Goal 2]
-
-Comedic Goal:
-- [Goal]
-
-Environment Detail:
-- [Detail]
-
-Creative Suggestion:
-- [Suggestion]
-"""
-
-        for attempt in range(3):
-            try:
-                response = self.client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=0.7,
-                    top_p=0.9
-                )
-
-                if not response or not response.choices or not response.choices[0].message.content:
-                    raise ValueError("Received an empty or malformed scene plan response.")
-
-                scene_plan = response.choices[0].message.content.strip()
-                self.internal_thoughts.append(f"✅ Scene {scene_number} plan generated successfully.")
-                return scene_plan
-
-            except Exception as e:
-                if attempt == 2:
-                    error_msg = f"❌ Failed to generate scene plan for Scene {scene_number}: {str(e)}"
-                    self.internal_thoughts.append(error_msg)
-                    raise Exception(error_msg)
-                time.sleep(2 ** attempt)
+        prompt = _scene_plan_prompt(
+            character_recommendations,
+            comedic_recommendations,
+            environment_recommendations,
+            scene_number
+        )
+
+        try:
+            scene_plan = chat_completion(
+                self.client,
+                prompt,
+                model="gpt-4",
+                temperature=0.7,
+                top_p=0.9
+            )
+        except Exception as e:
+            error_msg = f"❌ Failed to generate scene plan for Scene {scene_number}: {str(e)}"
+            self.internal_thoughts.append(error_msg)
+            raise Exception(error_msg)
+
+        self.internal_thoughts.append(f"✅ Scene {scene_number} plan generated successfully.")
+        return scene_plan
+
+    async def aplan_next_scene(
+        self,
+        character_recommendations: str,
+        comedic_recommendations: str,
+        environment_recommendations: str,
+        scene_number: int
+    ) -> str:
+        """
+        Async version of `plan_next_scene` (see `achat_completion` for client handling).
+        """
+        prompt = _scene_plan_prompt(
+            character_recommendations,
+            comedic_recommendations,
+            environment_recommendations,
+            scene_number
+        )
+
+        try:
+            scene_plan = await achat_completion(
+                self.client,
+                prompt,
+                model="gpt-4",
+                temperature=0.7,
+                top_p=0.9
+            )
+        except Exception as e:
+            error_msg = f"❌ Failed to generate scene plan for Scene {scene_number}: {str(e)}"
+            self.internal_thoughts.append(error_msg)
+            raise Exception(error_msg)
+
+        self.internal_thoughts.append(f"✅ Scene {scene_number} plan generated successfully.")
+        return scene_plan
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import re
+import threading
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Persistent embedding cache keyed by (model name, sha256(text)).
+
+    Vectors live in a raw float32 file that is memory-mapped for reads; a companion text
+    file lists one SHA-256 hash per row and is loaded into a dict on startup. New vectors
+    are appended to both files, so re-encoding a regenerated scene or re-ingesting an
+    episode costs a dictionary lookup instead of a forward pass.
+    """
+
+    def __init__(self, directory, model_name, dimension):
+        """
+        Opens (or creates) the cache files for one embedding model.
+
+        Args:
+            directory (str): Directory for the cache files.
+            model_name (str): Name of the embedding model (part of the cache key).
+            dimension (int): Embedding dimension of the model.
+        """
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r"[^A-Za-z0-9_.-]", "_", model_name)
+
+        self.model_name = model_name
+        self.dimension = dimension
+        self._vectors_path = os.path.join(directory, f"{slug}.f32")
+        self._hashes_path = os.path.join(directory, f"{slug}.hashes")
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._vectors = None
+
+        if os.path.exists(self._hashes_path):
+            valid_hash_bytes = 0
+            with open(self._hashes_path, "rb") as f:
+                for row, line in enumerate(f):
+                    if len(line) != 65 or not line.endswith(b"\n"):
+                        break  # Torn write; keep only complete hash lines
+                    self._rows[line[:64].decode("ascii")] = row
+                    valid_hash_bytes += len(line)
+            if os.path.getsize(self._hashes_path) > valid_hash_bytes:
+                with open(self._hashes_path, "r+b") as f:
+                    f.truncate(valid_hash_bytes)
+
+        # Vectors are written before their hashes, so drop any rows without a hash (crash mid-append)
+        row_bytes = 4 * dimension
+        valid_bytes = len(self._rows) * row_bytes
+        if os.path.exists(self._vectors_path) and os.path.getsize(self._vectors_path) > valid_bytes:
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(valid_bytes)
+        self._remap()
+
+    def _remap(self):
+        count = len(self._rows)
+        if count == 0:
+            self._vectors = None
+            return
+        self._vectors = np.memmap(self._vectors_path, dtype="float32", mode="r", shape=(count, self.dimension))
+
+    def key(self, text):
+        """Returns the SHA-256 key for a text (the model name is implied by the cache file)."""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, texts):
+        """
+        Looks up cached embeddings.
+
+        Returns:
+            List: One float32 vector per text, or None for texts that are not cached.
+        """
+        with self._lock:
+            vectors = self._vectors
+            rows = [self._rows.get(self.key(text)) for text in texts]
+            return [np.array(vectors[row]) if row is not None else None for row in rows]
+
+    def put_many(self, texts, embeddings):
+        """Appends embeddings for texts that are not already cached."""
+        embeddings = np.asarray(embeddings, dtype="float32").reshape(len(texts), self.dimension)
+        with self._lock:
+            new_keys, new_rows = [], []
+            for text, embedding in zip(texts, embeddings):
+                key = self.key(text)
+                if key in self._rows or key in new_keys:
+                    continue
+                new_keys.append(key)
+                new_rows.append(embedding)
+            if not new_keys:
+                return
+
+            with open(self._vectors_path, "ab") as f:
+                f.write(np.ascontiguousarray(new_rows, dtype="float32").tobytes())
+            with open(self._hashes_path, "a", encoding="ascii") as f:
+                f.write("".join(f"{key}\n" for key in new_keys))
+
+            start = len(self._rows)
+            for offset, key in enumerate(new_keys):
+                self._rows[key] = start + offset
+            self._remap()
+
+    def __len__(self):
+        return len(self._rows)
+
+
+class CachedEmbeddingModel:
+    """
+    Wraps an embedding model (e.g., SentenceTransformer) so `encode` consults an EmbeddingCache first.
+
+    It is a drop-in replacement for the `embedding_model` argument of the vector DB helpers:
+    only texts that miss the cache are sent to the underlying model, in a single batch.
+    """
+
+    def __init__(self, model, cache):
+        """
+        Initializes the CachedEmbeddingModel.
+
+        Args:
+            model: Underlying embedding model with `encode` and `get_sentence_embedding_dimension`.
+            cache (EmbeddingCache): Cache for this model's embeddings.
+        """
+        self.model = model
+        self.cache = cache
+
+    def get_sentence_embedding_dimension(self):
+        """Returns the embedding dimension of the underlying model."""
+        return self.cache.dimension
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """
+        Encodes a string or list of strings, reusing cached embeddings where possible.
+
+        Returns:
+            np.ndarray: A 1-D vector for a single string, or a 2-D array for a list.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        vectors = self.cache.get_many(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            encoded = np.asarray(
+                self.model.encode(missing_texts, batch_size=batch_size, **kwargs),
+                dtype="float32"
+            ).reshape(len(missing_texts), -1)
+            self.cache.put_many(missing_texts, encoded)
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+
+        if not texts:
+            return np.empty((0, self.cache.dimension), dtype="float32")
+        result = np.stack(vectors).astype("float32", copy=False)
+        return result[0] if single else result
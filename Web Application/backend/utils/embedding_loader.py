@@ -0,0 +1,72 @@
+import threading
+
+
+class LazyEmbeddingModel:
+    """
+    Embedding model that is only constructed on first use (or by an optional warm-up thread).
+
+    Importing torch and loading a SentenceTransformer takes seconds, so a server that creates
+    it at import time pays that cost before it can answer any request. This wrapper defers
+    construction to the first `encode` call, exposes `is_ready` for health checks, and can
+    warm the model up in a background thread so the first embedding request does not wait.
+    """
+
+    def __init__(self, factory):
+        """
+        Initializes the LazyEmbeddingModel.
+
+        Args:
+            factory: Zero-argument callable that builds and returns the real embedding model.
+        """
+        self._factory = factory
+        self._model = None
+        self._error = None
+        self._lock = threading.Lock()
+        self._warmup_thread = None
+
+    def load(self):
+        """Builds the model if needed (thread-safe) and returns it."""
+        if self._model is not None:
+            return self._model
+        with self._lock:
+            if self._model is None:
+                try:
+                    self._model = self._factory()
+                    self._error = None
+                except Exception as e:
+                    self._error = str(e)
+                    raise
+        return self._model
+
+    def warm_up(self):
+        """Starts loading the model in a daemon thread. Safe to call more than once."""
+        with self._lock:
+            if self._model is not None or self._warmup_thread is not None:
+                return
+            self._warmup_thread = threading.Thread(target=self._warm_up, name="embedding-warmup", daemon=True)
+            self._warmup_thread.start()
+
+    def _warm_up(self):
+        try:
+            self.load()
+        except Exception:
+            pass  # Recorded in `error`; the next request retries the load
+
+        with self._lock:
+            self._warmup_thread = None
+
+    @property
+    def is_ready(self):
+        """True once the model has been loaded."""
+        return self._model is not None
+
+    @property
+    def error(self):
+        """Error message from the last failed load, if any."""
+        return self._error
+
+    def encode(self, sentences, *args, **kwargs):
+        return self.load().encode(sentences, *args, **kwargs)
+
+    def get_sentence_embedding_dimension(self):
+        return self.load().get_sentence_embedding_dimension()
@@ -0,0 +1,261 @@
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+# queued -> running -> completed | failed | cancelled; jobs stopped by a shutdown or restart become "interrupted"
+ACTIVE_STATUSES = ("queued", "running")
+RESUMABLE_STATUSES = ("failed", "cancelled", "interrupted")
+
+
+class EpisodeJobManager:
+    """
+    Runs full-episode generation jobs on background worker threads.
+
+    A job walks an outline's scenes in order and calls `scene_step` for each one (writers'
+    room, plan, write and store are left to the caller). After every scene the job is
+    checkpointed to a JSON file, so progress can be polled at any time, survives the
+    client going away, and a job that failed, was cancelled or was cut off by a restart
+    can be resumed from the first unfinished scene.
+    """
+
+    def __init__(self, job_dir, scene_step, max_workers=2):
+        """
+        Initializes the manager and loads existing jobs from `job_dir`.
+
+        Args:
+            job_dir (str): Directory holding one JSON checkpoint per job.
+            scene_step (callable): `scene_step(client, job, scene_number, report)` generates and
+                stores one scene and returns a dict with at least 'script' (plus any other
+                JSON-serializable results to keep per scene). `job` is a snapshot of the job
+                state (including 'outline' and the 'scenes' written so far), and
+                `report(step)` publishes the step in progress.
+            max_workers (int): Number of jobs that run at the same time (default: 2).
+        """
+        os.makedirs(job_dir, exist_ok=True)
+        self.job_dir = job_dir
+        self.scene_step = scene_step
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="episode-job")
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._cancelled = set()
+        self._stopping = threading.Event()
+        self._load()
+        # Interpreter exit joins the executor's workers before atexit handlers run, so stop the
+        # jobs from a threading exit hook, which runs first
+        threading._register_atexit(self.close)
+
+    def _path(self, job_id):
+        return os.path.join(self.job_dir, f"{job_id}.json")
+
+    def _load(self):
+        for name in os.listdir(self.job_dir):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(self.job_dir, name), "r", encoding="utf-8") as f:
+                job = json.load(f)
+            if job["status"] in ACTIVE_STATUSES:
+                # The process stopped mid-job; it needs an API key again to resume
+                job["status"] = "interrupted"
+                job["current_step"] = None
+            self._jobs[job["job_id"]] = job
+
+    def _save(self, job):
+        # Called with the lock held
+        job["updated_at"] = time.time()
+        path = self._path(job["job_id"])
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(job, f)
+        os.replace(f"{path}.tmp", path)
+
+    def submit(self, client, project_id, outline, scene_numbers, title=None, episode=1):
+        """
+        Creates a job and queues it.
+
+        Args:
+            client: OpenAI client used for every call in the job (never persisted).
+            project_id (str): Project whose vector store receives the scenes.
+            outline (str): Full episode outline.
+            scene_numbers (List[int]): Scenes to generate, in order.
+            title (str, optional): Sitcom title.
+            episode (int): Episode number (default: 1).
+
+        Returns:
+            dict: Status of the new job (see `status`).
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "project_id": project_id,
+            "episode": episode,
+            "title": title,
+            "outline": outline,
+            "scene_numbers": list(scene_numbers),
+            "completed_scenes": [],
+            "scenes": {},
+            "results": {},
+            "status": "queued",
+            "current_scene": None,
+            "current_step": None,
+            "error": None,
+            "created_at": time.time()
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._save(job)
+        self._executor.submit(self._run, job_id, client)
+        return self.status(job_id)
+
+    def resume(self, job_id, client):
+        """
+        Re-queues a failed, cancelled or interrupted job; finished scenes are not regenerated.
+
+        Returns:
+            dict: The job's status, or None if the job does not exist.
+
+        Raises:
+            ValueError: If the job is still active or already completed.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] not in RESUMABLE_STATUSES:
+                raise ValueError(f"Job is {job['status']} and cannot be resumed.")
+            job["status"] = "queued"
+            job["error"] = None
+            self._cancelled.discard(job_id)
+            self._save(job)
+        self._executor.submit(self._run, job_id, client)
+        return self.status(job_id)
+
+    def cancel(self, job_id):
+        """
+        Stops a job after the scene in progress (which is still checkpointed).
+
+        Returns:
+            dict: The job's status, or None if the job does not exist.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] == "queued":
+                # Its worker skips a job that is no longer queued
+                job["status"] = "cancelled"
+                self._save(job)
+            elif job["status"] in ACTIVE_STATUSES:
+                self._cancelled.add(job_id)
+        return self.status(job_id)
+
+    def status(self, job_id, include_scenes=False):
+        """
+        Returns a job's progress.
+
+        Args:
+            job_id (str): Job identifier.
+            include_scenes (bool): Also return the scripts and per-scene results written so far.
+
+        Returns:
+            dict with 'job_id', 'project_id', 'episode', 'status', 'total_scenes',
+            'completed_scenes', 'progress' (0-1), 'current_scene', 'current_step' and 'error'
+            (plus 'scenes' and 'results' keyed by scene number with `include_scenes`), or None
+            if the job does not exist.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            total = len(job["scene_numbers"])
+            status = {
+                "job_id": job_id,
+                "project_id": job["project_id"],
+                "episode": job["episode"],
+                "status": job["status"],
+                "total_scenes": total,
+                "completed_scenes": list(job["completed_scenes"]),
+                "progress": len(job["completed_scenes"]) / total if total else 1.0,
+                "current_scene": job["current_scene"],
+                "current_step": job["current_step"],
+                "error": job["error"]
+            }
+            if include_scenes:
+                status["scenes"] = dict(job["scenes"])
+                status["results"] = dict(job["results"])
+            return status
+
+    def _snapshot(self, job_id):
+        with self._lock:
+            return json.loads(json.dumps(self._jobs[job_id]))
+
+    def _update(self, job_id, save=False, **changes):
+        with self._lock:
+            job = self._jobs[job_id]
+            job.update(changes)
+            if save:
+                self._save(job)
+
+    def _finish(self, job_id, **changes):
+        # Records a terminal status; a pending cancel request no longer applies
+        with self._lock:
+            self._cancelled.discard(job_id)
+            job = self._jobs[job_id]
+            job.update(changes, current_step=None)
+            self._save(job)
+
+    def _run(self, job_id, client):
+        with self._lock:
+            job = self._jobs[job_id]
+            if job["status"] != "queued":
+                return
+            job["status"] = "running"
+            self._save(job)
+
+        try:
+            for scene_number in self._snapshot(job_id)["scene_numbers"]:
+                job = self._snapshot(job_id)
+                if scene_number in job["completed_scenes"]:
+                    continue
+                if job_id in self._cancelled:
+                    self._finish(job_id, status="cancelled", current_scene=None)
+                    return
+                if self._stopping.is_set():
+                    self._finish(job_id, status="interrupted", current_scene=None)
+                    return
+
+                self._update(job_id, current_scene=scene_number, current_step=None)
+                result = self.scene_step(
+                    client,
+                    job,
+                    scene_number,
+                    lambda step: self._update(job_id, current_step=step)
+                )
+
+                # Checkpoint the finished scene before moving on
+                with self._lock:
+                    job = self._jobs[job_id]
+                    key = str(scene_number)
+                    job["scenes"][key] = result["script"]
+                    job["results"][key] = {name: value for name, value in result.items() if name != "script"}
+                    job["completed_scenes"].append(scene_number)
+                    job["current_step"] = None
+                    self._save(job)
+
+            self._finish(job_id, status="completed", current_scene=None)
+        except Exception as e:
+            self._finish(job_id, status="failed", error=str(e))
+
+    def close(self):
+        """
+        Stops the jobs without waiting for them (also called automatically at interpreter exit).
+
+        A running job finishes the scene in progress, is checkpointed as "interrupted" and
+        resumes from the next scene; queued jobs are dropped and reloaded as "interrupted".
+        """
+        self._stopping.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,120 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class LLMCache:
+    """
+    Content-addressed on-disk cache for LLM responses, backed by SQLite.
+
+    Entries are keyed by a SHA-256 hash of (model, messages, temperature, top_p,
+    response_format), so a JSON-mode request never shares an entry with a plain one.
+    When the stored responses exceed `max_bytes`, the least recently used entries
+    are evicted.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, deterministic_only=True):
+        """
+        Initializes the cache and creates the SQLite table if needed.
+
+        Args:
+            path (str): Path to the SQLite database file.
+            max_bytes (int): Maximum total size of cached responses (default: 256 MB).
+            deterministic_only (bool): If True, only temperature-0 calls are cached.
+                Set to False ("force cache" mode) to replay every call from the cache.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.deterministic_only = deterministic_only
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT,
+                response TEXT,
+                size INTEGER,
+                last_access REAL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model, messages, temperature, top_p, response_format=None):
+        """Returns the SHA-256 cache key for a request."""
+        payload = json.dumps(
+            {
+                "model": model,
+                "messages": messages,
+                "temperature": temperature,
+                "top_p": top_p,
+                "response_format": response_format
+            },
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def should_cache(self, temperature):
+        """Returns True if a call with this temperature is eligible for caching."""
+        return not self.deterministic_only or temperature == 0
+
+    def get(self, key):
+        """Returns the cached response for `key`, or None on a miss."""
+        with self._lock:
+            row = self._conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            return row[0]
+
+    def put(self, key, model, response):
+        """Stores a response and evicts least recently used entries if over budget."""
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, model, response, size, time.time())
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY last_access ASC").fetchall()
+        stale_keys = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale_keys.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+
+    def clear(self):
+        """Removes every cached response."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        """Closes the underlying SQLite connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,618 @@
+import asyncio
+import contextvars
+import hashlib
+import inspect
+import random
+import threading
+import time
+from contextlib import contextmanager
+from llm_cache import LLMCache
+from rate_limiter import FairSemaphore, RateLimiter, estimate_tokens, retry_after_seconds
+
+# Process-wide gateway settings. Every helper in `utils/` and `utils/agents/`
+# routes its chat completion through this module, so these apply globally.
+MAX_CONCURRENCY = 8        # Maximum number of in-flight LLM requests
+DEFAULT_TIMEOUT = 120.0    # Per-call timeout in seconds
+MAX_RETRIES = 3            # Attempts per call before giving up
+BASE_BACKOFF = 1.0         # Backoff ceiling for the first retry in seconds
+MAX_BACKOFF = 8.0          # Upper bound on any single backoff in seconds
+REQUESTS_PER_MINUTE = None # Request quota per API key and model (learned from x-ratelimit-* headers if None)
+TOKENS_PER_MINUTE = None   # Token quota per API key and model (learned from x-ratelimit-* headers if None)
+
+_slots = FairSemaphore(MAX_CONCURRENCY)
+_cache = None
+_rate_limiters = {}
+_rate_limiters_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {
+    "calls": 0,
+    "retries": 0,
+    "failures": 0,
+    "cache_hits": 0,
+    "rate_limited": 0,
+    "rate_limit_wait": 0.0,
+    "total_latency": 0.0
+}
+_request_counters = contextvars.ContextVar("llm_request_counters", default=())  # Open count_requests() scopes
+
+
+class LLMGatewayError(Exception):
+    """Raised when an LLM call still fails after all retry attempts."""
+
+
+def configure_gateway(max_concurrency=None, default_timeout=None, max_retries=None, max_backoff=None,
+                      requests_per_minute=None, tokens_per_minute=None):
+    """
+    Updates the process-wide gateway settings.
+
+    Changing `max_concurrency` replaces the global concurrency cap, so it should be
+    called before any requests are in flight (e.g., once at startup).
+
+    Args:
+        max_concurrency (int, optional): Maximum number of simultaneous LLM requests.
+        default_timeout (float, optional): Per-call timeout in seconds.
+        max_retries (int, optional): Number of attempts per call.
+        max_backoff (float, optional): Upper bound on a single retry delay in seconds.
+        requests_per_minute (int, optional): Request quota per API key and model.
+        tokens_per_minute (int, optional): Token quota per API key and model.
+    """
+    global MAX_CONCURRENCY, DEFAULT_TIMEOUT, MAX_RETRIES, MAX_BACKOFF, REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE, _slots
+
+    if max_concurrency is not None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        MAX_CONCURRENCY = max_concurrency
+        _slots = FairSemaphore(max_concurrency)
+    if default_timeout is not None:
+        DEFAULT_TIMEOUT = default_timeout
+    if max_retries is not None:
+        if max_retries < 1:
+            raise ValueError("max_retries must be at least 1.")
+        MAX_RETRIES = max_retries
+    if max_backoff is not None:
+        MAX_BACKOFF = max_backoff
+    if requests_per_minute is not None or tokens_per_minute is not None:
+        REQUESTS_PER_MINUTE = requests_per_minute or REQUESTS_PER_MINUTE
+        TOKENS_PER_MINUTE = tokens_per_minute or TOKENS_PER_MINUTE
+        with _rate_limiters_lock:
+            _rate_limiters.clear()
+
+
+def enable_cache(path, max_bytes=256 * 1024 * 1024, force=False):
+    """
+    Turns on the on-disk LLM response cache for every call made through the gateway.
+
+    By default only deterministic calls (temperature 0) are cached. With `force=True`
+    every call is cached, which is useful for replaying a notebook run exactly.
+
+    Args:
+        path (str): Path to the SQLite cache file.
+        max_bytes (int): Size budget before least recently used entries are evicted (default: 256 MB).
+        force (bool): Cache all calls regardless of temperature (default: False).
+
+    Returns:
+        LLMCache: The active cache instance.
+    """
+    global _cache
+
+    if _cache is not None:
+        _cache.close()
+    _cache = LLMCache(path, max_bytes=max_bytes, deterministic_only=not force)
+    return _cache
+
+
+def disable_cache():
+    """Turns off the LLM response cache. Cached entries stay on disk."""
+    global _cache
+
+    if _cache is not None:
+        _cache.close()
+    _cache = None
+
+
+def get_gateway_stats():
+    """
+    Returns a snapshot of gateway metrics.
+
+    Returns:
+        dict with:
+            - 'calls': Number of successful LLM calls
+            - 'retries': Number of failed attempts that were retried
+            - 'failures': Number of calls that failed after all retries
+            - 'cache_hits': Number of calls answered from the response cache
+            - 'rate_limited': Number of attempts rejected with HTTP 429
+            - 'rate_limit_wait': Total seconds callers spent queued by the rate limiter
+            - 'avg_latency': Mean latency of successful calls in seconds
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["avg_latency"] = stats["total_latency"] / stats["calls"] if stats["calls"] else 0.0
+    return stats
+
+
+@contextmanager
+def count_requests():
+    """
+    Counts the LLM requests made inside the block.
+
+    Unlike the deltas of `get_gateway_stats`, the count only includes requests made from
+    this context (the current thread or task, plus tasks and `asyncio.to_thread` calls it
+    starts), so concurrent traffic elsewhere in the process does not inflate it. Worker
+    threads must run in a copy of the caller's context (`contextvars.copy_context`) to be
+    counted.
+
+    Yields:
+        dict with 'calls' (successful LLM calls) and 'cache_hits', updated as requests finish.
+    """
+    counter = {"calls": 0, "cache_hits": 0}
+    token = _request_counters.set(_request_counters.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _request_counters.reset(token)
+
+
+def _record(key, value=1):
+    with _stats_lock:
+        _stats[key] += value
+        for counter in _request_counters.get():
+            if key in counter:
+                counter[key] += value
+
+
+def _backoff_delay(attempt):
+    """Full-jitter exponential backoff: uniform in [0, min(MAX_BACKOFF, BASE_BACKOFF * 2**attempt)]."""
+    return random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * (2 ** attempt)))
+
+
+def get_rate_limiter(client, model):
+    """
+    Returns the shared RateLimiter for a client's API key and a model.
+
+    OpenAI quotas apply per organization/key and model, so every call with the same key
+    and model (from any thread, route or helper) draws from the same buckets.
+    """
+    api_key = getattr(client, "api_key", None) or ""
+    key = (hashlib.sha256(str(api_key).encode("utf-8")).hexdigest()[:16], model)
+    with _rate_limiters_lock:
+        limiter = _rate_limiters.get(key)
+        if limiter is None:
+            limiter = _rate_limiters[key] = RateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+        return limiter
+
+
+def _rate_limit_error(limiter, reserved_tokens, error):
+    """
+    Feeds a failed attempt back into the limiter.
+
+    Tokens still reserved for the attempt (no usage was reported) are refunded. A 429 (or any response carrying
+    Retry-After) pauses every caller of the limiter until the server's reset time.
+
+    Returns:
+        float: Seconds the server asked to wait, or None if it gave no hint.
+    """
+    limiter.reconcile(reserved_tokens, 0)
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    rate_limited = getattr(error, "status_code", None) == 429
+    if rate_limited:
+        _record("rate_limited")
+    elif not headers or ("retry-after" not in headers and "retry-after-ms" not in headers):
+        return None
+
+    limiter.update_from_headers(headers)
+    wait = retry_after_seconds(headers)
+    limiter.pause(wait)
+    return wait
+
+
+def _usage_tokens(response):
+    usage = getattr(response, "usage", None)
+    return getattr(usage, "total_tokens", None)
+
+
+def _is_async_client(client):
+    """True for `AsyncOpenAI`-style clients (openai wraps `create` in a plain function, so unwrap it first)."""
+    return inspect.iscoroutinefunction(inspect.unwrap(client.chat.completions.create))
+
+
+def _build_request(prompt, model, temperature, top_p, timeout, response_format=None):
+    messages = prompt if isinstance(prompt, list) else [{"role": "user", "content": prompt}]
+    request = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "timeout": timeout if timeout is not None else DEFAULT_TIMEOUT
+    }
+    if top_p is not None:
+        request["top_p"] = top_p
+    if response_format is not None:
+        request["response_format"] = response_format
+    return request
+
+
+def _extract_content(response):
+    if not response or not response.choices or not response.choices[0].message.content:
+        raise ValueError("Received an empty or malformed response from the API.")
+    return response.choices[0].message.content.strip()
+
+
+def _cache_key(request):
+    """Returns the cache key for a request, or None if the call should bypass the cache."""
+    if _cache is None or not _cache.should_cache(request["temperature"]):
+        return None
+    return LLMCache.make_key(
+        request["model"],
+        request["messages"],
+        request["temperature"],
+        request.get("top_p"),
+        request.get("response_format")
+    )
+
+
+def _cache_get(key):
+    if key is None:
+        return None
+    content = _cache.get(key)
+    if content is not None:
+        _record("cache_hits")
+    return content
+
+
+def _cache_put(key, request, content):
+    if key is not None and _cache is not None:
+        _cache.put(key, request["model"], content)
+
+
+def _raise_final(error_message, error):
+    _record("failures")
+    message = f"{error_message}: {str(error)}" if error_message else str(error)
+    raise LLMGatewayError(message) from error
+
+
+def chat_completion(
+    client,
+    prompt,
+    model="gpt-4",
+    temperature=0.7,
+    top_p=0.9,
+    error_message=None,
+    max_retries=None,
+    timeout=None,
+    response_format=None
+):
+    """
+    Sends a chat completion request through the shared gateway and returns the text.
+
+    This is the synchronous entry point used by the helpers. Requests share a global
+    concurrency cap, are retried with jittered exponential backoff, and carry a
+    per-call timeout. If `enable_cache` has been called, eligible calls are served
+    from the on-disk response cache.
+
+    Before each attempt the call waits its turn in the rate limiter for its API key and
+    model (see `get_rate_limiter`), which tracks requests and estimated tokens per minute.
+    Response headers keep the limiter in sync with the server's quota, and a 429 with
+    Retry-After pauses all callers until the reset instead of each retrying on its own.
+
+    Args:
+        client: OpenAI client instance.
+        prompt (str or list): User prompt, or a full list of chat messages.
+        model (str): OpenAI model to use (default: "gpt-4").
+        temperature (float): Sampling temperature (default: 0.7).
+        top_p (float, optional): Nucleus sampling parameter; omitted from the request if None (default: 0.9).
+        error_message (str, optional): Prefix for the error raised after the final attempt.
+        max_retries (int, optional): Attempts for this call (default: MAX_RETRIES).
+        timeout (float, optional): Timeout for this call in seconds (default: DEFAULT_TIMEOUT).
+        response_format (dict, optional): OpenAI response format, e.g. {"type": "json_object"}.
+
+    Returns:
+        str: The stripped message content of the first choice.
+
+    Raises:
+        LLMGatewayError: If every attempt fails or returns an empty response.
+    """
+    request = _build_request(prompt, model, temperature, top_p, timeout, response_format)
+    attempts = max_retries or MAX_RETRIES
+    cache_key = _cache_key(request)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    limiter = get_rate_limiter(client, model)
+    estimated_tokens = estimate_tokens(request["messages"], model)
+    raw_api = getattr(client.chat.completions, "with_raw_response", None)
+
+    for attempt in range(attempts):
+        _record("rate_limit_wait", limiter.acquire(estimated_tokens))
+        reserved_tokens = estimated_tokens
+        try:
+            start = time.monotonic()
+            with _slots:
+                if raw_api is not None:
+                    raw = raw_api.create(**request)
+                    response, headers = raw.parse(), raw.headers
+                else:
+                    response, headers = client.chat.completions.create(**request), None
+            # Correct the estimate first, then let the server's remaining quota override it
+            limiter.reconcile(estimated_tokens, _usage_tokens(response))
+            reserved_tokens = 0
+            limiter.update_from_headers(headers)
+            content = _extract_content(response)
+            _record("calls")
+            _record("total_latency", time.monotonic() - start)
+            _cache_put(cache_key, request, content)
+            return content
+
+        except Exception as e:
+            retry_after = _rate_limit_error(limiter, reserved_tokens, e)
+            if attempt == attempts - 1:
+                _raise_final(error_message, e)
+            _record("retries")
+            # With a server-provided wait the limiter holds every caller back; otherwise back off with jitter
+            if retry_after is None:
+                time.sleep(_backoff_delay(attempt))
+
+
+async def achat_completion(
+    client,
+    prompt,
+    model="gpt-4",
+    temperature=0.7,
+    top_p=0.9,
+    error_message=None,
+    max_retries=None,
+    timeout=None,
+    response_format=None
+):
+    """
+    Async version of `chat_completion`.
+
+    Accepts either a synchronous `OpenAI` client (the blocking call is run in a worker
+    thread) or an `AsyncOpenAI` client (awaited directly). Waiting for the rate limiter,
+    a concurrency slot and backoff all happen on the event loop, so with an `AsyncOpenAI`
+    client a call holds no thread while it is queued or in flight.
+
+    Args:
+        Same as `chat_completion`.
+
+    Returns:
+        str: The stripped message content of the first choice.
+
+    Raises:
+        LLMGatewayError: If every attempt fails or returns an empty response.
+    """
+    request = _build_request(prompt, model, temperature, top_p, timeout, response_format)
+    attempts = max_retries or MAX_RETRIES
+    cache_key = _cache_key(request)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    create = client.chat.completions.create
+    is_async_client = _is_async_client(client)
+    raw_api = getattr(client.chat.completions, "with_raw_response", None)
+    limiter = get_rate_limiter(client, model)
+    estimated_tokens = estimate_tokens(request["messages"], model)
+
+    async def send():
+        if raw_api is None:
+            if is_async_client:
+                return await asyncio.wait_for(create(**request), timeout=request["timeout"]), None
+            return await asyncio.to_thread(create, **request), None
+        if is_async_client:
+            raw = await asyncio.wait_for(raw_api.create(**request), timeout=request["timeout"])
+        else:
+            raw = await asyncio.to_thread(raw_api.create, **request)
+        parsed = raw.parse()
+        if inspect.isawaitable(parsed):
+            parsed = await parsed
+        return parsed, raw.headers
+
+    for attempt in range(attempts):
+        _record("rate_limit_wait", await limiter.aacquire(estimated_tokens))
+        reserved_tokens = estimated_tokens
+        try:
+            start = time.monotonic()
+            slots = _slots
+            await slots.aacquire()
+            try:
+                response, headers = await send()
+            finally:
+                slots.release()
+            limiter.reconcile(estimated_tokens, _usage_tokens(response))
+            reserved_tokens = 0
+            limiter.update_from_headers(headers)
+            content = _extract_content(response)
+            _record("calls")
+            _record("total_latency", time.monotonic() - start)
+            _cache_put(cache_key, request, content)
+            return content
+
+        except Exception as e:
+            retry_after = _rate_limit_error(limiter, reserved_tokens, e)
+            if attempt == attempts - 1:
+                _raise_final(error_message, e)
+            _record("retries")
+            if retry_after is None:
+                await asyncio.sleep(_backoff_delay(attempt))
+
+
+def stream_chat_completion(
+    client,
+    prompt,
+    model="gpt-4",
+    temperature=0.7,
+    top_p=0.9,
+    error_message=None,
+    max_retries=None,
+    timeout=None
+):
+    """
+    Streaming version of `chat_completion`: yields the response text as it is generated.
+
+    The request is sent with `stream=True` through the same concurrency cap and rate
+    limiter. Leading and trailing whitespace is trimmed on the fly, so the concatenated
+    chunks equal what `chat_completion` returns for the same completion. A failed attempt
+    is retried only if nothing has been yielded yet; after that the error is raised.
+    Cached responses are yielded as a single chunk, and completed streams are cached.
+
+    Args:
+        Same as `chat_completion` (except `response_format`).
+
+    Yields:
+        str: Successive pieces of the message content.
+
+    Raises:
+        LLMGatewayError: If every attempt fails, the response is empty, or the stream breaks after output began.
+    """
+    request = _build_request(prompt, model, temperature, top_p, timeout)
+    attempts = max_retries or MAX_RETRIES
+    cache_key = _cache_key(request)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    limiter = get_rate_limiter(client, model)
+    estimated_tokens = estimate_tokens(request["messages"], model)
+
+    for attempt in range(attempts):
+        _record("rate_limit_wait", limiter.acquire(estimated_tokens))
+        reserved_tokens = estimated_tokens
+        pieces = []
+        pending = ""  # whitespace held back until more text arrives (trailing whitespace is dropped)
+        try:
+            start = time.monotonic()
+            with _slots:
+                stream = client.chat.completions.create(**request, stream=True)
+                # Streams report no usage, so the estimate stands
+                reserved_tokens = 0
+                for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    if not pieces:
+                        delta = delta.lstrip()
+                        if not delta:
+                            continue
+                    text = pending + delta
+                    stripped = text.rstrip()
+                    pending = text[len(stripped):]
+                    if stripped:
+                        pieces.append(stripped)
+                        yield stripped
+            if not pieces:
+                raise ValueError("Received an empty or malformed response from the API.")
+            _record("calls")
+            _record("total_latency", time.monotonic() - start)
+            _cache_put(cache_key, request, "".join(pieces))
+            return
+
+        except GeneratorExit:
+            raise
+        except Exception as e:
+            retry_after = _rate_limit_error(limiter, reserved_tokens, e)
+            if pieces or attempt == attempts - 1:
+                _raise_final(error_message, e)
+            _record("retries")
+            if retry_after is None:
+                time.sleep(_backoff_delay(attempt))
+
+
+async def astream_chat_completion(
+    client,
+    prompt,
+    model="gpt-4",
+    temperature=0.7,
+    top_p=0.9,
+    error_message=None,
+    max_retries=None,
+    timeout=None
+):
+    """
+    Async version of `stream_chat_completion`.
+
+    With an `AsyncOpenAI` client the stream is read on the event loop; a synchronous
+    `OpenAI` client is streamed through `stream_chat_completion` on a worker thread.
+
+    Args:
+        Same as `stream_chat_completion`.
+
+    Yields:
+        str: Successive pieces of the message content.
+
+    Raises:
+        LLMGatewayError: If every attempt fails, the response is empty, or the stream breaks after output began.
+    """
+    if not _is_async_client(client):
+        chunks = stream_chat_completion(client, prompt, model, temperature, top_p, error_message, max_retries, timeout)
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            chunks.close()
+
+    request = _build_request(prompt, model, temperature, top_p, timeout)
+    attempts = max_retries or MAX_RETRIES
+    cache_key = _cache_key(request)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        yield cached
+        return
+
+    limiter = get_rate_limiter(client, model)
+    estimated_tokens = estimate_tokens(request["messages"], model)
+
+    for attempt in range(attempts):
+        _record("rate_limit_wait", await limiter.aacquire(estimated_tokens))
+        reserved_tokens = estimated_tokens
+        pieces = []
+        pending = ""
+        try:
+            start = time.monotonic()
+            slots = _slots
+            await slots.aacquire()
+            try:
+                stream = await asyncio.wait_for(
+                    client.chat.completions.create(**request, stream=True),
+                    timeout=request["timeout"]
+                )
+                reserved_tokens = 0
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    if not pieces:
+                        delta = delta.lstrip()
+                        if not delta:
+                            continue
+                    text = pending + delta
+                    stripped = text.rstrip()
+                    pending = text[len(stripped):]
+                    if stripped:
+                        pieces.append(stripped)
+                        yield stripped
+            finally:
+                slots.release()
+            if not pieces:
+                raise ValueError("Received an empty or malformed response from the API.")
+            _record("calls")
+            _record("total_latency", time.monotonic() - start)
+            _cache_put(cache_key, request, "".join(pieces))
+            return
+
+        except (GeneratorExit, asyncio.CancelledError):
+            raise
+        except Exception as e:
+            retry_after = _rate_limit_error(limiter, reserved_tokens, e)
+            if pieces or attempt == attempts - 1:
+                _raise_final(error_message, e)
+            _record("retries")
+            if retry_after is None:
+                await asyncio.sleep(_backoff_delay(attempt))
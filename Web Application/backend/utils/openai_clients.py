@@ -0,0 +1,145 @@
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+
+import httpx
+import openai
+
+MAX_POOLED_KEYS = 32            # API keys with a live client before the least recently used is dropped
+MAX_CONNECTIONS = 100           # Open connections per client
+MAX_KEEPALIVE_CONNECTIONS = 32  # Idle connections kept open per client
+KEEPALIVE_EXPIRY = 60.0         # Seconds an idle connection is kept (LLM calls are spaced out by generation time)
+CONNECT_TIMEOUT = 5.0           # Seconds to open a connection; read timeouts are set per call by the gateway
+
+
+def hash_api_key(api_key):
+    """Returns the SHA-256 hex digest used to key clients (the raw key is never a dict key)."""
+    return hashlib.sha256(str(api_key).encode("utf-8")).hexdigest()
+
+
+class OpenAIClientPool:
+    """
+    Bounded LRU pool of OpenAI clients, one per API key.
+
+    Creating an `OpenAI` client per request also creates a fresh connection pool, so every
+    request paid for a new TCP and TLS handshake. The pool hands every request with the
+    same key the same client, whose httpx connections are kept alive between calls. Async
+    clients are pooled per key and event loop, since their connections belong to the loop
+    that opened them. Clients are created with `max_retries=0`: retries, backoff and 429
+    handling are left to the LLM gateway, which also paces them with the rate limiter.
+
+    A client dropped from the pool is not closed, since a request may still be using it;
+    its connections are released once it is garbage collected. Async clients whose event
+    loop has been closed are dropped the same way. At shutdown, `close` closes the sync
+    clients and `aclose` (awaited on the serving loop) closes the async ones.
+    """
+
+    def __init__(self, max_size=MAX_POOLED_KEYS, max_connections=MAX_CONNECTIONS,
+                 max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS, keepalive_expiry=KEEPALIVE_EXPIRY):
+        """
+        Initializes an empty pool.
+
+        Args:
+            max_size (int): Clients kept per kind (sync and async) (default: MAX_POOLED_KEYS).
+            max_connections (int): Open connections per client (default: MAX_CONNECTIONS).
+            max_keepalive_connections (int): Idle connections kept per client (default: MAX_KEEPALIVE_CONNECTIONS).
+            keepalive_expiry (float): Seconds an idle connection is kept (default: KEEPALIVE_EXPIRY).
+        """
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1.")
+        self.max_size = max_size
+        self._limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self._timeout = httpx.Timeout(600.0, connect=CONNECT_TIMEOUT)
+        self._lock = threading.Lock()
+        self._clients = OrderedDict()
+        self._async_clients = OrderedDict()
+        self._stats = {"created": 0, "reused": 0, "evicted": 0}
+
+    def _get(self, clients, key, create):
+        with self._lock:
+            client = clients.get(key)
+            if client is not None:
+                clients.move_to_end(key)
+                self._stats["reused"] += 1
+                return client
+            client = clients[key] = create()
+            self._stats["created"] += 1
+            while len(clients) > self.max_size:
+                clients.popitem(last=False)
+                self._stats["evicted"] += 1
+            return client
+
+    def get(self, api_key):
+        """Returns the shared `openai.OpenAI` client for `api_key`."""
+        return self._get(
+            self._clients,
+            hash_api_key(api_key),
+            lambda: openai.OpenAI(
+                api_key=api_key,
+                max_retries=0,
+                http_client=httpx.Client(limits=self._limits, timeout=self._timeout)
+            )
+        )
+
+    def _drop_closed_loops(self):
+        # Called with the lock held; these clients' connections can no longer be used or closed
+        for key in [key for key in self._async_clients if key[1].is_closed()]:
+            del self._async_clients[key]
+            self._stats["evicted"] += 1
+
+    def get_async(self, api_key):
+        """
+        Returns the shared `openai.AsyncOpenAI` client for `api_key` on the running event loop.
+
+        Raises:
+            RuntimeError: If called outside a running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._drop_closed_loops()
+        return self._get(
+            self._async_clients,
+            (hash_api_key(api_key), loop),
+            lambda: openai.AsyncOpenAI(
+                api_key=api_key,
+                max_retries=0,
+                http_client=httpx.AsyncClient(limits=self._limits, timeout=self._timeout)
+            )
+        )
+
+    def stats(self):
+        """Returns the number of pooled clients and the 'created', 'reused' and 'evicted' counts."""
+        with self._lock:
+            return {**self._stats, "pooled": len(self._clients), "pooled_async": len(self._async_clients)}
+
+    def close(self):
+        """
+        Closes the pooled synchronous clients (e.g., at shutdown) and empties the pool.
+
+        Async clients can only be closed on their own event loop (see `aclose`), so they
+        are just dropped here.
+        """
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._async_clients.clear()
+        for client in clients:
+            client.close()
+
+    async def aclose(self):
+        """
+        Closes the async clients of the running event loop (e.g., at ASGI shutdown) and drops
+        the clients of closed loops.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._drop_closed_loops()
+            keys = [key for key in self._async_clients if key[1] is loop]
+            clients = [self._async_clients.pop(key) for key in keys]
+        for client in clients:
+            await client.close()
@@ -0,0 +1,276 @@
+import bisect
+import threading
+from typing import Dict, List, Optional
+
+from scene_record import SceneRecord, records_to_arrow, write_parquet
+
+
+def make_scene_id(episode: int, scene_number: int) -> int:
+    """Packs (episode, scene_number) into the stable int64 ID used as the scene's FAISS label."""
+    return (int(episode) << 32) | int(scene_number)
+
+
+def split_scene_id(scene_id: int):
+    """Unpacks a scene ID into (episode, scene_number)."""
+    return int(scene_id) >> 32, int(scene_id) & 0xFFFFFFFF
+
+
+def _normalize(value):
+    """Normalizes a location or joke for use as an index key."""
+    if not value or not isinstance(value, str):
+        return None
+    key = " ".join(value.lower().split())
+    return None if key in ("", "none", "unknown") else key
+
+
+class SceneMetadataStore(list):
+    """
+    Scene metadata list with inverted indexes for character, location and joke lookups.
+
+    This is a drop-in replacement for the plain `vector_metadata` list: it can be appended
+    to, sliced and iterated exactly like before, so existing helpers keep working. It
+    also keeps character -> scenes, location -> scenes and joke -> scenes indexes up to
+    date on every append. A lookup then costs O(k) for k matching scenes instead of a
+    scan over all N scenes.
+
+    Records that carry a 'scene_id' (see `make_scene_id`) can also be addressed by ID:
+    `upsert_scene` replaces a regenerated scene in place instead of appending a duplicate,
+    `remove_scene` deletes one, and records are kept ordered by ID (episode, then scene
+    number), so `store[-1]` is always the latest scene.
+
+    Records are stored as compact `SceneRecord`s (dicts are converted on insertion), and
+    `to_arrow` / `to_parquet` / `to_pandas` export them column-wise for analytics.
+
+    Edits and index lookups share a lock, so a request reading the indexes never sees
+    them half-updated while another request stores a scene. Replacing a record or
+    dropping the last one updates the indexes in place. Edits that shift positions
+    (insert, delete, sort) rebuild them.
+    """
+
+    def __init__(self, records=()):
+        super().__init__()
+        self._lock = threading.RLock()
+        self._character_index = {}
+        self._location_index = {}
+        self._joke_index = {}
+        self._id_positions = {}
+        self.extend(records)
+
+    @staticmethod
+    def _index_keys(meta: Dict):
+        # (index attribute, key) pairs under which a record is listed
+        for character in meta.get("characters") or []:
+            yield "_character_index", character
+
+        location = _normalize(meta.get("location"))
+        if location:
+            yield "_location_index", location
+
+        jokes = meta.get("recurring_joke")
+        for joke in (jokes if isinstance(jokes, list) else [jokes]):
+            joke_key = _normalize(joke)
+            if joke_key:
+                yield "_joke_index", joke_key
+
+    def _index_record(self, position: int, meta: Dict) -> None:
+        if "scene_id" in meta:
+            self._id_positions[meta["scene_id"]] = position
+        for name, key in self._index_keys(meta):
+            positions = getattr(self, name).setdefault(key, [])
+            if not positions or positions[-1] < position:
+                positions.append(position)  # The usual case: a new latest scene
+            else:
+                bisect.insort(positions, position)
+
+    def _unindex_record(self, position: int, meta: Dict) -> None:
+        if self._id_positions.get(meta.get("scene_id")) == position:
+            del self._id_positions[meta["scene_id"]]
+        for name, key in self._index_keys(meta):
+            index = getattr(self, name)
+            positions = index.get(key, [])
+            i = bisect.bisect_left(positions, position)
+            if i < len(positions) and positions[i] == position:
+                del positions[i]
+                if not positions:
+                    del index[key]
+
+    def _rebuild_indexes(self) -> None:
+        # Called with the lock held
+        self._character_index = {}
+        self._location_index = {}
+        self._joke_index = {}
+        self._id_positions = {}
+        for position, meta in enumerate(self):
+            self._index_record(position, meta)
+
+    def append(self, meta: Dict) -> None:
+        meta = SceneRecord.coerce(meta)
+        with self._lock:
+            super().append(meta)
+            self._index_record(len(self) - 1, meta)
+
+    def extend(self, records) -> None:
+        for meta in records:
+            self.append(meta)
+
+    def __iadd__(self, records):
+        self.extend(records)
+        return self
+
+    def __setitem__(self, key, value):
+        if isinstance(key, slice):
+            value = [SceneRecord.coerce(meta) for meta in value]
+            with self._lock:
+                super().__setitem__(key, value)
+                self._rebuild_indexes()
+            return
+
+        value = SceneRecord.coerce(value)
+        with self._lock:
+            position = range(len(self))[key]  # Raises IndexError like a list
+            self._unindex_record(position, self[position])
+            super().__setitem__(position, value)
+            self._index_record(position, value)
+
+    # Any other in-place edit that can shift positions invalidates the indexes
+    def __delitem__(self, key):
+        with self._lock:
+            super().__delitem__(key)
+            self._rebuild_indexes()
+
+    def insert(self, position, meta):
+        meta = SceneRecord.coerce(meta)
+        with self._lock:
+            super().insert(position, meta)
+            self._rebuild_indexes()
+
+    def pop(self, position=-1):
+        with self._lock:
+            position = range(len(self))[position]  # Raises IndexError like a list
+            if position == len(self) - 1:
+                self._unindex_record(position, self[position])
+                return super().pop()
+            meta = super().pop(position)
+            self._rebuild_indexes()
+            return meta
+
+    def remove(self, meta):
+        with self._lock:
+            super().remove(meta)
+            self._rebuild_indexes()
+
+    def clear(self):
+        with self._lock:
+            super().clear()
+            self._rebuild_indexes()
+
+    def sort(self, *args, **kwargs):
+        with self._lock:
+            super().sort(*args, **kwargs)
+            self._rebuild_indexes()
+
+    def reverse(self):
+        with self._lock:
+            super().reverse()
+            self._rebuild_indexes()
+
+    def position_of(self, scene_id: int) -> Optional[int]:
+        """Returns the position of the scene with this ID, or None."""
+        with self._lock:
+            return self._id_positions.get(scene_id)
+
+    def position_of_label(self, label: int) -> Optional[int]:
+        """
+        Maps a FAISS search label to a position: the label is a scene ID when records are
+        ID-keyed, and a plain position otherwise.
+        """
+        with self._lock:
+            if self._id_positions:
+                return self._id_positions.get(int(label))
+            return int(label) if 0 <= label < len(self) else None
+
+    def get_scene(self, scene_id: int) -> Optional[Dict]:
+        """Returns the metadata of the scene with this ID, or None."""
+        with self._lock:
+            position = self._id_positions.get(scene_id)
+            return None if position is None else self[position]
+
+    def next_scene_number(self, episode: int) -> int:
+        """Returns one more than the highest scene number stored for an episode."""
+        with self._lock:
+            numbers = [number for scene_episode, number in map(split_scene_id, self._id_positions) if scene_episode == episode]
+        return max(numbers, default=0) + 1
+
+    def upsert_scene(self, meta: Dict) -> int:
+        """
+        Inserts a record that has a 'scene_id', or replaces the record with the same ID.
+
+        Returns:
+            int: The record's position.
+        """
+        scene_id = meta["scene_id"]
+        with self._lock:
+            position = self._id_positions.get(scene_id)
+            if position is not None:
+                self[position] = meta
+                return position
+
+            # Scenes are usually written in order, so this is almost always an O(1) append
+            if not self or self[-1].get("scene_id", -1) < scene_id:
+                self.append(meta)
+                return len(self) - 1
+
+            position = next(
+                (i for i, existing in enumerate(self) if existing.get("scene_id", -1) > scene_id),
+                len(self)
+            )
+            self.insert(position, meta)
+            return position
+
+    def remove_scene(self, scene_id: int) -> Optional[Dict]:
+        """Removes and returns the record with this ID (None if there is none)."""
+        with self._lock:
+            position = self._id_positions.get(scene_id)
+            return None if position is None else self.pop(position)
+
+    def positions_with_character(self, character: str) -> List[int]:
+        """Returns the positions of scenes featuring a character, oldest first."""
+        with self._lock:
+            return list(self._character_index.get(character, []))
+
+    def scenes_with_character(self, character: str) -> List[Dict]:
+        """Returns the metadata of scenes featuring a character, oldest first."""
+        with self._lock:
+            return [self[position] for position in self._character_index.get(character, [])]
+
+    def scenes_at_location(self, location: str) -> List[Dict]:
+        """Returns the metadata of scenes set at a location (case-insensitive), oldest first."""
+        with self._lock:
+            return [self[position] for position in self._location_index.get(_normalize(location), [])]
+
+    def scenes_with_joke(self, joke: str) -> List[Dict]:
+        """Returns the metadata of scenes that used a recurring joke (case-insensitive), oldest first."""
+        with self._lock:
+            return [self[position] for position in self._joke_index.get(_normalize(joke), [])]
+
+    def characters(self) -> List[str]:
+        """Returns every character that has appeared so far."""
+        with self._lock:
+            return list(self._character_index.keys())
+
+    def locations(self) -> List[str]:
+        """Returns every distinct (normalized) location used so far."""
+        with self._lock:
+            return list(self._location_index.keys())
+
+    def to_arrow(self):
+        """Returns the records as a columnar pyarrow Table (requires pyarrow)."""
+        return records_to_arrow(self)
+
+    def to_parquet(self, path: str) -> None:
+        """Writes the records to a Parquet file (requires pyarrow)."""
+        write_parquet(self, path)
+
+    def to_pandas(self):
+        """Returns the records as a pandas DataFrame, built from the Arrow columns."""
+        return self.to_arrow().to_pandas()
@@ -0,0 +1,152 @@
+import sys
+from collections.abc import MutableMapping
+
+_UNSET = object()
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class SceneRecord(MutableMapping):
+    """
+    Compact, dict-compatible metadata record for one stored scene.
+
+    Scene metadata used to be a free-form dict per scene, repeating every key string and
+    carrying a hash table each. SceneRecord keeps the known fields in `__slots__`, stores
+    characters as a tuple, and interns character, location and tone strings so that
+    scenes share one copy of each name. It implements the mapping protocol
+    (`meta["summary"]`, `meta.get("characters", [])`, `{**meta}`, `"script" in meta`), so
+    agents and helpers written against dicts keep working. Keys outside the known fields
+    are kept in a small side dict.
+    """
+
+    FIELDS = (
+        "scene_id", "episode", "scene_number", "summary", "characters",
+        "location", "recurring_joke", "emotional_tone", "key_details"
+    )
+    _FIELD_SET = frozenset(FIELDS)
+    __slots__ = FIELDS + ("_extra",)
+
+    def __init__(self, data=(), **kwargs):
+        for field in self.FIELDS:
+            setattr(self, field, _UNSET)
+        self._extra = None
+        self.update(data, **kwargs)
+
+    @classmethod
+    def coerce(cls, meta):
+        """Returns `meta` as a SceneRecord (unchanged if it already is one)."""
+        return meta if isinstance(meta, cls) else cls(meta)
+
+    def __getitem__(self, key):
+        if key in self._FIELD_SET:
+            value = getattr(self, key)
+            if value is not _UNSET:
+                return value
+        elif self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        # Hot path for filters and agents; avoids Mapping.get's try/except
+        if key in self._FIELD_SET:
+            value = getattr(self, key)
+            return default if value is _UNSET else value
+        return default if self._extra is None else self._extra.get(key, default)
+
+    def __setitem__(self, key, value):
+        if key in ("characters", "key_details"):
+            value = tuple(_intern(name) for name in (value or ()))
+        elif key in ("location", "emotional_tone"):
+            value = _intern(value)
+        elif key == "recurring_joke" and isinstance(value, list):
+            value = tuple(value)
+
+        if key in self._FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in self._FIELD_SET and getattr(self, key) is not _UNSET:
+            setattr(self, key, _UNSET)
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+            if not self._extra:
+                self._extra = None
+        else:
+            raise KeyError(key)
+
+    def __iter__(self):
+        for field in self.FIELDS:
+            if getattr(self, field) is not _UNSET:
+                yield field
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"SceneRecord({self.to_dict()!r})"
+
+    def to_dict(self):
+        """Returns a plain, JSON-serializable dict."""
+        return {key: list(value) if isinstance(value, tuple) else value for key, value in self.items()}
+
+
+def records_to_arrow(records):
+    """
+    Builds a columnar pyarrow Table from scene records (for analytics, Parquet or pandas).
+
+    Character lists become a list<string> column, and location and tone are
+    dictionary-encoded, so repeated names are stored once.
+
+    Args:
+        records (iterable): SceneRecords or dicts.
+
+    Returns:
+        pyarrow.Table: One row per scene.
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+    """
+    import pyarrow as pa
+
+    records = list(records)
+
+    def column(field):
+        return [record.get(field) for record in records]
+
+    def text(value):
+        if value is None:
+            return None
+        return ", ".join(value) if isinstance(value, (list, tuple)) else str(value)
+
+    return pa.table({
+        "scene_id": pa.array(column("scene_id"), type=pa.int64()),
+        "episode": pa.array(column("episode"), type=pa.int32()),
+        "scene_number": pa.array(column("scene_number"), type=pa.int32()),
+        "summary": pa.array(column("summary"), type=pa.string()),
+        "characters": pa.array([list(value or []) for value in column("characters")], type=pa.list_(pa.string())),
+        "location": pa.array(column("location"), type=pa.string()).dictionary_encode(),
+        "recurring_joke": pa.array([text(value) for value in column("recurring_joke")], type=pa.string()),
+        "emotional_tone": pa.array(column("emotional_tone"), type=pa.string()).dictionary_encode(),
+        "key_details": pa.array([list(value or []) for value in column("key_details")], type=pa.list_(pa.string()))
+    })
+
+
+def write_parquet(records, path):
+    """
+    Writes scene records to a Parquet file.
+
+    Args:
+        records (iterable): SceneRecords or dicts.
+        path (str): Output file path.
+    """
+    import pyarrow.parquet as pq
+
+    pq.write_table(records_to_arrow(records), path)
@@ -1,5 +1,65 @@
 
-import time
+from llm_gateway import achat_completion, astream_chat_completion, chat_completion, stream_chat_completion
+
+
+def _scene_1_prompt(sitcom_title, scene_description, rag_context=None):
+    context_section = f"\nRelevant background information:\n{rag_context}" if rag_context else ""
+    return f"""
+You are a professional sitcom scriptwriter.
+
+Sitcom Title: {sitcom_title}
+Scene Description: {scene_description}{context_section}
+
+Write the opening scene of the pilot episode as a fully formatted sitcom script.
+
+Formatting Guidelines:
+- Begin with a scene heading (e.g., INT. EARL'S LOCKSMITH SHOP – DAY)
+- Character names in ALL CAPS
+- Dialogue should reflect natural flow and comedic timing
+- Stage directions in parentheses
+- Use [LAUGH TRACK] sparingly and only where it fits (e.g., punchlines, awkward pauses, physical comedy)
+- Place [LAUGH TRACK] no more than 4 to 5 times
+
+Scene Constraints:
+- This should be the first scene in the episode
+- It should be self-contained and take place in a single location
+- The scene should introduce tone, key characters, or comedic premise
+- Aim for approximately 50 to 70 total lines (including dialogue, directions, and laugh tracks)
+- End the scene cleanly without cinematic transitions like 'Fade out' or location jumps
+- The tone and pacing should emerge naturally from the description and any provided context
+
+Only output the script.
+"""
+
+
+def _scene_prompt(scene_plan, scene_number):
+    return f"""
+You are a sitcom scene writer.
+
+Definition:
+A sitcom scene is a self-contained 2–3 minute unit of story that:
+- Takes place in a single, consistent environment.
+- Involves 2–5 characters who advance emotional, comedic, or narrative goals.
+- Focuses on dialogue, quick pacing, and situation-based humor.
+
+Scene Plan for Scene {scene_number}:
+{scene_plan}
+
+STRICT INSTRUCTIONS:
+- Use ONLY the goals and suggestions from the scene plan.
+- DO NOT invent new characters, jokes, or settings not in the plan.
+- DO NOT use "Fade out", "Fade to black", or any cinematic transitions.
+- DO NOT end with a direction like [Scene fades out].
+- You MUST include 4–5 [Laugh Track] cues spaced throughout the scene.
+- Write 50–70 lines maximum with natural dialogue and actions.
+- Ensure the environment remains consistent and reflected in dialogue/props.
+
+Goal:
+Write a complete sitcom scene using only the provided goals and suggestions. End the scene with character-driven closure—NOT a cinematic fade.
+
+Now begin writing Scene {scene_number}:
+"""
+
 
 def generate_scene_1_script(client, sitcom_title, scene_description, scene_index, rag_context=None,
                             model="gpt-4", temperature=0.7, top_p=0.9):
@@ -29,55 +89,20 @@ def generate_scene_1_script(client, sitcom_title, scene_description, scene_index
         ValueError: If the API response is empty or improperly structured.
         Exception: After 3 failed attempts or other runtime errors.
     """
-    context_section = f"\nRelevant background information:\n{rag_context}" if rag_context else ""
     scene_number = scene_index + 1
     scene_header = f"# Scene {scene_number}\n"
+    prompt = _scene_1_prompt(sitcom_title, scene_description, rag_context)
 
-    prompt = f"""
-You are a professional sitcom scriptwriter.
-
-Sitcom Title: {sitcom_title}
-Scene Description: {scene_description}{context_section}
-
-Write the opening scene of the pilot episode as a fully formatted sitcom script.
-
-Formatting Guidelines:
-- Begin with a scene heading (e.g., INT. EARL'S LOCKSMITH SHOP – DAY)
-- Character names in ALL CAPS
-- Dialogue should reflect natural flow and comedic timing
-- Stage directions in parentheses
-- Use [LAUGH TRACK] sparingly and only where it fits (e.g., punchlines, awkward pauses, physical comedy)
-- Place [LAUGH TRACK] no more than 4 to 5 times
+    script = chat_completion(
+        client,
+        prompt,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=f"Error generating Scene {scene_number} script"
+    )
 
-Scene Constraints:
-- This should be the first scene in the episode
-- It should be self-contained and take place in a single location
-- The scene should introduce tone, key characters, or comedic premise
-- Aim for approximately 50 to 70 total lines (including dialogue, directions, and laugh tracks)
-- End the scene cleanly without cinematic transitions like 'Fade out' or location jumps
-- The tone and pacing should emerge naturally from the description and any provided context
-
-Only output the script.
-"""
-
-    for attempt in range(3):
-        try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                top_p=top_p,
-            )
-
-            if not response or not response.choices or not response.choices[0].message.content:
-                raise ValueError("Received an empty or malformed response from the API.")
-
-            return f"{scene_header}\n{response.choices[0].message.content.strip()}"
-
-        except Exception as e:
-            if attempt == 2:
-                raise Exception(f"Error generating Scene {scene_number} script: {str(e)}")
-            time.sleep(2 ** attempt)
+    return f"{scene_header}\n{script}"
 
 
 def generate_scene(client, scene_plan, scene_number, model="gpt-4", temperature=0.7, top_p=0.9):
@@ -104,51 +129,133 @@ def generate_scene(client, scene_plan, scene_number, model="gpt-4", temperature=
         ValueError: If the API response is empty or malformed.
         Exception: After 3 failed attempts to complete the request.
     """
-    prompt = f"""
-You are a sitcom scene writer.
+    prompt = _scene_prompt(scene_plan, scene_number)
 
-Definition:
-A sitcom scene is a self-contained 2–3 minute unit of story that:
-- Takes place in a single, consistent environment.
-- Involves 2–5 characters who advance emotional, comedic, or narrative goals.
-- Focuses on dialogue, quick pacing, and situation-based humor.
+    return chat_completion(
+        client,
+        prompt,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=f"Error generating Scene {scene_number} script"
+    )
 
-Scene Plan for Scene {scene_number}:
-{scene_plan}
 
-STRICT INSTRUCTIONS:
-- Use ONLY the goals and suggestions from the scene plan.
-- DO NOT invent new characters, jokes, or settings not in the plan.
-- DO NOT use "Fade out", "Fade to black", or any cinematic transitions.
-- DO NOT end with a direction like [Scene fades out].
-- You MUST include 4–5 [Laugh Track] cues spaced throughout the scene.
-- Write 50–70 lines maximum with natural dialogue and actions.
-- Ensure the environment remains consistent and reflected in dialogue/props.
+def stream_scene_1_script(client, sitcom_title, scene_description, scene_index, rag_context=None,
+                          model="gpt-4", temperature=0.7, top_p=0.9):
+    """
+    Streaming version of `generate_scene_1_script`.
 
-Goal:
-Write a complete sitcom scene using only the provided goals and suggestions. End the scene with character-driven closure—NOT a cinematic fade.
+    Yields the scene heading first and then the script as the model writes it (see
+    `stream_chat_completion`), so a UI can render the first lines after about a second.
+    The concatenated chunks equal the string `generate_scene_1_script` returns.
 
-Now begin writing Scene {scene_number}:
-"""
+    Args:
+        Same as `generate_scene_1_script`.
+
+    Yields:
+        str: Successive pieces of the formatted script.
 
-    for attempt in range(3):
-        try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                top_p=top_p,
-            )
+    Raises:
+        LLMGatewayError: If the request fails before or during streaming.
+    """
+    scene_number = scene_index + 1
+    yield f"# Scene {scene_number}\n\n"
+    yield from stream_chat_completion(
+        client,
+        _scene_1_prompt(sitcom_title, scene_description, rag_context),
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=f"Error generating Scene {scene_number} script"
+    )
+
+
+def stream_scene(client, scene_plan, scene_number, model="gpt-4", temperature=0.7, top_p=0.9):
+    """
+    Streaming version of `generate_scene`.
 
-            if not response or not response.choices or not response.choices[0].message.content:
-                raise ValueError("Received an empty or malformed response from the API.")
+    Args:
+        Same as `generate_scene`.
 
-            return response.choices[0].message.content.strip()
+    Yields:
+        str: Successive pieces of the script; concatenated, they equal `generate_scene`'s result.
 
-        except Exception as e:
-            if attempt == 2:
-                raise Exception(f"Error generating Scene {scene_number} script: {str(e)}")
-            time.sleep(2 ** attempt)
+    Raises:
+        LLMGatewayError: If the request fails before or during streaming.
+    """
+    yield from stream_chat_completion(
+        client,
+        _scene_prompt(scene_plan, scene_number),
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=f"Error generating Scene {scene_number} script"
+    )
+
+
+async def agenerate_scene_1_script(client, sitcom_title, scene_description, scene_index, rag_context=None,
+                                   model="gpt-4", temperature=0.7, top_p=0.9):
+    """
+    Async version of `generate_scene_1_script` (see `achat_completion` for client handling).
+    """
+    scene_number = scene_index + 1
+    script = await achat_completion(
+        client,
+        _scene_1_prompt(sitcom_title, scene_description, rag_context),
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=f"Error generating Scene {scene_number} script"
+    )
+    return f"# Scene {scene_number}\n\n{script}"
+
+
+async def agenerate_scene(client, scene_plan, scene_number, model="gpt-4", temperature=0.7, top_p=0.9):
+    """
+    Async version of `generate_scene` (see `achat_completion` for client handling).
+    """
+    return await achat_completion(
+        client,
+        _scene_prompt(scene_plan, scene_number),
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=f"Error generating Scene {scene_number} script"
+    )
+
+
+async def astream_scene_1_script(client, sitcom_title, scene_description, scene_index, rag_context=None,
+                                 model="gpt-4", temperature=0.7, top_p=0.9):
+    """
+    Async version of `stream_scene_1_script` (see `astream_chat_completion`).
+    """
+    scene_number = scene_index + 1
+    yield f"# Scene {scene_number}\n\n"
+    async for chunk in astream_chat_completion(
+        client,
+        _scene_1_prompt(sitcom_title, scene_description, rag_context),
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=f"Error generating Scene {scene_number} script"
+    ):
+        yield chunk
+
+
+async def astream_scene(client, scene_plan, scene_number, model="gpt-4", temperature=0.7, top_p=0.9):
+    """
+    Async version of `stream_scene` (see `astream_chat_completion`).
+    """
+    async for chunk in astream_chat_completion(
+        client,
+        _scene_prompt(scene_plan, scene_number),
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=f"Error generating Scene {scene_number} script"
+    ):
+        yield chunk
 
 
 def generate_scene_baseline(client, sitcom_title, scene_description, previous_scenes=None,
@@ -210,21 +317,11 @@ Constraints:
 Only output the script.
 """
 
-    for attempt in range(3):
-        try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                top_p=top_p,
-            )
-
-            if not response or not response.choices or not response.choices[0].message.content:
-                raise ValueError("Received an empty or malformed response from the API.")
-
-            return response.choices[0].message.content.strip()
-
-        except Exception as e:
-            if attempt == 2:
-                raise Exception(f"Error generating baseline scene script: {str(e)}")
-            time.sleep(2 ** attempt)
+    return chat_completion(
+        client,
+        prompt,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message="Error generating baseline scene script"
+    )
@@ -0,0 +1,100 @@
+import os
+import sqlite3
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; zlib is always available
+    zstandard = None
+
+
+class ScriptStore:
+    """
+    Compressed on-disk storage for full scene scripts, backed by SQLite BLOBs.
+
+    Agents only read summaries, characters, locations and jokes, so scripts are kept out of
+    the in-memory scene metadata and loaded by scene ID only when needed. Scripts are
+    compressed with zstd when the `zstandard` package is installed and with zlib
+    otherwise; each row records its codec, so both can be read back either way.
+    """
+
+    def __init__(self, path, level=3):
+        """
+        Initializes the store and creates the SQLite table if needed.
+
+        Args:
+            path (str): Path to the SQLite database file.
+            level (int): Compression level (default: 3).
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.level = level
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS scripts (
+                scene_id INTEGER PRIMARY KEY,
+                codec TEXT,
+                data BLOB
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _compress(self, script):
+        raw = script.encode("utf-8")
+        if zstandard is not None:
+            return "zstd", zstandard.ZstdCompressor(level=self.level).compress(raw)
+        return "zlib", zlib.compress(raw, self.level)
+
+    @staticmethod
+    def _decompress(codec, data):
+        if codec == "zstd":
+            if zstandard is None:
+                raise RuntimeError("This script was compressed with zstd; install the 'zstandard' package to read it.")
+            return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+        return zlib.decompress(data).decode("utf-8")
+
+    def put(self, scene_id, script):
+        """Stores (or replaces) the script for a scene."""
+        self.put_many([(scene_id, script)])
+
+    def put_many(self, items):
+        """Stores several (scene_id, script) pairs in one transaction."""
+        rows = [(int(scene_id), *self._compress(script)) for scene_id, script in items if script is not None]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany("INSERT OR REPLACE INTO scripts (scene_id, codec, data) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def get(self, scene_id):
+        """Returns the script for a scene, or None if none is stored."""
+        with self._lock:
+            row = self._conn.execute("SELECT codec, data FROM scripts WHERE scene_id = ?", (int(scene_id),)).fetchone()
+        return None if row is None else self._decompress(*row)
+
+    def delete(self, scene_id):
+        """Deletes the script for a scene (no-op if none is stored)."""
+        with self._lock:
+            self._conn.execute("DELETE FROM scripts WHERE scene_id = ?", (int(scene_id),))
+            self._conn.commit()
+
+    def __contains__(self, scene_id):
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM scripts WHERE scene_id = ?", (int(scene_id),)).fetchone()
+        return row is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM scripts").fetchone()[0]
+
+    def close(self):
+        """Closes the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,335 @@
+import json
+import re
+
+from llm_gateway import achat_completion, chat_completion
+
+# Models that accept `response_format={"type": "json_object"}`; others get JSON instructions only
+JSON_MODE_MODEL_PREFIXES = (
+    "gpt-4o", "gpt-4.1", "gpt-4-turbo", "gpt-4-1106", "gpt-4-0125",
+    "gpt-3.5-turbo-1106", "gpt-3.5-turbo-0125", "gpt-5", "o1", "o3", "o4"
+)
+
+_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "integer": int,
+    "number": (int, float),
+    "boolean": bool
+}
+
+
+class StructuredOutputError(ValueError):
+    """Raised when a response cannot be parsed or repaired into the expected schema."""
+
+
+def supports_json_mode(model):
+    """Returns True if the model accepts OpenAI's JSON mode."""
+    return model.startswith(JSON_MODE_MODEL_PREFIXES)
+
+
+def _extract_json_text(text):
+    """Strips code fences and surrounding prose, returning the outermost {...} block."""
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text.strip(), flags=re.IGNORECASE)
+    start = text.find("{")
+    end = text.rfind("}")
+    if start == -1:
+        return text
+    return text[start:end + 1] if end > start else text[start:]
+
+
+_TRAILING_COMMA = re.compile(r",\s*([}\]])")
+_PYTHON_LITERAL = re.compile(r"\b(True|False|None)\b")
+_JSON_LITERALS = {"True": "true", "False": "false", "None": "null"}
+
+
+def _sub_outside_strings(pattern, replacement, text):
+    """Like `pattern.sub`, but leaves the contents of JSON string literals untouched."""
+    parts = []
+    start = 0
+    in_string = False
+    escaped = False
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                parts.append(text[start:i + 1])
+                start = i + 1
+        elif char == '"':
+            parts.append(pattern.sub(replacement, text[start:i]))
+            start = i
+            in_string = True
+    rest = text[start:]
+    parts.append(rest if in_string else pattern.sub(replacement, rest))
+    return "".join(parts)
+
+
+def _replace_curly_delimiters(text):
+    """Turns curly double quotes used as string delimiters into '"', leaving string contents as is."""
+    chars = []
+    closing = None  # Quotes that end the string being scanned
+    escaped = False
+    for char in text:
+        if closing is None:
+            if char == '"':
+                closing = '"'
+            elif char in "“”":
+                closing = "“”"
+                char = '"'
+        elif escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char in closing:
+            closing = None
+            char = '"'
+        elif char == '"':
+            char = '\\"'  # A straight quote inside a curly-quoted string
+        chars.append(char)
+    return "".join(chars)
+
+
+def _balance_brackets(text):
+    """Closes strings and brackets left open by a truncated response."""
+    stack = []
+    in_string = False
+    escaped = False
+    for char in text:
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]" and stack:
+            stack.pop()
+    return text + ('"' if in_string else "") + "".join(reversed(stack))
+
+
+def parse_json_response(text):
+    """
+    Parses a model response as a JSON object, repairing common formatting drift locally.
+
+    Repairs (tried in order, cheapest first): code fences and prose around the object,
+    curly quotes used as string delimiters, trailing commas, Python literals (True/False/None),
+    and brackets left open by a truncated response. Text inside string values is left as is.
+
+    Args:
+        text (str): Raw model output.
+
+    Returns:
+        dict: The parsed object.
+
+    Raises:
+        StructuredOutputError: If the text cannot be repaired into a JSON object.
+    """
+    candidate = _extract_json_text(text)
+    repairs = [
+        lambda s: s,
+        _replace_curly_delimiters,
+        lambda s: _sub_outside_strings(_TRAILING_COMMA, r"\1", s),
+        lambda s: _sub_outside_strings(_PYTHON_LITERAL, lambda match: _JSON_LITERALS[match.group(1)], s),
+        _balance_brackets
+    ]
+
+    error = None
+    for repair in repairs:
+        candidate = repair(candidate)
+        try:
+            data = json.loads(candidate)
+        except json.JSONDecodeError as e:
+            error = e
+            continue
+        if not isinstance(data, dict):
+            raise StructuredOutputError("Expected a JSON object.")
+        return data
+    raise StructuredOutputError(f"Could not parse JSON response: {error}")
+
+
+def _coerce(value, schema):
+    """Converts a value to the schema's type where the intent is unambiguous (e.g., "A, B" -> ["A", "B"])."""
+    expected = schema.get("type")
+    if value is None and "default" in schema:
+        return schema["default"]
+    if expected == "array" and isinstance(value, str):
+        items = [item.strip(" -*\t") for item in re.split(r"[,\n;]", value)]
+        return [item for item in items if item]
+    if expected == "array" and value is None:
+        return []
+    if expected == "string" and isinstance(value, list):
+        return ", ".join(str(item) for item in value)
+    if expected == "string" and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    if expected == "integer" and isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        return int(value.strip())
+    if expected == "boolean" and isinstance(value, str) and value.strip().lower() in ("true", "false", "yes", "no"):
+        return value.strip().lower() in ("true", "yes")
+    return value
+
+
+def validate_schema(data, schema, path="$"):
+    """
+    Validates (and lightly coerces) data against a small JSON Schema subset.
+
+    Supports 'type', 'properties', 'required', 'items' and 'default'. Missing optional
+    properties with a 'default' are filled in, and values whose type is off in an obvious
+    way are coerced (see `_coerce`), so small drifts do not cost a re-request.
+
+    Args:
+        data: Parsed JSON value.
+        schema (dict): Schema to validate against.
+        path (str): Location used in error messages.
+
+    Returns:
+        The validated (possibly coerced) value.
+
+    Raises:
+        StructuredOutputError: If the data does not match the schema.
+    """
+    data = _coerce(data, schema)
+    expected = schema.get("type")
+    wrong_type = expected and not isinstance(data, _TYPES[expected])
+    if wrong_type or (expected in ("integer", "number") and isinstance(data, bool)):
+        raise StructuredOutputError(f"{path}: expected {expected}, got {type(data).__name__}")
+
+    if expected == "object":
+        # Match keys case-insensitively ("Summary" vs "summary")
+        lookup = {key.lower(): key for key in data}
+        for name, property_schema in schema.get("properties", {}).items():
+            key = lookup.get(name.lower(), name)
+            if key in data:
+                data[name] = validate_schema(data.pop(key), property_schema, f"{path}.{name}")
+            elif "default" in property_schema:
+                data[name] = property_schema["default"]
+            elif name in schema.get("required", []):
+                raise StructuredOutputError(f"{path}: missing required property '{name}'")
+    elif expected == "array" and "items" in schema:
+        data = [validate_schema(item, schema["items"], f"{path}[{i}]") for i, item in enumerate(data)]
+    return data
+
+
+def _json_prompt(prompt, schema):
+    instructions = (
+        "\n\nRespond with a single JSON object (no markdown, no commentary) matching this JSON Schema:\n"
+        + json.dumps(schema, indent=2)
+    )
+    if isinstance(prompt, list):
+        return prompt[:-1] + [{**prompt[-1], "content": prompt[-1]["content"] + instructions}]
+    return prompt + instructions
+
+
+def _retry_prompt(prompt, output, error):
+    messages = prompt if isinstance(prompt, list) else [{"role": "user", "content": prompt}]
+    return messages + [
+        {"role": "assistant", "content": output},
+        {"role": "user", "content": f"That response was invalid ({error}). Reply again with only the corrected JSON object."}
+    ]
+
+
+def _parse(output, schema):
+    return validate_schema(parse_json_response(output), schema)
+
+
+def structured_completion(
+    client,
+    prompt,
+    schema,
+    model="gpt-4",
+    temperature=0.7,
+    top_p=0.9,
+    error_message=None,
+    max_attempts=2
+):
+    """
+    Requests a JSON object matching `schema` and returns it parsed and validated.
+
+    JSON mode is used when the model supports it; the schema is always included in the
+    prompt. Malformed output is first repaired locally (`parse_json_response`,
+    `validate_schema`); only if that fails is the model asked again, with the parse error
+    fed back so the retry is a short correction rather than a fresh generation.
+
+    Args:
+        client: OpenAI client instance.
+        prompt (str or list): User prompt, or a full list of chat messages.
+        schema (dict): JSON Schema (subset) the response must match.
+        model (str): OpenAI model to use (default: "gpt-4").
+        temperature (float): Sampling temperature (default: 0.7).
+        top_p (float, optional): Nucleus sampling parameter (default: 0.9).
+        error_message (str, optional): Prefix for errors raised by the gateway.
+        max_attempts (int): Total model requests allowed, including correction requests (default: 2).
+
+    Returns:
+        dict: The validated object.
+
+    Raises:
+        LLMGatewayError: If the API call fails after the gateway's retries.
+        StructuredOutputError: If no response could be parsed into the schema.
+    """
+    request_prompt = _json_prompt(prompt, schema)
+    response_format = {"type": "json_object"} if supports_json_mode(model) else None
+
+    error = None
+    for _ in range(max_attempts):
+        output = chat_completion(
+            client,
+            request_prompt,
+            model=model,
+            temperature=temperature,
+            top_p=top_p,
+            error_message=error_message,
+            response_format=response_format
+        )
+        try:
+            return _parse(output, schema)
+        except StructuredOutputError as e:
+            error = e
+            request_prompt = _retry_prompt(request_prompt, output, e)
+
+    prefix = f"{error_message}: " if error_message else ""
+    raise StructuredOutputError(f"{prefix}{error}")
+
+
+async def astructured_completion(
+    client,
+    prompt,
+    schema,
+    model="gpt-4",
+    temperature=0.7,
+    top_p=0.9,
+    error_message=None,
+    max_attempts=2
+):
+    """
+    Async version of `structured_completion` (see `achat_completion` for client handling).
+    """
+    request_prompt = _json_prompt(prompt, schema)
+    response_format = {"type": "json_object"} if supports_json_mode(model) else None
+
+    error = None
+    for _ in range(max_attempts):
+        output = await achat_completion(
+            client,
+            request_prompt,
+            model=model,
+            temperature=temperature,
+            top_p=top_p,
+            error_message=error_message,
+            response_format=response_format
+        )
+        try:
+            return _parse(output, schema)
+        except StructuredOutputError as e:
+            error = e
+            request_prompt = _retry_prompt(request_prompt, output, e)
+
+    prefix = f"{error_message}: " if error_message else ""
+    raise StructuredOutputError(f"{prefix}{error}")
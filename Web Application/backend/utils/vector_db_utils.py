@@ -1,15 +1,66 @@
 
-from sentence_transformers import SentenceTransformer
+import asyncio
+
 import numpy as np
-import time
+from scene_metadata_store import make_scene_id
+from structured_output import astructured_completion, structured_completion
+
+SCENE_SUMMARY_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "summary": {"type": "string"},
+        "characters": {"type": "array", "items": {"type": "string"}},
+        "location": {"type": "string", "default": "Unknown"},
+        "recurring_joke": {"type": "string", "default": "None"},
+        "emotional_tone": {"type": "string", "default": ""}
+    },
+    "required": ["summary", "characters"]
+}
+
+# summarize_scene's fields plus the props/scenery the Environment agent needs
+SCENE_ANALYSIS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        **SCENE_SUMMARY_SCHEMA["properties"],
+        "key_details": {"type": "array", "items": {"type": "string"}, "default": []}
+    },
+    "required": ["summary", "characters"]
+}
+
+
+def _summary_prompt(sitcom_title, scene_script):
+    return f"""
+You are the head writer of a sitcom called "{sitcom_title}".
+
+Given the following scene script, extract:
+
+1. "summary": A concise summary (100–150 words) describing:
+   - Key actions and beats
+   - Character relationships and development
+   - Any important dialogue, props, or setups
+
+2. "characters": A list of character names who appear or speak
+
+3. "location": The main location of the scene, if clearly stated (e.g., "locksmith shop", "kitchen", "car interior"), otherwise "Unknown"
+
+4. "recurring_joke": Any recurring joke or callback that appears in the scene, otherwise "None"
+
+5. "emotional_tone": The emotional tone of the scene in one or two words (e.g., "hopeful", "awkward", "chaotic", "sweet")
+
+Scene:
+{scene_script}
+"""
+
 
 def summarize_scene(client, sitcom_title, scene_script, model="gpt-4", temperature=0.4, top_p=1.0):
     """
     Summarizes a sitcom scene and extracts structured metadata using the OpenAI API.
 
     This function parses a scene into key information such as summary, characters,
-    setting, recurring jokes, and emotional tone. It includes retry logic to handle
-    transient failures robustly (up to 3 attempts with exponential backoff).
+    setting, recurring jokes, and emotional tone. The model is asked for a JSON object
+    (JSON mode where the model supports it) that is validated against
+    SCENE_SUMMARY_SCHEMA. Formatting drift is repaired locally; the model is only asked
+    again (with the error fed back) if the response cannot be repaired.
 
     Args:
         client: OpenAI client instance.
@@ -28,94 +79,210 @@ def summarize_scene(client, sitcom_title, scene_script, model="gpt-4", temperatu
             - 'emotional_tone': One or two words capturing the emotional tone (str)
 
     Raises:
-        ValueError: If the API response is empty or incorrectly formatted.
-        Exception: If the API fails after 3 retry attempts or any other runtime issue.
+        StructuredOutputError: If the response cannot be parsed into the schema, even after a correction request.
+        LLMGatewayError: If the API fails after all retry attempts.
+    """
+    prompt = _summary_prompt(sitcom_title, scene_script)
+
+    return structured_completion(
+        client,
+        prompt,
+        SCENE_SUMMARY_SCHEMA,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message="Error summarizing scene"
+    )
+
+
+async def asummarize_scene(client, sitcom_title, scene_script, model="gpt-4", temperature=0.4, top_p=1.0):
+    """
+    Async version of `summarize_scene` (see `achat_completion` for client handling).
     """
-    prompt = f"""
+    return await astructured_completion(
+        client,
+        _summary_prompt(sitcom_title, scene_script),
+        SCENE_SUMMARY_SCHEMA,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message="Error summarizing scene"
+    )
+
+
+def _analysis_prompt(sitcom_title, scene_text, prior_characters=None):
+    prior_characters_text = ", ".join(sorted(prior_characters)) if prior_characters else "None"
+    return f"""
 You are the head writer of a sitcom called "{sitcom_title}".
 
-Given the following scene script, extract:
+Previously established characters: {prior_characters_text}
+
+Given the following scene, extract:
 
-1. A concise summary (100–150 words) describing:
+1. "summary": A concise summary (100–150 words) describing:
    - Key actions and beats
    - Character relationships and development
    - Any important dialogue, props, or setups
 
-2. A list of character names who appear or speak
+2. "characters": A list of character names who appear or speak (use the established spelling for returning characters)
 
-3. The main location of the scene, if clearly stated (e.g., "locksmith shop", "kitchen", "car interior")
+3. "location": A concise name for the main location of the scene (e.g., "locksmith shop", "kitchen", "car interior"), otherwise "Unknown"
 
-4. Any recurring joke or callback that appears in the scene (if applicable)
+4. "key_details": A list of key props, scenery, or environmental features that are important for the tone, humor, or character action
 
-5. The emotional tone of the scene in one or two words (e.g., "hopeful", "awkward", "chaotic", "sweet")
+5. "recurring_joke": Any recurring joke or callback that appears in the scene, otherwise "None"
 
-Format your output as:
+6. "emotional_tone": The emotional tone of the scene in one or two words (e.g., "hopeful", "awkward", "chaotic", "sweet")
 
-Summary:
-<summary>
+Scene:
+{scene_text}
+"""
 
-Characters:
-- Character1
-- Character2
-*Note* This is not capped at two
 
-Location:
-<location or "Unknown">
+def analyze_scene(client, sitcom_title, scene_text, prior_characters=None, scene_number=None, model="gpt-4",
+                  temperature=0.4, top_p=1.0):
+    """
+    Fused scene analysis: summary, characters, location, props, jokes and tone in one call.
 
-Recurring Joke:
-<description or "None">
+    Returns everything `summarize_scene` does plus 'key_details', so the result can be
+    stored with `add_scene_to_vector_db` as is. Passed to the agents as `scene_analysis`,
+    it also replaces the separate `characters_extraction` (Character agent) and
+    `analyze_environment` (Environment agent) requests, which otherwise re-derive the
+    same characters and location from the same text.
 
-Emotional Tone:
-<tone>
+    Args:
+        client: OpenAI client instance.
+        sitcom_title (str): Title of the sitcom.
+        scene_text (str): Scene script or scene description.
+        prior_characters (List[str], optional): Established character names, so the same
+            spelling is used for returning characters.
+        scene_number (int, optional): Number of the scene (used in error messages).
+        model (str): OpenAI model to use (default: "gpt-4").
+        temperature (float): Sampling temperature (default: 0.4).
+        top_p (float): Nucleus sampling parameter (default: 1.0).
 
-Scene:
-{scene_script}
-"""
+    Returns:
+        dict with the keys of `summarize_scene` plus:
+            - 'key_details': Props, scenery or environmental features important to the scene (List[str])
+
+    Raises:
+        StructuredOutputError: If the response cannot be parsed into the schema, even after a correction request.
+        LLMGatewayError: If the API fails after all retry attempts.
+    """
+    prompt = _analysis_prompt(sitcom_title, scene_text, prior_characters)
+    error_message = "Error analyzing scene" if scene_number is None else f"Error analyzing Scene {scene_number}"
+    return structured_completion(
+        client,
+        prompt,
+        SCENE_ANALYSIS_SCHEMA,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=error_message
+    )
+
+
+async def aanalyze_scene(client, sitcom_title, scene_text, prior_characters=None, scene_number=None, model="gpt-4",
+                         temperature=0.4, top_p=1.0):
+    """
+    Async version of `analyze_scene` (see `achat_completion` for client handling).
+    """
+    error_message = "Error analyzing scene" if scene_number is None else f"Error analyzing Scene {scene_number}"
+    return await astructured_completion(
+        client,
+        _analysis_prompt(sitcom_title, scene_text, prior_characters),
+        SCENE_ANALYSIS_SCHEMA,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=error_message
+    )
 
-    for attempt in range(3):
-        try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                top_p=top_p
-            )
-
-            if not response or not response.choices or not response.choices[0].message.content:
-                raise ValueError("Received an empty or malformed response from the API.")
-
-            output = response.choices[0].message.content.strip()
-
-            sections = output.split("\n\n")
-            parsed = {
-                "summary": "",
-                "characters": [],
-                "location": None,
-                "recurring_joke": None,
-                "emotional_tone": None
-            }
-
-            for section in sections:
-                if section.startswith("Summary:"):
-                    parsed["summary"] = section.replace("Summary:", "").strip()
-                elif section.startswith("Characters:"):
-                    parsed["characters"] = [line.strip("- ").strip() for line in section.splitlines()[1:] if line.strip()]
-                elif section.startswith("Location:"):
-                    parsed["location"] = section.replace("Location:", "").strip()
-                elif section.startswith("Recurring Joke:"):
-                    parsed["recurring_joke"] = section.replace("Recurring Joke:", "").strip()
-                elif section.startswith("Emotional Tone:"):
-                    parsed["emotional_tone"] = section.replace("Emotional Tone:", "").strip()
-
-            return parsed
-
-        except Exception as e:
-            if attempt == 2:
-                raise Exception(f"Error summarizing scene: {str(e)}")
-            time.sleep(2 ** attempt)
-
-
-def add_scene_to_vector_db(scene_metadata, full_script=None, embedding_model=None, index=None, vector_metadata=None):
+
+def load_embedding_backend(backend="sentence-transformers", model_name="sentence-transformers/all-MiniLM-L6-v2",
+                           **kwargs):
+    """
+    Loads an embedding backend for the vector DB helpers.
+
+    Every helper that takes an `embedding_model` only relies on two methods, so any object
+    providing them can be used:
+        - encode(sentences, batch_size=32, **kwargs): 1-D vector for a str, 2-D array for a list
+        - get_sentence_embedding_dimension(): int
+
+    Args:
+        backend (str): "sentence-transformers" (PyTorch), "onnx" (ONNX Runtime, CPU) or
+            "onnx-int8" (ONNX Runtime with int8 dynamically quantized weights).
+        model_name (str): Hugging Face model name (default: all-MiniLM-L6-v2).
+        **kwargs: Extra arguments for the backend class (see embedding_backends).
+
+    Returns:
+        An embedding backend with a `name` attribute identifying the model and variant.
+
+    Raises:
+        ValueError: If the backend name is not recognized.
+    """
+    from embedding_backends import OnnxEmbeddingBackend, SentenceTransformerBackend
+
+    if backend == "sentence-transformers":
+        return SentenceTransformerBackend(model_name, **kwargs)
+    if backend in ("onnx", "onnx-int8"):
+        return OnnxEmbeddingBackend(model_name, quantized=backend == "onnx-int8", **kwargs)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def _scene_record(scene_metadata, full_script=None, scene_number=None, episode=None, inline_script=True):
+    """Builds the metadata record stored alongside a scene's embedding."""
+    record = {
+        "summary": scene_metadata["summary"],
+        "characters": scene_metadata["characters"],
+        "location": scene_metadata["location"],
+        "recurring_joke": scene_metadata["recurring_joke"],
+        "emotional_tone": scene_metadata["emotional_tone"]
+    }
+    if scene_metadata.get("key_details"):
+        record["key_details"] = scene_metadata["key_details"]
+    if inline_script:
+        record["script"] = full_script
+    scene_number = scene_number or scene_metadata.get("scene_number")
+    if scene_number:
+        record["scene_number"] = scene_number
+    episode = episode or scene_metadata.get("episode")
+    if episode:
+        record["episode"] = episode
+    return record
+
+
+def _script_key(record):
+    """ID under which a stored scene's script is kept in a ScriptStore."""
+    return record.get("scene_id") or make_scene_id(record.get("episode") or 1, record["scene_number"])
+
+
+def load_scene_script(meta, script_store=None):
+    """
+    Returns the full script of a stored scene.
+
+    Args:
+        meta (dict): Stored scene metadata record.
+        script_store: (Optional) ScriptStore the script was written to.
+
+    Returns:
+        str: The script, or None if it was not stored.
+    """
+    if "script" in meta or script_store is None:
+        return meta.get("script")
+    return script_store.get(_script_key(meta))
+
+
+def _profile_key(record):
+    """Key under which a stored scene is registered with a CharacterProfileStore."""
+    if "episode" in record:
+        return f"{record['episode']}:{record['scene_number']}"
+    return record["scene_number"]
+
+
+def add_scene_to_vector_db(scene_metadata, full_script=None, embedding_model=None, index=None, vector_metadata=None,
+                           profile_store=None, vector_store=None, scene_number=None, episode=None,
+                           script_store=None):
     """
     Stores a scene's summary and metadata into the vector database.
 
@@ -125,23 +292,266 @@ def add_scene_to_vector_db(scene_metadata, full_script=None, embedding_model=Non
         embedding_model: Model to encode the summary
         index: FAISS index to store the vector
         vector_metadata: List to store metadata for retrieval
+        profile_store: (Optional) CharacterProfileStore to notify of the new scene, so the
+            profiles of the characters in it are updated incrementally
+        vector_store: (Optional) PersistentVectorStore; replaces `index` and `vector_metadata`
+            and logs the scene to its write-ahead log so it survives a restart. A scene that
+            is already stored under the same (episode, scene_number) is replaced.
+        scene_number: (Optional) Scene number; defaults to the next number
+        episode: (Optional) Episode number (vector stores default to episode 1)
+        script_store: (Optional) ScriptStore for `full_script`; the script is then kept out of
+            the in-memory metadata and read back with `load_scene_script`
+
+    Returns:
+        dict: The stored metadata record, including its 'scene_number'
+    """
+    if vector_store is not None:
+        index = vector_store.index
+        vector_metadata = vector_store.metadata
+
+    if embedding_model is None or index is None or vector_metadata is None:
+        raise ValueError("embedding_model, index, and vector_metadata must all be provided.")
+
+    embedding = embedding_model.encode(scene_metadata["summary"])
+    record = _scene_record(scene_metadata, full_script, scene_number, episode, inline_script=script_store is None)
+
+    if vector_store is not None:
+        record = vector_store.add(embedding, record)
+    else:
+        record.setdefault("scene_number", len(vector_metadata) + 1)
+        index.add(np.array([embedding]))
+        vector_metadata.append(record)
+
+    if script_store is not None and full_script is not None:
+        script_store.put(_script_key(record), full_script)
+
+    if profile_store is not None:
+        profile_store.record_scene(_profile_key(record), scene_metadata)
+
+    return record
+
+
+def add_scenes_to_vector_db(scene_metadata_list, full_scripts=None, embedding_model=None, index=None,
+                            vector_metadata=None, batch_size=32, profile_store=None, vector_store=None, episode=None,
+                            script_store=None):
+    """
+    Stores many scenes at once (e.g., when backfilling whole episodes).
+
+    All summaries are encoded in a single batched `encode` call, the embeddings are added
+    with one `index.add` of a stacked float32 matrix, and the metadata list is extended in
+    bulk. This is much faster than calling `add_scene_to_vector_db` once per scene.
+
+    Args:
+        scene_metadata_list (list of dict): Outputs of summarize_scene(), in scene order
+        full_scripts (list of str): (Optional) Raw script text for each scene, aligned with `scene_metadata_list`
+        embedding_model: Model to encode the summaries
+        index: FAISS index to store the vectors
+        vector_metadata: List to store metadata for retrieval
+        batch_size (int): Batch size passed to `embedding_model.encode` (default: 32)
+        profile_store: (Optional) CharacterProfileStore to notify of the new scenes
+        vector_store: (Optional) PersistentVectorStore; replaces `index` and `vector_metadata`
+        episode: (Optional) Episode the scenes belong to. Each scene's 'scene_number' is taken
+            from its metadata when present, otherwise scenes are numbered consecutively.
+        script_store: (Optional) ScriptStore for `full_scripts` (kept out of the in-memory metadata)
+
+    Returns:
+        List[dict]: The stored metadata records
     """
+    if vector_store is not None:
+        index = vector_store.index
+        vector_metadata = vector_store.metadata
+
     if embedding_model is None or index is None or vector_metadata is None:
         raise ValueError("embedding_model, index, and vector_metadata must all be provided.")
 
-    summary = scene_metadata["summary"]
-    embedding = embedding_model.encode(summary)
+    if full_scripts is not None and len(full_scripts) != len(scene_metadata_list):
+        raise ValueError("full_scripts must have one entry per scene.")
 
-    index.add(np.array([embedding]))
+    if not scene_metadata_list:
+        return []
+
+    summaries = [scene["summary"] for scene in scene_metadata_list]
+    embeddings = np.asarray(embedding_model.encode(summaries, batch_size=batch_size), dtype="float32")
+
+    scripts = full_scripts if full_scripts is not None else [None] * len(scene_metadata_list)
+    records = [
+        _scene_record(scene, script, episode=episode, inline_script=script_store is None)
+        for scene, script in zip(scene_metadata_list, scripts)
+    ]
+
+    if vector_store is not None:
+        records = vector_store.add_batch(embeddings, records)
+        scenes_by_key = {_profile_key(record): scene for record, scene in zip(records, scene_metadata_list)}
+    else:
+        start = len(vector_metadata)
+        for offset, record in enumerate(records):
+            record.setdefault("scene_number", start + offset + 1)
+        index.add(np.ascontiguousarray(embeddings))
+        vector_metadata.extend(records)
+        scenes_by_key = {_profile_key(record): scene for record, scene in zip(records, scene_metadata_list)}
+
+    if script_store is not None:
+        script_store.put_many((_script_key(record), script) for record, script in zip(records, scripts))
+
+    if profile_store is not None:
+        for scene_key, scene in scenes_by_key.items():
+            profile_store.record_scene(scene_key, scene)
+
+    return records
 
-    vector_metadata.append({
-        "summary": summary,
-        "characters": scene_metadata["characters"],
-        "location": scene_metadata["location"],
-        "recurring_joke": scene_metadata["recurring_joke"],
-        "emotional_tone": scene_metadata["emotional_tone"],
-        "script": full_script
-    })
+
+def _matches_filters(meta, scene_number, filters):
+    """Checks a metadata record against `search_vector_db` filters."""
+    characters = filters.get("characters")
+    if characters and not set(characters) & set(meta.get("characters", [])):
+        return False
+
+    location = filters.get("location")
+    if location and location.lower() not in (meta.get("location") or "").lower():
+        return False
+
+    scene_range = filters.get("scene_range")
+    if scene_range:
+        start, end = scene_range
+        if (start is not None and scene_number < start) or (end is not None and scene_number > end):
+            return False
+
+    return True
+
+
+def search_vector_db(query_text, embedding_model=None, index=None, vector_metadata=None, k=5, filters=None):
+    """
+    Retrieves the prior scenes most semantically similar to a query, with optional metadata filters.
+
+    The query is embedded with the same model used for ingestion and searched against the
+    FAISS index. When filters are given, the search over-fetches candidates and keeps the
+    closest `k` that pass every filter.
+
+    Args:
+        query_text (str): Text to search for (e.g., a scene description).
+        embedding_model: Model used to encode the query (same as for ingestion).
+        index: FAISS index holding the scene embeddings.
+        vector_metadata (list): Metadata list aligned with the index.
+        k (int): Number of scenes to return (default: 5).
+        filters (dict, optional): Any of:
+            - 'characters' (List[str]): Keep scenes featuring at least one of these characters
+            - 'location' (str): Keep scenes whose location contains this text (case-insensitive)
+            - 'scene_range' (Tuple[int, int]): Keep scenes whose number is within [start, end]; either bound may be None
+
+    Returns:
+        List[dict]: Up to `k` metadata dicts, closest first, each extended with:
+            - 'scene_number': Scene number (stored value or 1-based position)
+            - 'distance': L2 distance between the query and the scene summary
+    """
+    if embedding_model is None or index is None or vector_metadata is None:
+        raise ValueError("embedding_model, index, and vector_metadata must all be provided.")
+
+    filters = filters or {}
+    total = min(index.ntotal, len(vector_metadata))
+    if total == 0 or k <= 0:
+        return []
+
+    query = np.asarray(embedding_model.encode(query_text), dtype="float32").reshape(1, -1)
+    fetch = min(total, k if not filters else max(k * 4, 20))
+
+    while True:
+        distances, positions = index.search(query, fetch)
+        results = []
+        for distance, position in zip(distances[0], positions[0]):
+            # ID-keyed stores label vectors by scene ID rather than position
+            if hasattr(vector_metadata, "position_of_label"):
+                position = vector_metadata.position_of_label(position)
+            if position is None or position < 0 or position >= total:
+                continue
+            position = int(position)
+            meta = vector_metadata[position]
+            scene_number = meta.get("scene_number", position + 1)
+            if not _matches_filters(meta, scene_number, filters):
+                continue
+            results.append({**meta, "scene_number": scene_number, "distance": float(distance)})
+            if len(results) == k:
+                return results
+
+        if fetch >= total:
+            return results
+        fetch = total
+
+
+def retrieve_prior_scenes(vector_metadata, num_scenes, query_text=None, embedding_model=None, index=None,
+                          filters=None, include_latest=False):
+    """
+    Returns the prior scenes an agent should use as context, in chronological order.
+
+    Without an embedding model and index this is the original recency window
+    (`vector_metadata[-num_scenes:]`). With them, the `num_scenes` scenes most relevant
+    to `query_text` are retrieved via `search_vector_db`, so callbacks to older scenes
+    are not missed.
+
+    Args:
+        vector_metadata (list): Metadata for all stored scenes.
+        num_scenes (int): Number of prior scenes to return.
+        query_text (str, optional): Text used for semantic retrieval (e.g., the scene description).
+        embedding_model: (Optional) Model used to encode the query.
+        index: (Optional) FAISS index aligned with `vector_metadata`.
+        filters (dict, optional): Filters passed through to `search_vector_db`.
+        include_latest (bool): Always include the most recent scene (useful for transition checks).
+
+    Returns:
+        List[dict]: Scene metadata dicts sorted by (episode, scene number).
+    """
+    if embedding_model is None or index is None or not query_text:
+        if filters:
+            candidates = enumerate(vector_metadata)
+            characters = filters.get("characters")
+            # Use the character index of a SceneMetadataStore instead of scanning every scene
+            if characters and hasattr(vector_metadata, "positions_with_character"):
+                positions = sorted({
+                    position
+                    for character in characters
+                    for position in vector_metadata.positions_with_character(character)
+                })
+                candidates = ((position, vector_metadata[position]) for position in positions)
+            numbered = [
+                meta for position, meta in candidates
+                if _matches_filters(meta, meta.get("scene_number", position + 1), filters)
+            ]
+            return numbered[-num_scenes:]
+        return vector_metadata[-num_scenes:]
+
+    scenes = search_vector_db(
+        query_text,
+        embedding_model=embedding_model,
+        index=index,
+        vector_metadata=vector_metadata,
+        k=num_scenes,
+        filters=filters
+    )
+
+    def chronological_key(scene):
+        return scene.get("episode", 1), scene["scene_number"]
+
+    if include_latest and vector_metadata:
+        latest = {**vector_metadata[-1], "scene_number": vector_metadata[-1].get("scene_number", len(vector_metadata))}
+        if all(chronological_key(scene) != chronological_key(latest) for scene in scenes):
+            scenes = scenes[:max(num_scenes - 1, 0)] + [latest]
+
+    return sorted(scenes, key=chronological_key)
+
+
+async def aretrieve_prior_scenes(vector_metadata, num_scenes, query_text=None, embedding_model=None, index=None,
+                                 filters=None, include_latest=False):
+    """
+    Async version of `retrieve_prior_scenes`.
+
+    Semantic retrieval encodes the query (loading the embedding model on first use), so it
+    runs on a worker thread instead of stalling the event loop; the recency window does not.
+    """
+    if embedding_model is None or index is None or not query_text:
+        return retrieve_prior_scenes(vector_metadata, num_scenes, filters=filters, include_latest=include_latest)
+    return await asyncio.to_thread(
+        retrieve_prior_scenes, vector_metadata, num_scenes, query_text=query_text,
+        embedding_model=embedding_model, index=index, filters=filters, include_latest=include_latest
+    )
 
 
 def store_scene_in_vector_db(
@@ -150,7 +560,13 @@ def store_scene_in_vector_db(
     scene_script,
     embedding_model,
     index,
-    vector_metadata
+    vector_metadata,
+    profile_store=None,
+    vector_store=None,
+    scene_number=None,
+    episode=None,
+    script_store=None,
+    fused_analysis=False
 ):
     """
     Summarizes a sitcom scene and adds it to a vector database.
@@ -162,16 +578,34 @@ def store_scene_in_vector_db(
         embedding_model: Embedding model used to encode the summary.
         index: FAISS or other vector index for similarity search.
         vector_metadata (list): List storing metadata for all stored scenes.
+        profile_store: (Optional) CharacterProfileStore whose profiles for the scene's
+            characters are updated right after ingestion.
+        vector_store: (Optional) PersistentVectorStore to use instead of `index` and `vector_metadata`.
+        scene_number (int): (Optional) Scene number; a stored scene with the same number is replaced.
+        episode (int): (Optional) Episode number.
+        script_store: (Optional) ScriptStore for the full script.
+        fused_analysis (bool): Use `analyze_scene` instead of `summarize_scene`, so the stored
+            metadata also includes the scene's key props and scenery ('key_details').
 
     Returns:
         None. Prints summary and updates the vector DB and metadata list.
     """
     # Summarize scene
-    scene_summary = summarize_scene(
-        client=client,
-        sitcom_title=sitcom_title,
-        scene_script=scene_script
-    )
+    if fused_analysis:
+        stored = vector_store.metadata if vector_store is not None else vector_metadata
+        scene_summary = analyze_scene(
+            client=client,
+            sitcom_title=sitcom_title,
+            scene_text=scene_script,
+            prior_characters={name for meta in stored for name in meta.get("characters", [])},
+            scene_number=scene_number
+        )
+    else:
+        scene_summary = summarize_scene(
+            client=client,
+            sitcom_title=sitcom_title,
+            scene_script=scene_script
+        )
 
     # Add to vector database
     add_scene_to_vector_db(
@@ -179,9 +613,22 @@ def store_scene_in_vector_db(
         full_script=scene_script,
         embedding_model=embedding_model,
         index=index,
-        vector_metadata=vector_metadata
+        vector_metadata=vector_metadata,
+        profile_store=profile_store,
+        vector_store=vector_store,
+        scene_number=scene_number,
+        episode=episode,
+        script_store=script_store
     )
 
+    if vector_store is not None:
+        index = vector_store.index
+        vector_metadata = vector_store.metadata
+
+    # Fold the new appearance into each character's stored profile
+    if profile_store is not None:
+        profile_store.refresh(client, characters=scene_summary["characters"])
+
     # Print confirmation and metadata
     print("Total scenes stored in vector DB:", index.ntotal, "\n")
 
@@ -192,3 +639,26 @@ def store_scene_in_vector_db(
         print("Location:", meta["location"])
         print("Recurring Joke:", meta["recurring_joke"])
         print("Emotional Tone:", meta["emotional_tone"])
+
+
+def remove_scene_from_vector_db(vector_store, scene_number, episode=1, profile_store=None, script_store=None):
+    """
+    Removes a scene from a PersistentVectorStore (e.g., when the user discards it).
+
+    Args:
+        vector_store: PersistentVectorStore holding the scene.
+        scene_number (int): Number of the scene to remove.
+        episode (int): Episode of the scene (default: 1).
+        profile_store: (Optional) CharacterProfileStore; profiles of the scene's characters
+            are rebuilt without it.
+        script_store: (Optional) ScriptStore holding the scene's script, which is deleted too.
+
+    Returns:
+        dict: The removed metadata record, or None if the scene was not stored.
+    """
+    record = vector_store.remove(scene_number, episode=episode)
+    if record is not None and profile_store is not None:
+        profile_store.remove_scene(_profile_key(record))
+    if record is not None and script_store is not None:
+        script_store.delete(_script_key(record))
+    return record
@@ -0,0 +1,349 @@
+import base64
+import json
+import os
+import shutil
+import threading
+
+import faiss
+import numpy as np
+
+from scene_metadata_store import SceneMetadataStore, make_scene_id
+from vector_index import (
+    DEFAULT_TRAIN_THRESHOLD, create_id_index, needs_upgrade, remove_from_index, upgrade_index
+)
+
+MAX_WAL_BYTES = 16 * 1024 * 1024  # WAL size that triggers a checkpoint (about 5,000 384-d scenes)
+
+
+def _fsync_file(path):
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+
+def _fsync_directory(path):
+    # Makes new and renamed entries in `path` durable; directories cannot be opened on Windows
+    if os.name == "nt":
+        return
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class PersistentVectorStore:
+    """
+    On-disk FAISS index plus scene metadata, with an append-only write-ahead log.
+
+    Layout of `directory`:
+        CURRENT                 Name of the active snapshot directory
+        snapshot-<gen>/index.faiss     Index written with `faiss.write_index`
+        snapshot-<gen>/metadata.jsonl  One compact JSON record per scene
+        wal.jsonl               Upserts and removals since the snapshot
+
+    Every scene has a stable ID derived from (episode, scene_number) (see `make_scene_id`).
+    The ID is both the scene's FAISS label and the key of its metadata record, so storing a
+    regenerated scene replaces the old version instead of appending a duplicate.
+
+    Every write is appended to the WAL and fsync'd before returning, so a scene is durable
+    as soon as it is stored. `checkpoint` folds the WAL into a new snapshot; it runs on close
+    and whenever the WAL grows past `max_wal_bytes`. The snapshot files are fsync'd before
+    CURRENT is switched to them, so the WAL is never truncated ahead of a durable snapshot.
+    On `open`, the snapshot index is loaded memory-mapped (`IO_FLAG_MMAP`) and the WAL is
+    replayed, so a restart does not need to re-run summarization or re-encode anything.
+
+    The index type is configurable (see `vector_index.create_index`). An "ivfpq" store
+    starts out flat and is rebuilt as IVF-PQ once `train_threshold` scenes exist.
+    """
+
+    def __init__(self, directory, index, metadata, snapshot_count=0, generation=0, index_type="flat",
+                 index_options=None, train_threshold=DEFAULT_TRAIN_THRESHOLD, max_wal_bytes=MAX_WAL_BYTES):
+        """
+        Initializes the store. Use `PersistentVectorStore.open` rather than calling this directly.
+
+        Args:
+            directory (str): Directory holding the snapshot and WAL.
+            index: FAISS index labelled by scene ID.
+            metadata (SceneMetadataStore): Metadata keyed by the same scene IDs.
+            snapshot_count (int): Number of scenes contained in the current snapshot.
+            generation (int): Generation number of the current snapshot.
+            index_type (str): Target index type: "flat", "hnsw" or "ivfpq" (default: "flat").
+            index_options (dict): Extra arguments for `create_index` (optional).
+            train_threshold (int): Number of scenes at which an "ivfpq" store is trained.
+            max_wal_bytes (int): WAL size at which a write triggers a checkpoint (default: MAX_WAL_BYTES).
+        """
+        self.directory = directory
+        self.index = index
+        self.metadata = metadata
+        self.snapshot_count = snapshot_count
+        self.generation = generation
+        self.index_type = index_type
+        self.index_options = index_options or {}
+        self.train_threshold = train_threshold
+        self.max_wal_bytes = max_wal_bytes
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._wal_path = os.path.join(directory, "wal.jsonl")
+        self._wal = open(self._wal_path, "a", encoding="utf-8")
+        self._wal_bytes = os.path.getsize(self._wal_path)
+
+    @classmethod
+    def open(cls, directory, dimension, mmap=True, index_type="flat", index_options=None,
+             train_threshold=DEFAULT_TRAIN_THRESHOLD, max_wal_bytes=MAX_WAL_BYTES):
+        """
+        Opens (or creates) a persistent vector store.
+
+        Args:
+            directory (str): Directory for the store's files.
+            dimension (int): Embedding dimension (used when creating a new index).
+            mmap (bool): Load the snapshot index memory-mapped (default: True).
+            index_type (str): Index type for a new store: "flat", "hnsw" or "ivfpq" (default: "flat").
+                An existing snapshot keeps its type, except that a flat "ivfpq" store is
+                trained once it reaches `train_threshold` scenes.
+            index_options (dict): Extra arguments for `create_index` (optional).
+            train_threshold (int): Number of scenes at which an "ivfpq" store is trained.
+            max_wal_bytes (int): WAL size at which a write triggers a checkpoint (default: MAX_WAL_BYTES).
+
+        Returns:
+            PersistentVectorStore: The loaded store with the WAL replayed.
+        """
+        os.makedirs(directory, exist_ok=True)
+        current_path = os.path.join(directory, "CURRENT")
+        index_options = index_options or {}
+        # IVF-PQ cannot be trained on an empty store, so it starts flat
+        staging_type = index_type if index_type != "ivfpq" else "flat"
+
+        index = None
+        metadata = SceneMetadataStore()
+        generation = 0
+        if os.path.exists(current_path):
+            with open(current_path, "r", encoding="utf-8") as f:
+                snapshot_name = f.read().strip()
+            generation = int(snapshot_name.rsplit("-", 1)[1])
+            snapshot_dir = os.path.join(directory, snapshot_name)
+            flags = faiss.IO_FLAG_MMAP if mmap else 0
+            index_path = os.path.join(snapshot_dir, "index.faiss")
+            index = faiss.read_index(index_path, flags)
+            if mmap and faiss.try_extract_index_ivf(index) is not None:
+                index = faiss.read_index(index_path)  # Memory-mapped IVF lists are read-only
+            with open(os.path.join(snapshot_dir, "metadata.jsonl"), "r", encoding="utf-8") as f:
+                metadata.extend(json.loads(line) for line in f if line.strip())
+
+        if index is None:
+            index = create_id_index(dimension, staging_type, **index_options)
+
+        store = cls(
+            directory, index, metadata,
+            snapshot_count=len(metadata),
+            generation=generation,
+            index_type=index_type,
+            index_options=index_options,
+            train_threshold=train_threshold,
+            max_wal_bytes=max_wal_bytes
+        )
+        store._replay_wal()
+        with store._lock:
+            store._maybe_upgrade_index()
+            store._maybe_checkpoint()
+        return store
+
+    def _replay_wal(self):
+        if not os.path.exists(self._wal_path):
+            return
+
+        # Upserts and removals are idempotent, so replaying records already folded into
+        # the snapshot (a crash between checkpoint and WAL truncation) is harmless
+        valid_bytes = 0
+        torn = False
+        with self._lock, open(self._wal_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    torn = True  # Torn final write from a crash; everything before it is intact
+                    break
+                valid_bytes += len(line)
+                if record["op"] == "upsert":
+                    embedding = np.frombuffer(base64.b64decode(record["embedding"]), dtype="float32")
+                    self._apply_upserts(embedding.reshape(1, -1), [record["meta"]])
+                elif record["op"] == "remove":
+                    self._apply_remove([record["scene_id"]])
+
+        # Drop the torn tail so later appends are not hidden behind it
+        if torn:
+            with open(self._wal_path, "r+b") as f:
+                f.truncate(valid_bytes)
+        self._wal_bytes = valid_bytes
+
+    def _keyed(self, meta, next_numbers):
+        episode = meta.get("episode") or 1
+        scene_number = meta.get("scene_number")
+        if not scene_number:
+            # `next_numbers` tracks numbers handed out earlier in the same batch
+            scene_number = next_numbers.get(episode) or self.metadata.next_scene_number(episode)
+            next_numbers[episode] = scene_number + 1
+        return {**meta, "episode": episode, "scene_number": scene_number,
+                "scene_id": make_scene_id(episode, scene_number)}
+
+    def _log(self, records):
+        for record in records:
+            line = json.dumps(record, separators=(",", ":")) + "\n"
+            self._wal.write(line)
+            self._wal_bytes += len(line.encode("utf-8"))
+        self._wal.flush()
+        os.fsync(self._wal.fileno())
+
+    def _maybe_checkpoint(self):
+        # Called with the lock held after a write; keeps the WAL (and replay time) bounded
+        if self._wal_bytes >= self.max_wal_bytes:
+            self._checkpoint_locked()
+
+    def _apply_upserts(self, embeddings, metas):
+        ids = np.asarray([meta["scene_id"] for meta in metas], dtype="int64")
+        existing = [scene_id for scene_id in ids if self.metadata.position_of(int(scene_id)) is not None]
+        if existing:
+            self.index = remove_from_index(self.index, existing, self.index_type, **self.index_options)
+        self.index.add_with_ids(embeddings, ids)
+        for meta in metas:
+            self.metadata.upsert_scene(meta)
+        self._dirty = True
+        self._maybe_upgrade_index()
+
+    def _apply_remove(self, scene_ids):
+        scene_ids = [scene_id for scene_id in scene_ids if self.metadata.position_of(scene_id) is not None]
+        if not scene_ids:
+            return
+        self.index = remove_from_index(self.index, scene_ids, self.index_type, **self.index_options)
+        for scene_id in scene_ids:
+            self.metadata.remove_scene(scene_id)
+        self._dirty = True
+
+    def add(self, embedding, meta):
+        """
+        Stores one scene (replacing any earlier version of it) and durably logs it to the WAL.
+
+        Args:
+            embedding: Summary embedding (1-D array).
+            meta (dict): Scene metadata record. Its 'episode' defaults to 1 and its
+                'scene_number' to the next number in that episode.
+
+        Returns:
+            dict: The stored record, including 'episode', 'scene_number' and 'scene_id'.
+        """
+        return self.add_batch(np.asarray(embedding, dtype="float32").reshape(1, -1), [meta])[0]
+
+    def add_batch(self, embeddings, metas):
+        """
+        Stores several scenes with a single index update and a single WAL fsync.
+
+        Args:
+            embeddings: 2-D float32 array with one row per scene.
+            metas (list of dict): Scene metadata records, aligned with `embeddings`.
+
+        Returns:
+            List[dict]: The stored records, including 'episode', 'scene_number' and 'scene_id'.
+        """
+        embeddings = np.ascontiguousarray(embeddings, dtype="float32")
+        with self._lock:
+            next_numbers = {}
+            keyed = [self._keyed(meta, next_numbers) for meta in metas]
+
+            # If a batch contains the same scene twice, the last version wins
+            latest = {meta["scene_id"]: row for row, meta in enumerate(keyed)}
+            rows = sorted(latest.values())
+            embeddings, keyed = embeddings[rows], [keyed[row] for row in rows]
+
+            self._log(
+                {
+                    "op": "upsert",
+                    "embedding": base64.b64encode(embedding.tobytes()).decode("ascii"),
+                    "meta": meta
+                }
+                for embedding, meta in zip(embeddings, keyed)
+            )
+            self._apply_upserts(embeddings, keyed)
+            self._maybe_checkpoint()
+            return keyed
+
+    def remove(self, scene_number, episode=1):
+        """
+        Removes a scene from the index and metadata.
+
+        Returns:
+            dict: The removed record, or None if the scene was not stored.
+        """
+        scene_id = make_scene_id(episode, scene_number)
+        with self._lock:
+            meta = self.metadata.get_scene(scene_id)
+            if meta is None:
+                return None
+            self._log([{"op": "remove", "scene_id": scene_id}])
+            self._apply_remove([scene_id])
+            self._maybe_checkpoint()
+            return meta
+
+    def get(self, scene_number, episode=1):
+        """Returns the stored record for a scene, or None."""
+        return self.metadata.get_scene(make_scene_id(episode, scene_number))
+
+    def _maybe_upgrade_index(self):
+        # Callers must read `store.index` afresh after writes, since this swaps the index object
+        if needs_upgrade(self.index, self.index_type, self.train_threshold):
+            self.index = upgrade_index(self.index, self.index_type, **self.index_options)
+            self._dirty = True
+
+    def checkpoint(self):
+        """Writes a new snapshot of the index and metadata, then truncates the WAL."""
+        with self._lock:
+            if self._dirty:
+                self._checkpoint_locked()
+
+    def _checkpoint_locked(self):
+        count = len(self.metadata)
+        generation = self.generation + 1
+        name = f"snapshot-{generation}"
+        snapshot_dir = os.path.join(self.directory, name)
+        tmp_dir = f"{snapshot_dir}.tmp"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        index_path = os.path.join(tmp_dir, "index.faiss")
+        faiss.write_index(self.index, index_path)
+        _fsync_file(index_path)
+        with open(os.path.join(tmp_dir, "metadata.jsonl"), "w", encoding="utf-8") as f:
+            for meta in self.metadata:
+                f.write(json.dumps(meta.to_dict(), separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        _fsync_directory(tmp_dir)
+
+        os.replace(tmp_dir, snapshot_dir)
+        _fsync_directory(self.directory)
+
+        # Switching CURRENT is the atomic commit point of the checkpoint; it must be durable
+        # before the WAL is truncated
+        current_path = os.path.join(self.directory, "CURRENT")
+        with open(f"{current_path}.tmp", "w", encoding="utf-8") as f:
+            f.write(name)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f"{current_path}.tmp", current_path)
+        _fsync_directory(self.directory)
+
+        self._wal.close()
+        self._wal = open(self._wal_path, "w", encoding="utf-8")
+        self._wal_bytes = 0
+        self.snapshot_count = count
+        self.generation = generation
+        self._dirty = False
+
+        for entry in os.listdir(self.directory):
+            if entry.startswith("snapshot-") and entry != name and not entry.endswith(".tmp"):
+                shutil.rmtree(os.path.join(self.directory, entry), ignore_errors=True)
+
+    def close(self, checkpoint=True):
+        """Closes the WAL, optionally writing a final snapshot first."""
+        if checkpoint:
+            self.checkpoint()
+        with self._lock:
+            self._wal.close()
@@ -20,6 +20,45 @@ import jsPDF from 'jspdf';
 
 const API_BASE_URL = 'http://127.0.0.1:5000/api';
 
+// POSTs to a Server-Sent Events endpoint and calls onDelta with each chunk of text as it
+// arrives. Resolves with the payload of the final 'done' event.
+const fetchEventStream = async (url, body, onDelta) => {
+  const response = await fetch(url, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(body)
+  });
+  if (!response.ok || !response.body) {
+    const data = await response.json().catch(() => ({}));
+    throw new Error(data.error || `Request failed with status ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  while (true) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const events = buffer.split('\n\n');
+    buffer = events.pop();
+    for (const rawEvent of events) {
+      let eventType = 'message';
+      let dataText = '';
+      rawEvent.split('\n').forEach(line => {
+        if (line.startsWith('event:')) eventType = line.slice(6).trim();
+        else if (line.startsWith('data:')) dataText += line.slice(5).trim();
+      });
+      if (!dataText) continue;
+      const data = JSON.parse(dataText);
+      if (eventType === 'error') throw new Error(data.error);
+      if (eventType === 'done') return data;
+      if (data.delta) onDelta(data.delta);
+    }
+  }
+  throw new Error('The scene stream ended unexpectedly');
+};
+
 const steps = [
   'API Key',
   'Initializing',
@@ -125,6 +164,8 @@ function chunkArray(array, size) {
 function App() {
   const [activeStep, setActiveStep] = useState(0);
   const [apiKey, setApiKey] = useState('');
+  // Identifies this session's project so the backend keeps its scene history separate
+  const [projectId] = useState(() => `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`);
   const [keywords, setKeywords] = useState({
     setting: '',
     characters: '',
@@ -158,6 +199,9 @@ function App() {
   
   // Store all scenes in a single object
   const [scenes, setScenes] = useState({});
+  // Scene currently being streamed from the server and the text received so far
+  const [streamingScene, setStreamingScene] = useState(null);
+  const [streamingText, setStreamingText] = useState('');
   const [vectorInfoByScene, setVectorInfoByScene] = useState({});
   
   // Original steps for concept generation
@@ -260,18 +304,20 @@ function App() {
   const generateScene1 = async () => {
     setLoading(true);
     setError('');
+    setStreamingScene(1);
+    setStreamingText('');
     try {
-      const response = await fetch(`${API_BASE_URL}/generate-scene-1`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ apiKey, outline })
-      });
-      const data = await response.json();
-      if (data.error) throw new Error(data.error);
+      const data = await fetchEventStream(
+        `${API_BASE_URL}/generate-scene-1/stream`,
+        { apiKey, outline },
+        delta => setStreamingText(prev => prev + delta)
+      );
       setScenes(prev => ({ ...prev, 1: data.scene1 }));
     } catch (err) {
       setError(err.message);
     } finally {
+      setStreamingScene(null);
+      setStreamingText('');
       setLoading(false);
     }
   };
@@ -287,21 +333,21 @@ function App() {
         writersRoomResults: writersRoomResultsByScene[sceneNumber - 1]
       });
 
-      const response = await fetch(`${API_BASE_URL}/generate-scene/${sceneNumber}`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({
+      setStreamingScene(sceneNumber);
+      setStreamingText('');
+      setActiveStep(sceneNumber - 1); // Show the scene while it streams in
+
+      const data = await fetchEventStream(
+        `${API_BASE_URL}/generate-scene/${sceneNumber}/stream`,
+        {
           apiKey,
           outline,
           previousScene: scenes[sceneNumber - 1],
           writersRoomResults: writersRoomResultsByScene[sceneNumber - 1]
-        })
-      });
-
-      const data = await response.json();
+        },
+        delta => setStreamingText(prev => prev + delta)
+      );
       console.log('Received response:', data);
-
-      if (data.error) throw new Error(data.error);
       
       if (!data[`scene${sceneNumber}`]) {
         throw new Error('No scene data received from server');
@@ -312,7 +358,10 @@ function App() {
     } catch (err) {
       console.error('Error generating scene:', err);
       setError(err.message);
+      setActiveStep(sceneNumber - 2); // Return to the previous scene
     } finally {
+      setStreamingScene(null);
+      setStreamingText('');
       setLoading(false);
     }
   };
@@ -348,6 +397,7 @@ function App() {
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ 
           apiKey, 
+          projectId,
           outline, 
           sceneScript: scenes[1] 
         })
@@ -372,6 +422,7 @@ function App() {
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ 
           apiKey, 
+          projectId,
           outline, 
           sceneScript: scenes[2] 
         })
@@ -397,6 +448,7 @@ function App() {
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ 
           apiKey, 
+          projectId,
           outline,
           current_scene_script: scenes[sceneNumber]  // Add current scene script
         })
@@ -420,7 +472,7 @@ function App() {
       const response = await fetch(`${API_BASE_URL}/scene-1-writers-room`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ apiKey, outline })
+        body: JSON.stringify({ apiKey, projectId, outline })
       });
       const data = await response.json();
       if (data.error) throw new Error(data.error);
@@ -442,6 +494,7 @@ function App() {
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({ 
           apiKey, 
+          projectId,
           outline, 
           sceneScript: scenes[sceneNumber] 
         })
@@ -792,6 +845,13 @@ function App() {
             </Box>
           </Modal>
           
+          {streamingScene === sceneNumber && !scenes[sceneNumber] && (
+            <Paper elevation={3} sx={{ p: 2, mt: 2 }}>
+              <Typography sx={{ whiteSpace: 'pre-line' }}>{streamingText}</Typography>
+              <LinearProgress sx={{ mt: 2 }} />
+            </Paper>
+          )}
+
           {sceneNumber === 1 ? (
             <>
               {scenes[1] && (
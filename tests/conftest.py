@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Helpers import each other as top-level modules (as in the notebooks), so put the
+# utils directories on the path before importing them.
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(REPO_DIR, "utils"))
+sys.path.append(os.path.join(REPO_DIR, "utils", "agents"))
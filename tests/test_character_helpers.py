@@ -0,0 +1,24 @@
+from character_helpers import _consistency_prompt, _profile_update_prompt
+from character_profile_store import CharacterProfileStore
+
+
+def test_consistency_prompt_describes_full_history_of_stored_profiles():
+    store = CharacterProfileStore()
+    for number in (1, 2, 4):
+        store.record_scene(f"1:{number}", {"summary": f"Dana in scene {number}", "characters": ["Dana"]})
+    store._profiles["Dana"].update(profile="Dry wit.", folded=["1:1", "1:2", "1:4"])
+
+    prompt = _consistency_prompt({"Dana": store.get_profile(None, "Dana")}, "Dana sulks.", num_scenes=1)
+    assert "all of their earlier appearances, Episode 1, Scene 1 to Episode 1, Scene 4" in prompt
+    assert "1:4" not in prompt
+    assert "the prior scene" not in prompt and "last 1 scene" not in prompt
+
+
+def test_consistency_prompt_describes_recent_scenes_without_a_store():
+    prompt = _consistency_prompt({"Dana": {"profile": "Dry wit."}}, "Dana sulks.", num_scenes=3)
+    assert "from the last 3 scenes" in prompt
+
+
+def test_profile_update_prompt_labels_episode_scenes():
+    prompt = _profile_update_prompt("Dana", "Dry wit.", [{"episode": 2, "scene_number": 3, "summary": "Dana quits."}])
+    assert "Episode 2, Scene 3:\nDana quits." in prompt
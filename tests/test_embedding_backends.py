@@ -0,0 +1,30 @@
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+pytest.importorskip("sentence_transformers")
+
+from embedding_backends import (
+    ONNX_INT8_MIN_COSINE, ONNX_MIN_COSINE, OnnxEmbeddingBackend, SentenceTransformerBackend,
+    check_embedding_parity
+)
+
+
+@pytest.fixture(scope="module")
+def reference():
+    try:
+        return SentenceTransformerBackend()
+    except Exception as exc:  # Model not cached and no network
+        pytest.skip(f"SentenceTransformer model unavailable: {exc}")
+
+
+@pytest.mark.parametrize("quantized, min_cosine", [(False, ONNX_MIN_COSINE), (True, ONNX_INT8_MIN_COSINE)])
+def test_onnx_embeddings_match_sentence_transformers(reference, tmp_path, quantized, min_cosine):
+    try:
+        backend = OnnxEmbeddingBackend(quantized=quantized, cache_dir=str(tmp_path))
+    except Exception as exc:
+        pytest.skip(f"ONNX model unavailable: {exc}")
+
+    assert backend.get_sentence_embedding_dimension() == reference.get_sentence_embedding_dimension()
+    result = check_embedding_parity(backend, reference, min_cosine=min_cosine)
+    assert result["passed"], result
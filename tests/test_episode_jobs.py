@@ -0,0 +1,55 @@
+import threading
+import time
+
+from episode_jobs import EpisodeJobManager
+
+
+def wait_for_status(manager, job_id, statuses, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager.status(job_id)
+        if job["status"] in statuses:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"Job never reached {statuses}: {manager.status(job_id)}")
+
+
+def test_close_interrupts_job_after_scene_in_progress(tmp_path):
+    scene_started = threading.Event()
+    release_scene = threading.Event()
+    written = []
+
+    def scene_step(client, job, scene_number, report):
+        written.append(scene_number)
+        if scene_number == 2:
+            scene_started.set()
+            release_scene.wait(5)
+        return {"script": f"Scene {scene_number}"}
+
+    manager = EpisodeJobManager(str(tmp_path), scene_step, max_workers=1)
+    job_id = manager.submit(None, "project", "outline", [1, 2, 3, 4])["job_id"]
+    assert scene_started.wait(5)
+    manager.close()
+    release_scene.set()
+
+    job = wait_for_status(manager, job_id, ("interrupted",))
+    assert written == [1, 2]
+    assert job["completed_scenes"] == [1, 2]
+
+    # A new process reloads the checkpoint and resumes from scene 3
+    reloaded = EpisodeJobManager(str(tmp_path), scene_step, max_workers=1)
+    assert reloaded.status(job_id)["status"] == "interrupted"
+    reloaded.resume(job_id, None)
+    job = wait_for_status(reloaded, job_id, ("completed",))
+    assert written == [1, 2, 3, 4]
+    assert job["completed_scenes"] == [1, 2, 3, 4]
+    reloaded.close()
+
+
+def test_cancel_requests_are_forgotten_once_a_job_finishes(tmp_path):
+    manager = EpisodeJobManager(str(tmp_path), lambda client, job, scene_number, report: {"script": ""})
+    job_id = manager.submit(None, "project", "outline", [1, 2])["job_id"]
+    wait_for_status(manager, job_id, ("completed",))
+    manager.cancel(job_id)
+    assert not manager._cancelled
+    manager.close()
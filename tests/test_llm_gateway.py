@@ -0,0 +1,39 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import llm_gateway
+
+
+class FakeCompletions:
+    def create(self, **request):
+        message = SimpleNamespace(content="Yes")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=None)
+
+
+def fake_client():
+    return SimpleNamespace(api_key="test", chat=SimpleNamespace(completions=FakeCompletions()))
+
+
+def test_count_requests_ignores_other_threads_and_includes_copied_contexts():
+    client = fake_client()
+    outside_done = threading.Event()
+
+    def outside_call():
+        llm_gateway.chat_completion(client, "Unrelated request")
+        outside_done.set()
+
+    with llm_gateway.count_requests() as requests:
+        llm_gateway.chat_completion(client, "Counted request")
+        threading.Thread(target=outside_call).start()
+        assert outside_done.wait(5)
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            contexts = [contextvars.copy_context() for _ in range(2)]
+            list(executor.map(
+                lambda context: context.run(llm_gateway.chat_completion, client, "Worker request"),
+                contexts
+            ))
+    llm_gateway.chat_completion(client, "After the block")
+
+    assert requests == {"calls": 3, "cache_hits": 0}
@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("openai")
+pytest.importorskip("httpx")
+
+from openai_clients import OpenAIClientPool
+
+
+def test_async_clients_of_closed_loops_are_dropped():
+    pool = OpenAIClientPool()
+
+    async def get_client():
+        return pool.get_async("sk-test")
+
+    first = asyncio.run(get_client())
+    second = asyncio.run(get_client())
+    assert first is not second
+    assert pool.stats()["pooled_async"] == 1
+
+
+def test_aclose_closes_the_running_loops_clients():
+    pool = OpenAIClientPool()
+
+    async def use_and_close():
+        client = pool.get_async("sk-test")
+        await pool.aclose()
+        return client
+
+    client = asyncio.run(use_and_close())
+    assert client.is_closed()
+    assert pool.stats()["pooled_async"] == 0
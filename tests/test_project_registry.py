@@ -0,0 +1,48 @@
+import pytest
+
+from project_registry import Project, ProjectRegistry
+from scene_metadata_store import SceneMetadataStore, make_scene_id
+
+
+def scene(number, characters, location="Kitchen"):
+    return {
+        "scene_id": make_scene_id(1, number), "episode": 1, "scene_number": number,
+        "characters": characters, "location": location, "summary": f"Scene {number}"
+    }
+
+
+def assert_indexes_match_rebuild(store):
+    rebuilt = SceneMetadataStore(list(store))
+    for name in ("_character_index", "_location_index", "_joke_index", "_id_positions"):
+        assert getattr(store, name) == getattr(rebuilt, name), name
+
+
+def test_replacing_and_popping_scenes_keeps_indexes_consistent():
+    store = SceneMetadataStore(scene(number, ["Dana", "Mike"][:number % 2 + 1]) for number in range(1, 6))
+    store.upsert_scene(scene(3, ["Rita"], location="Bar"))
+    assert_indexes_match_rebuild(store)
+    assert store.positions_with_character("Rita") == [2]
+    assert [meta["scene_number"] for meta in store.scenes_at_location("bar")] == [3]
+
+    store.pop()
+    store.remove_scene(make_scene_id(1, 2))
+    assert_indexes_match_rebuild(store)
+    assert store.next_scene_number(1) == 5
+
+
+def test_failed_eviction_does_not_leak_active_request(tmp_path, monkeypatch):
+    registry = ProjectRegistry(str(tmp_path), 8, max_projects=1, reap_interval=0)
+    with registry.project("first"):
+        pass
+
+    def failing_close(self):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(Project, "close", failing_close)
+    with pytest.raises(OSError):
+        with registry.project("second"):
+            pass
+
+    assert registry._projects["second"].active_requests == 0
+    monkeypatch.undo()
+    registry.close()
@@ -0,0 +1,50 @@
+import pytest
+
+from structured_output import StructuredOutputError, parse_json_response
+
+
+def test_parses_plain_json():
+    assert parse_json_response('{"summary": "A quiet scene.", "count": 2}') == {"summary": "A quiet scene.", "count": 2}
+
+
+def test_strips_code_fences_and_prose():
+    text = 'Here you go:\n```json\n{"summary": "A quiet scene."}\n```'
+    assert parse_json_response(text) == {"summary": "A quiet scene."}
+
+
+def test_repairs_python_literals_outside_strings():
+    text = '{"is_consistent": True, "notes": None, "flagged": False}'
+    assert parse_json_response(text) == {"is_consistent": True, "notes": None, "flagged": False}
+
+
+def test_leaves_literal_words_inside_strings():
+    # The trailing comma forces the repair passes; the summary must come back verbatim
+    text = '{"summary": "None of them laughed. True story, False alarm.", "is_consistent": True,}'
+    assert parse_json_response(text) == {
+        "summary": "None of them laughed. True story, False alarm.",
+        "is_consistent": True
+    }
+
+
+def test_leaves_commas_before_brackets_inside_strings():
+    text = '{"joke": "He said \\"fine,}\\" and left", "tags": ["awkward", "callback",],}'
+    assert parse_json_response(text) == {"joke": 'He said "fine,}" and left', "tags": ["awkward", "callback"]}
+
+
+def test_closes_truncated_response():
+    assert parse_json_response('{"characters": ["Dana", "Mike"') == {"characters": ["Dana", "Mike"]}
+
+
+def test_rejects_non_object():
+    with pytest.raises(StructuredOutputError):
+        parse_json_response('["Dana", "Mike"]')
+
+
+def test_keeps_quoted_dialogue_inside_strings():
+    text = '{"summary": "He said “hi” to her, didn’t he?", "characters": ["A",],}'
+    assert parse_json_response(text) == {"summary": "He said “hi” to her, didn’t he?", "characters": ["A"]}
+
+
+def test_repairs_curly_quote_delimiters():
+    text = '{“summary”: “Dana’s \"perfect\" plan”, “is_consistent”: True}'
+    assert parse_json_response(text) == {"summary": 'Dana’s "perfect" plan', "is_consistent": True}
@@ -1,18 +1,48 @@
 
 from character_helpers import (
+    acharacters_extraction,
+    afused_character_review,
+    arecommend_character_interactions,
+    aretrieve_character_history,
+    averify_character_consistency,
     characters_extraction,
+    character_info_from_analysis,
     retrieve_character_history,
     verify_character_consistency,
-    recommend_character_interactions
+    recommend_character_interactions,
+    fused_character_review
 )
 
-from typing import Dict, List, Tuple
+from vector_db_utils import aretrieve_prior_scenes, retrieve_prior_scenes
+from llm_gateway import count_requests
+from structured_output import structured_completion
+
+import asyncio
+import contextvars
+import random
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import time
+
+def _map_in_context(executor, fn, items):
+    # executor.map, with each call run in a copy of the caller's context (as asyncio.to_thread
+    # does), so scopes such as llm_gateway.count_requests() also see the worker threads' requests
+    contexts = [contextvars.copy_context() for _ in items]
+    return executor.map(lambda context, item: context.run(fn, item), contexts, items)
+
 
 class CharacterAgent:
-    def __init__(self, client, vector_metadata, num_scenes=1):
+    def __init__(self, client, vector_metadata, num_scenes=1, max_workers=4, profile_store=None,
+                 embedding_model=None, index=None, scene_analysis=None, fused=False):
         self.client = client
         self.vector_metadata = vector_metadata
         self.num_scenes = num_scenes
+        self.embedding_model = embedding_model  # With `index`, retrieve the most relevant prior scenes instead of the most recent
+        self.index = index
+        self.profile_store = profile_store  # Optional CharacterProfileStore with incrementally updated profiles
+        self.scene_analysis = scene_analysis  # Optional analyze_scene() output; replaces the characters_extraction call
+        self.max_workers = max_workers  # Concurrent character history retrievals in act()
+        self.fused = fused  # run() uses the single-call run_fused() cycle
         self.internal_thoughts = []  # Tracks internal reasoning
 
     def think(self, scene_description: str, scene_number: int) -> Dict:
@@ -23,33 +53,139 @@ class CharacterAgent:
         scene_range = list(range(start_scene, scene_number))
         print(f"📚 Retrieving script metadata for scene(s): {scene_range}")
 
-        character_info = characters_extraction(
-            client=self.client,
-            scene_description=scene_description,
-            prior_scene_metadata=self.vector_metadata,
-            scene_number=scene_number,
-            num_scenes=self.num_scenes
-        )
+        if self.scene_analysis is not None:
+            character_info = character_info_from_analysis(
+                self.scene_analysis,
+                prior_scene_metadata=self._prior_scenes(scene_description),
+                scene_number=scene_number,
+                num_scenes=self.num_scenes
+            )
+        else:
+            character_info = characters_extraction(
+                client=self.client,
+                scene_description=scene_description,
+                prior_scene_metadata=self._prior_scenes(scene_description),
+                scene_number=scene_number,
+                num_scenes=self.num_scenes
+            )
         self.internal_thoughts.append(f"Think: Identified characters {character_info['current_scene_characters']} using context from scene(s) {scene_range}.")
         return character_info
 
-    def act(self, character_info: Dict, scene_description: str, scene_number: int) -> Dict[str, Dict]:
+    async def athink(self, scene_description: str, scene_number: int) -> Dict:
         """
-        Act step: Retrieve character histories from previous scenes.
+        Async version of `think`.
         """
-        character_histories = {}
-        for character in character_info["current_scene_characters"]:
-            profile = retrieve_character_history(
+        start_scene = max(1, scene_number - self.num_scenes)
+        scene_range = list(range(start_scene, scene_number))
+        print(f"📚 Retrieving script metadata for scene(s): {scene_range}")
+
+        prior_scenes = await self._aprior_scenes(scene_description)
+        if self.scene_analysis is not None:
+            character_info = character_info_from_analysis(
+                self.scene_analysis,
+                prior_scene_metadata=prior_scenes,
+                scene_number=scene_number,
+                num_scenes=self.num_scenes
+            )
+        else:
+            character_info = await acharacters_extraction(
                 client=self.client,
-                character=character,
-                vector_metadata=self.vector_metadata,
-                current_scene_description=scene_description,
+                scene_description=scene_description,
+                prior_scene_metadata=prior_scenes,
+                scene_number=scene_number,
                 num_scenes=self.num_scenes
             )
-            character_histories[character] = profile
+        self.internal_thoughts.append(f"Think: Identified characters {character_info['current_scene_characters']} using context from scene(s) {scene_range}.")
+        return character_info
+
+    def act(self, character_info: Dict, scene_description: str, scene_number: int) -> Dict[str, Dict]:
+        """
+        Act step: Retrieve character histories from previous scenes.
+
+        Histories are retrieved in parallel (up to `max_workers` at a time), and the
+        returned dict keeps the order in which the characters were identified. If a
+        profile store is attached, stored profiles are used and only characters without
+        prior appearances fall back to `retrieve_character_history`.
+        """
+        characters = character_info["current_scene_characters"]
+        character_histories = {}
+        if characters:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(characters)))) as executor:
+                profiles = _map_in_context(
+                    executor,
+                    lambda character: self._character_profile(character, scene_description),
+                    characters
+                )
+                for character, profile in zip(characters, profiles):
+                    character_histories[character] = profile
+        self.internal_thoughts.append(f"Act: Retrieved profiles for {list(character_histories.keys())}.")
+        return character_histories
+
+    async def aact(self, character_info: Dict, scene_description: str, scene_number: int) -> Dict[str, Dict]:
+        """
+        Async version of `act`: histories are retrieved concurrently on the event loop (still at
+        most `max_workers` at a time).
+        """
+        characters = character_info["current_scene_characters"]
+        limit = asyncio.Semaphore(max(1, self.max_workers))
+
+        async def profile(character):
+            async with limit:
+                return await self._acharacter_profile(character, scene_description)
+
+        profiles = await asyncio.gather(*(profile(character) for character in characters))
+        character_histories = dict(zip(characters, profiles))
         self.internal_thoughts.append(f"Act: Retrieved profiles for {list(character_histories.keys())}.")
         return character_histories
 
+    def _prior_scenes(self, scene_description: str, filters: Dict = None) -> List[Dict]:
+        return retrieve_prior_scenes(
+            self.vector_metadata,
+            self.num_scenes,
+            query_text=scene_description,
+            embedding_model=self.embedding_model,
+            index=self.index,
+            filters=filters
+        )
+
+    async def _aprior_scenes(self, scene_description: str, filters: Dict = None) -> List[Dict]:
+        return await aretrieve_prior_scenes(
+            self.vector_metadata,
+            self.num_scenes,
+            query_text=scene_description,
+            embedding_model=self.embedding_model,
+            index=self.index,
+            filters=filters
+        )
+
+    def _character_profile(self, character: str, scene_description: str) -> Dict:
+        if self.profile_store is not None:
+            profile = self.profile_store.get_profile(self.client, character)
+            if profile is not None:
+                return profile
+
+        return retrieve_character_history(
+            client=self.client,
+            character=character,
+            vector_metadata=self._prior_scenes(scene_description, filters={"characters": [character]}),
+            current_scene_description=scene_description,
+            num_scenes=self.num_scenes
+        )
+
+    async def _acharacter_profile(self, character: str, scene_description: str) -> Dict:
+        if self.profile_store is not None:
+            profile = await self.profile_store.aget_profile(self.client, character)
+            if profile is not None:
+                return profile
+
+        return await aretrieve_character_history(
+            client=self.client,
+            character=character,
+            vector_metadata=await self._aprior_scenes(scene_description, filters={"characters": [character]}),
+            current_scene_description=scene_description,
+            num_scenes=self.num_scenes
+        )
+
     def observe(self, character_histories: Dict[str, Dict], scene_description: str) -> Tuple[bool, str]:
         """
         Observe step: Verify if characters are consistent with their profiles.
@@ -64,6 +200,20 @@ class CharacterAgent:
         self.internal_thoughts.append(f"Observe: Scene is {verdict}.")
         return is_consistent, explanation
 
+    async def aobserve(self, character_histories: Dict[str, Dict], scene_description: str) -> Tuple[bool, str]:
+        """
+        Async version of `observe`.
+        """
+        is_consistent, explanation = await averify_character_consistency(
+            client=self.client,
+            character_profiles=character_histories,
+            scene_description=scene_description,
+            num_scenes=self.num_scenes
+        )
+        verdict = "consistent" if is_consistent else "inconsistent"
+        self.internal_thoughts.append(f"Observe: Scene is {verdict}.")
+        return is_consistent, explanation
+
     def recommend(self, character_histories: Dict[str, Dict], scene_description: str, is_consistent: bool, explanation: str) -> str:
         """
         Recommend step: Suggest how to maximize character interactions, or fix inconsistencies.
@@ -79,6 +229,22 @@ class CharacterAgent:
         self.internal_thoughts.append("Recommend: Provided suggestions for enhancing character dynamics.")
         return recommendation
 
+    async def arecommend(self, character_histories: Dict[str, Dict], scene_description: str, is_consistent: bool,
+                         explanation: str) -> str:
+        """
+        Async version of `recommend`.
+        """
+        recommendation = await arecommend_character_interactions(
+            client=self.client,
+            character_profiles=character_histories,
+            scene_description=scene_description,
+            num_scenes=self.num_scenes,
+            is_consistent=is_consistent,
+            consistency_result=explanation
+        )
+        self.internal_thoughts.append("Recommend: Provided suggestions for enhancing character dynamics.")
+        return recommendation
+
     def run(self, scene_description: str, scene_number: int) -> Tuple[Dict[str, Dict], bool, str, str, List[str]]:
         """
         Full ReAct cycle: Think ➔ Act ➔ Observe ➔ Recommend
@@ -90,8 +256,270 @@ class CharacterAgent:
             - recommendations (str)
             - internal_thoughts (list of str)
         """
+        if self.fused:
+            return self.run_fused(scene_description, scene_number)
+
         character_info = self.think(scene_description, scene_number)
         character_histories = self.act(character_info, scene_description, scene_number)
         is_consistent, explanation = self.observe(character_histories, scene_description)
         recommendations = self.recommend(character_histories, scene_description, is_consistent, explanation)
         return character_histories, is_consistent, explanation, recommendations, self.internal_thoughts
+
+    async def arun(self, scene_description: str, scene_number: int) -> Tuple[Dict[str, Dict], bool, str, str, List[str]]:
+        """
+        Async version of `run`: the same ReAct cycle (or `arun_fused`), awaiting the LLM calls
+        instead of blocking threads (pass an `AsyncOpenAI` client).
+        """
+        if self.fused:
+            return await self.arun_fused(scene_description, scene_number)
+
+        character_info = await self.athink(scene_description, scene_number)
+        character_histories = await self.aact(character_info, scene_description, scene_number)
+        is_consistent, explanation = await self.aobserve(character_histories, scene_description)
+        recommendations = await self.arecommend(character_histories, scene_description, is_consistent, explanation)
+        return character_histories, is_consistent, explanation, recommendations, self.internal_thoughts
+
+    def _known_profiles(self, prior_scenes: List[Dict]) -> Dict[str, Dict]:
+        """
+        Profiles of the characters in `prior_scenes` (and the scene analysis), without extra LLM calls
+        beyond folding queued appearances into stored profiles.
+
+        Stored profiles are used when a profile store is attached; otherwise a profile is
+        assembled from the summaries of the prior scenes the character appeared in.
+        """
+        characters = self._known_characters(prior_scenes)
+
+        def profile(character):
+            if self.profile_store is not None:
+                stored = self.profile_store.get_profile(self.client, character)
+                if stored is not None:
+                    return stored
+            return self._summary_profile(character, prior_scenes)
+
+        profiles = {}
+        if characters:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(characters)))) as executor:
+                for character, result in zip(characters, _map_in_context(executor, profile, characters)):
+                    if result is not None:
+                        profiles[character] = result
+        return profiles
+
+    async def _aknown_profiles(self, prior_scenes: List[Dict]) -> Dict[str, Dict]:
+        characters = self._known_characters(prior_scenes)
+        limit = asyncio.Semaphore(max(1, self.max_workers))
+
+        async def profile(character):
+            if self.profile_store is not None:
+                async with limit:
+                    stored = await self.profile_store.aget_profile(self.client, character)
+                if stored is not None:
+                    return stored
+            return self._summary_profile(character, prior_scenes)
+
+        results = await asyncio.gather(*(profile(character) for character in characters))
+        return {character: result for character, result in zip(characters, results) if result is not None}
+
+    def _known_characters(self, prior_scenes: List[Dict]) -> List[str]:
+        characters = []
+        for meta in prior_scenes:
+            characters.extend(meta.get("characters", []))
+        if self.scene_analysis is not None:
+            characters.extend(self.scene_analysis.get("characters", []))
+        return list(dict.fromkeys(characters))
+
+    @staticmethod
+    def _summary_profile(character: str, prior_scenes: List[Dict]) -> Optional[Dict]:
+        scenes = [meta for meta in prior_scenes if character in meta.get("characters", [])]
+        if not scenes:
+            return None
+        return {
+            "character": character,
+            "profile": "\n".join(f"Scene {meta.get('scene_number', '?')}: {meta.get('summary', '')}" for meta in scenes),
+            "source_summaries": [meta.get("summary", "") for meta in scenes]
+        }
+
+    def run_fused(self, scene_description: str, scene_number: int) -> Tuple[Dict[str, Dict], bool, str, str, List[str]]:
+        """
+        One-shot cycle: Think, Observe and Recommend in a single structured call.
+
+        Instead of 1 + N + 1 + 1 sequential requests (extraction, one history per character,
+        verification, recommendation), the precomputed profiles of the established characters
+        are sent together with the scene description once (see `fused_character_review`).
+
+        Returns:
+            The same tuple as `run`; the explanation and recommendations are formatted like the
+            multi-step outputs ("1. Consistency Verdict ..." / "Interaction Recommendations: ...").
+        """
+        self._think_fused(scene_number)
+        profiles = self._known_profiles(self._prior_scenes(scene_description))
+        self.internal_thoughts.append(f"Act: Loaded profiles for {list(profiles.keys())}.")
+
+        review = fused_character_review(
+            client=self.client,
+            character_profiles=profiles,
+            scene_description=scene_description,
+            scene_number=scene_number,
+            num_scenes=self.num_scenes
+        )
+        return self._fused_outputs(review, profiles)
+
+    async def arun_fused(self, scene_description: str, scene_number: int) -> Tuple[Dict[str, Dict], bool, str, str, List[str]]:
+        """
+        Async version of `run_fused`.
+        """
+        self._think_fused(scene_number)
+        profiles = await self._aknown_profiles(await self._aprior_scenes(scene_description))
+        self.internal_thoughts.append(f"Act: Loaded profiles for {list(profiles.keys())}.")
+
+        review = await afused_character_review(
+            client=self.client,
+            character_profiles=profiles,
+            scene_description=scene_description,
+            scene_number=scene_number,
+            num_scenes=self.num_scenes
+        )
+        return self._fused_outputs(review, profiles)
+
+    def _think_fused(self, scene_number: int) -> None:
+        start_scene = max(1, scene_number - self.num_scenes)
+        scene_range = list(range(start_scene, scene_number))
+        print(f"📚 Retrieving script metadata for scene(s): {scene_range}")
+        self.internal_thoughts.append(f"Think: Reviewing characters in one pass using context from scene(s) {scene_range}.")
+
+    def _fused_outputs(self, review: Dict, profiles: Dict[str, Dict]) -> Tuple[Dict[str, Dict], bool, str, str, List[str]]:
+        characters = review["characters"]
+
+        character_histories = {
+            character: profiles.get(character) or {
+                "character": character,
+                "profile": "No prior appearances.",
+                "source_summaries": []
+            }
+            for character in characters
+        }
+
+        is_consistent = review["is_consistent"]
+        explanation = (
+            f"1. Consistency Verdict (Yes/No): {'Yes' if is_consistent else 'No'}\n"
+            f"2. Short Explanation Why: {review['explanation'].strip()}"
+        )
+        verdict = "consistent" if is_consistent else "inconsistent"
+        self.internal_thoughts.append(f"Observe: Identified characters {characters}; scene is {verdict}.")
+
+        recommendations = "Interaction Recommendations:\n" + "\n".join(
+            f"{i}. {suggestion.strip()}" for i, suggestion in enumerate(review["recommendations"], start=1)
+        )
+        self.internal_thoughts.append("Recommend: Provided suggestions for enhancing character dynamics.")
+        return character_histories, is_consistent, explanation, recommendations, self.internal_thoughts
+
+
+BENCHMARK_JUDGE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "score_1": {"type": "integer"},
+        "score_2": {"type": "integer"}
+    },
+    "required": ["score_1", "score_2"]
+}
+
+
+def _judge_reviews(client, scene_description, first, second, model):
+    """Scores two (explanation, recommendations) pairs from 1 to 10 in a single blind comparison."""
+    prompt = f"""
+You are a sitcom showrunner reviewing two script notes about the same planned scene.
+
+Planned Scene Description:
+{scene_description}
+
+Note 1:
+{first[0]}
+{first[1]}
+
+Note 2:
+{second[0]}
+{second[1]}
+
+Score each note from 1 to 10 for how accurate, specific and useful its consistency check and
+interaction recommendations are for the writers.
+"""
+    return structured_completion(
+        client, prompt, BENCHMARK_JUDGE_SCHEMA, model=model, temperature=0, top_p=1,
+        error_message="Error judging character reviews"
+    )
+
+
+def benchmark_character_agent_modes(client, vector_metadata, scenes, num_scenes=1, profile_store=None,
+                                    judge_model="gpt-4", seed=0):
+    """
+    Side-by-side latency/quality benchmark of the multi-step `run` and the one-shot `run_fused`.
+
+    Each scene is reviewed by a fresh agent in both modes, in a shuffled order per scene so
+    neither mode always runs second (e.g., against a warmer cache). Each mode gets its own
+    copy of `profile_store`, so profiles folded by one mode never speed up the other.
+    Latency is wall-clock time per run, requests are counted per run with
+    `llm_gateway.count_requests` (other traffic in the process is not included), and
+    quality is measured by verdict agreement, overlap of the identified characters, and
+    (with `judge_model`) a blind 1–10 score of both outputs by an LLM judge, with the
+    order shuffled per scene.
+
+    Args:
+        client: OpenAI client instance.
+        vector_metadata (list): Metadata of the stored prior scenes.
+        scenes (List[Tuple[int, str]]): (scene_number, scene_description) pairs to review.
+        num_scenes (int): Number of prior scenes the agents consider (default: 1).
+        profile_store: (Optional) CharacterProfileStore; each mode works on its own copy.
+        judge_model (str): Model used to score the outputs, or None to skip judging (default: "gpt-4").
+        seed (int): Seed for the run and judge orders (default: 0).
+
+    Returns:
+        List[dict]: One row per scene with 'scene_number', '<mode>_seconds', '<mode>_requests',
+        '<mode>_score' (None without a judge) for the modes 'multi_step' and 'fused', plus
+        'verdict_agreement' (bool) and 'character_overlap' (Jaccard similarity).
+    """
+    rng = random.Random(seed)
+    profile_stores = {
+        mode: profile_store.copy() if profile_store is not None else None
+        for mode in ("multi_step", "fused")
+    }
+    rows = []
+    for scene_number, scene_description in scenes:
+        row = {"scene_number": scene_number}
+        outputs = {}
+        modes = ["multi_step", "fused"]
+        rng.shuffle(modes)
+        for mode in modes:
+            agent = CharacterAgent(
+                client,
+                vector_metadata,
+                num_scenes=num_scenes,
+                profile_store=profile_stores[mode],
+                fused=mode == "fused"
+            )
+            with count_requests() as requests:
+                start = time.perf_counter()
+                outputs[mode] = agent.run(scene_description, scene_number)
+                row[f"{mode}_seconds"] = time.perf_counter() - start
+            row[f"{mode}_requests"] = requests["calls"] + requests["cache_hits"]
+
+        multi_step, fused = outputs["multi_step"], outputs["fused"]
+        multi_characters, fused_characters = set(multi_step[0]), set(fused[0])
+        union = multi_characters | fused_characters
+        row["verdict_agreement"] = multi_step[1] == fused[1]
+        row["character_overlap"] = len(multi_characters & fused_characters) / len(union) if union else 1.0
+
+        row["multi_step_score"] = row["fused_score"] = None
+        if judge_model:
+            order = ["multi_step", "fused"]
+            rng.shuffle(order)
+            scores = _judge_reviews(
+                client,
+                scene_description,
+                (outputs[order[0]][2], outputs[order[0]][3]),
+                (outputs[order[1]][2], outputs[order[1]][3]),
+                judge_model
+            )
+            row[f"{order[0]}_score"] = scores["score_1"]
+            row[f"{order[1]}_score"] = scores["score_2"]
+        rows.append(row)
+    return rows
+
@@ -1,6 +1,78 @@
 
 from typing import Dict, List, Tuple
-import time
+from llm_gateway import achat_completion, chat_completion
+from structured_output import astructured_completion, structured_completion
+
+FUSED_CHARACTER_REVIEW_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "characters": {"type": "array", "items": {"type": "string"}},
+        "new_characters": {"type": "array", "items": {"type": "string"}, "default": []},
+        "is_consistent": {"type": "boolean"},
+        "explanation": {"type": "string"},
+        "recommendations": {"type": "array", "items": {"type": "string"}}
+    },
+    "required": ["characters", "is_consistent", "explanation", "recommendations"]
+}
+
+def _recent_characters(prior_scene_metadata, num_scenes):
+    # Characters from the last `num_scenes` prior scenes
+    prior_characters = set()
+    for meta in prior_scene_metadata[-num_scenes:]:
+        prior_characters.update(meta.get("characters", []))
+    return prior_characters
+
+
+def _characters_extraction_prompt(scene_description, prior_characters, num_scenes):
+    prior_characters_text = ", ".join(sorted(prior_characters)) if prior_characters else "None"
+
+    return f"""
+You are the Writers' Assistant on the sitcom writing team.
+
+Previously established characters: {prior_characters_text}
+
+Given the following new scene description, identify:
+1. All characters involved in the scene.
+2. Which characters are NEW (not listed among previously established characters).
+3. Which characters are NOT in this scene but appeared in the last {num_scenes} scenes.
+   List their names and the scene numbers they appeared in. Example format:
+   Former Characters: [Rhea (3, 4, 5), Felix (5)]
+
+Scene Description:
+{scene_description}
+
+Respond exactly in this format:
+Characters: [comma-separated list]
+New Characters: [comma-separated list]
+Former Characters: [comma-separated list with scene numbers]
+"""
+
+
+def _parse_characters_extraction(result, prior_characters, scene_number):
+    # Parse output
+    current_scene_characters = []
+    new_characters = []
+    former_characters = []
+
+    for line in result.split("\n"):
+        if line.strip().startswith("Characters:"):
+            chars_text = line.split(":", 1)[1].strip().strip("[]")
+            current_scene_characters = [char.strip() for char in chars_text.split(",") if char.strip()]
+        elif line.strip().startswith("New Characters:"):
+            new_chars_text = line.split(":", 1)[1].strip().strip("[]")
+            new_characters = [char.strip() for char in new_chars_text.split(",") if char.strip()]
+        elif line.strip().startswith("Former Characters:"):
+            former_chars_text = line.split(":", 1)[1].strip().strip("[]")
+            former_characters = [char.strip() for char in former_chars_text.split(",") if char.strip()]
+
+    return {
+        "prior_characters": sorted(list(prior_characters)),
+        "current_scene_characters": current_scene_characters,
+        "new_characters": new_characters,
+        "former_characters": former_characters,
+        "scene_number": scene_number
+    }
+
 
 def characters_extraction(
     client,
@@ -45,82 +117,170 @@ def characters_extraction(
         ValueError: If the API response is malformed or missing.
         Exception: After 3 failed retry attempts or other runtime issues.
     """
-    # Filter to last `num_scenes` prior scenes
-    recent_scenes = prior_scene_metadata[-num_scenes:]
+    prior_characters = _recent_characters(prior_scene_metadata, num_scenes)
+    prompt = _characters_extraction_prompt(scene_description, prior_characters, num_scenes)
+
+    result = chat_completion(
+        client,
+        prompt,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=f"Error extracting characters for Scene {scene_number}"
+    )
+
+    return _parse_characters_extraction(result, prior_characters, scene_number)
+
+
+async def acharacters_extraction(
+    client,
+    scene_description: str,
+    prior_scene_metadata: List[Dict],
+    scene_number: int = None,
+    num_scenes: int = 3,
+    model: str = "gpt-4",
+    temperature: float = 0.7,
+    top_p: float = 0.9
+) -> Dict[str, List[str]]:
+    """
+    Async version of `characters_extraction` (see `achat_completion` for client handling).
+    """
+    prior_characters = _recent_characters(prior_scene_metadata, num_scenes)
+    result = await achat_completion(
+        client,
+        _characters_extraction_prompt(scene_description, prior_characters, num_scenes),
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=f"Error extracting characters for Scene {scene_number}"
+    )
+    return _parse_characters_extraction(result, prior_characters, scene_number)
 
-    # Map prior character appearances by scene number
+
+def character_info_from_analysis(
+    scene_analysis: Dict,
+    prior_scene_metadata: List[Dict],
+    scene_number: int = None,
+    num_scenes: int = 3
+) -> Dict[str, List[str]]:
+    """
+    Builds the `characters_extraction` result from a fused scene analysis, without an API call.
+
+    The characters come from `analyze_scene`; new and former characters are derived by
+    comparing them with the last `num_scenes` prior scenes, exactly as the prompt in
+    `characters_extraction` asks the model to.
+
+    Args:
+        scene_analysis: Output of `analyze_scene` for the scene description.
+        prior_scene_metadata: List of metadata dictionaries from previous scenes.
+        scene_number: Index of the current scene (used in output).
+        num_scenes: Number of recent scenes to consider when comparing character presence (default: 3).
+
+    Returns:
+        dict with the same keys as `characters_extraction`.
+    """
     character_scene_map = {}
-    for meta in recent_scenes:
+    for meta in prior_scene_metadata[-num_scenes:]:
         for char in meta.get("characters", []):
             character_scene_map.setdefault(char, []).append(meta.get("scene_number", "?"))
 
-    prior_characters = set(character_scene_map.keys())
-    prior_characters_text = ", ".join(sorted(prior_characters)) if prior_characters else "None"
+    current_scene_characters = list(scene_analysis.get("characters", []))
+    current = set(current_scene_characters)
+
+    return {
+        "prior_characters": sorted(character_scene_map),
+        "current_scene_characters": current_scene_characters,
+        "new_characters": [char for char in current_scene_characters if char not in character_scene_map],
+        "former_characters": [
+            f"{char} ({', '.join(str(number) for number in numbers)})"
+            for char, numbers in character_scene_map.items() if char not in current
+        ],
+        "scene_number": scene_number
+    }
+
+
+def _recent_character_scenes(character, vector_metadata, num_scenes):
+    # Filter scenes where character appears (indexed lookup for a SceneMetadataStore)
+    if hasattr(vector_metadata, "scenes_with_character"):
+        relevant_scenes = vector_metadata.scenes_with_character(character)
+    else:
+        relevant_scenes = [meta for meta in vector_metadata if character in meta.get("characters", [])]
+    return relevant_scenes[-num_scenes:]
 
-    # Build prompt
-    prompt = f"""
-You are the Writers' Assistant on the sitcom writing team.
 
-Previously established characters: {prior_characters_text}
+def _scene_heading(scene):
+    """Readable label for a scene, e.g. "Scene 3" or "Episode 2, Scene 3"."""
+    if scene.get("episode") is not None:
+        return f"Episode {scene['episode']}, Scene {scene.get('scene_number', '?')}"
+    return f"Scene {scene.get('scene_number', '?')}"
 
-Given the following new scene description, identify:
-1. All characters involved in the scene.
-2. Which characters are NEW (not listed among previously established characters).
-3. Which characters are NOT in this scene but appeared in the last {num_scenes} scenes.
-   List their names and the scene numbers they appeared in. Example format:
-   Former Characters: [Rhea (3, 4, 5), Felix (5)]
 
-Scene Description:
-{scene_description}
+def _profiles_span(character_profiles, num_scenes):
+    """
+    Describes the scenes the profiles were built from, for use in the prompts.
 
-Respond exactly in this format:
-Characters: [comma-separated list]
-New Characters: [comma-separated list]
-Former Characters: [comma-separated list with scene numbers]
+    Profiles from a CharacterProfileStore cover every earlier appearance (listed in their
+    'source_scenes'); the others cover the last `num_scenes` scenes.
+    """
+    scenes = [scene for profile in character_profiles.values() for scene in profile.get("source_scenes") or []]
+    if not scenes:
+        return "the prior scene" if num_scenes == 1 else f"the last {num_scenes} scenes"
+
+    def order(scene):
+        number = str(scene.get("scene_number"))
+        return int(scene.get("episode") or 0), int(number) if number.isdigit() else 0
+
+    scenes.sort(key=order)
+    first, last = _scene_heading(scenes[0]), _scene_heading(scenes[-1])
+    if first == last:
+        return f"their only earlier appearance, {first}"
+    return f"all of their earlier appearances, {first} to {last}"
+
+
+def _character_history_prompt(character, recent_relevant_scenes, current_scene_description):
+    if recent_relevant_scenes:
+        # Annotate each summary with scene number
+        labeled_summaries = "\n\n".join([
+            f"{_scene_heading(scene)}:\n{scene.get('summary', '').strip()}"
+            for scene in recent_relevant_scenes
+        ])
+
+        return f"""
+You are the Script Supervisor on the sitcom writing team.
+
+Based on the following prior scenes, build a detailed and **explicitly grounded** character profile for: {character}
+
+Scenes:
+{labeled_summaries}
+
+Your profile must include:
+1. Personality traits — derived from specific scenes. Mention which scene they appeared in.
+2. Speaking style and quirks — cite scene-based examples.
+3. Key relationships — who are they close to or in conflict with? Base this only on interactions in the given scenes.
+4. Running jokes or behaviors — describe only if patterns emerge across scenes.
+5. Emotional arc — explain how their behavior or role has changed across scenes (reference scene numbers clearly).
+
+Do not invent any traits or backstories not present in the text.
+Your output should show clear reasoning based on specific scene descriptions or numbers.
+Format clearly.
 """
+    return f"""
+You are the Script Supervisor on the sitcom writing team.
 
-    for attempt in range(3):
-        try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                top_p=top_p
-            )
-
-            if not response or not response.choices or not response.choices[0].message.content:
-                raise ValueError("Received an empty or malformed response from the API.")
-
-            result = response.choices[0].message.content.strip()
-
-            # Parse output
-            current_scene_characters = []
-            new_characters = []
-            former_characters = []
-
-            for line in result.split("\n"):
-                if line.strip().startswith("Characters:"):
-                    chars_text = line.split(":", 1)[1].strip().strip("[]")
-                    current_scene_characters = [char.strip() for char in chars_text.split(",") if char.strip()]
-                elif line.strip().startswith("New Characters:"):
-                    new_chars_text = line.split(":", 1)[1].strip().strip("[]")
-                    new_characters = [char.strip() for char in new_chars_text.split(",") if char.strip()]
-                elif line.strip().startswith("Former Characters:"):
-                    former_chars_text = line.split(":", 1)[1].strip().strip("[]")
-                    former_characters = [char.strip() for char in former_chars_text.split(",") if char.strip()]
-
-            return {
-                "prior_characters": sorted(list(prior_characters)),
-                "current_scene_characters": current_scene_characters,
-                "new_characters": new_characters,
-                "former_characters": former_characters,
-                "scene_number": scene_number
-            }
-
-        except Exception as e:
-            if attempt == 2:
-                raise Exception(f"Error extracting characters for Scene {scene_number}: {str(e)}")
-            time.sleep(2 ** attempt)
+There are no previous scenes involving the character {character}.
+
+Here is the current scene description:
+{current_scene_description}
+
+Your task:
+- Identify personality traits based only on this scene’s behavior or description.
+- Note speaking style and quirks if any are evident.
+- Mention relationships **only** with characters in this scene.
+- Do not make up emotional arcs or traits not found in the text.
+
+If there is not enough evidence for any part, say so directly.
+Format clearly and label each section.
+"""
 
 
 def retrieve_character_history(
@@ -160,78 +320,81 @@ def retrieve_character_history(
         ValueError: If the API response is empty or malformed.
         Exception: If all retries fail or another error occurs.
     """
-    # Filter scenes where character appears
-    relevant_scenes = [meta for meta in vector_metadata if character in meta.get("characters", [])]
-    recent_relevant_scenes = relevant_scenes[-num_scenes:]
-    relevant_summaries = [scene.get("summary", "") for scene in recent_relevant_scenes]
-
-    if relevant_summaries:
-        # Annotate each summary with scene number
-        labeled_summaries = "\n\n".join([
-            f"Scene {scene.get('scene_number', '?')}:\n{scene.get('summary', '').strip()}"
-            for scene in recent_relevant_scenes
-        ])
-
-        prompt = f"""
-You are the Script Supervisor on the sitcom writing team.
-
-Based on the following prior scenes, build a detailed and **explicitly grounded** character profile for: {character}
+    recent_relevant_scenes = _recent_character_scenes(character, vector_metadata, num_scenes)
+    prompt = _character_history_prompt(character, recent_relevant_scenes, current_scene_description)
+
+    profile = chat_completion(
+        client,
+        prompt,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=f"Error retrieving history for character '{character}'"
+    )
 
-Scenes:
-{labeled_summaries}
+    return {
+        "character": character,
+        "profile": profile,
+        "source_summaries": [scene.get("summary", "") for scene in recent_relevant_scenes]
+    }
 
-Your profile must include:
-1. Personality traits — derived from specific scenes. Mention which scene they appeared in.
-2. Speaking style and quirks — cite scene-based examples.
-3. Key relationships — who are they close to or in conflict with? Base this only on interactions in the given scenes.
-4. Running jokes or behaviors — describe only if patterns emerge across scenes.
-5. Emotional arc — explain how their behavior or role has changed across scenes (reference scene numbers clearly).
 
-Do not invent any traits or backstories not present in the text.
-Your output should show clear reasoning based on specific scene descriptions or numbers.
-Format clearly.
-"""
-    else:
-        prompt = f"""
-You are the Script Supervisor on the sitcom writing team.
+async def aretrieve_character_history(
+    client,
+    character: str,
+    vector_metadata: List[Dict],
+    current_scene_description: str,
+    num_scenes: int = 1,
+    model: str = "gpt-4",
+    temperature: float = 0.7,
+    top_p: float = 0.9
+) -> Dict:
+    """
+    Async version of `retrieve_character_history` (see `achat_completion` for client handling).
+    """
+    recent_relevant_scenes = _recent_character_scenes(character, vector_metadata, num_scenes)
+    profile = await achat_completion(
+        client,
+        _character_history_prompt(character, recent_relevant_scenes, current_scene_description),
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=f"Error retrieving history for character '{character}'"
+    )
 
-There are no previous scenes involving the character {character}.
+    return {
+        "character": character,
+        "profile": profile,
+        "source_summaries": [scene.get("summary", "") for scene in recent_relevant_scenes]
+    }
 
-Here is the current scene description:
-{current_scene_description}
 
-Your task:
-- Identify personality traits based only on this scene’s behavior or description.
-- Note speaking style and quirks if any are evident.
-- Mention relationships **only** with characters in this scene.
-- Do not make up emotional arcs or traits not found in the text.
+def _consistency_prompt(character_profiles, scene_description, num_scenes):
+    profiles_text = "\n\n".join([
+        f"Character: {char}\n{profile_data['profile']}"
+        for char, profile_data in character_profiles.items()
+    ])
+    scenes_label = _profiles_span(character_profiles, num_scenes)
 
-If there is not enough evidence for any part, say so directly.
-Format clearly and label each section.
-"""
+    return f"""
+You are the Head Writer on the sitcom writing team.
 
-    for attempt in range(3):
-        try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                top_p=top_p
-            )
+Character Profiles (from {scenes_label}):
+{profiles_text}
 
-            if not response or not response.choices or not response.choices[0].message.content:
-                raise ValueError(f"Received an empty or malformed response for character {character}.")
+Planned Scene Description:
+{scene_description}
 
-            return {
-                "character": character,
-                "profile": response.choices[0].message.content.strip(),
-                "source_summaries": relevant_summaries
-            }
+Check:
+- Is each character behaving consistently with their established personality, emotional arc, and speaking style?
+- Are their actions and dialogue logical based on traits or relationships from {scenes_label}?
+- Identify contradictions based strictly on past scenes — not general sitcom logic or assumed character arcs.
+- Do not invent missing motivations — point them out instead.
 
-        except Exception as e:
-            if attempt == 2:
-                raise Exception(f"Error retrieving history for character '{character}': {str(e)}")
-            time.sleep(2 ** attempt)
+Respond exactly in this format:
+1. Consistency Verdict (Yes/No)
+2. Short Explanation Why (max 5 lines)
+"""
 
 
 def verify_character_consistency(
@@ -269,53 +432,89 @@ def verify_character_consistency(
         ValueError: If the API response is empty or does not follow the expected format.
         Exception: After 3 failed retry attempts or other runtime issues.
     """
+    prompt = _consistency_prompt(character_profiles, scene_description, num_scenes)
+
+    result = chat_completion(
+        client,
+        prompt,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message="Error verifying character consistency"
+    )
+
+    is_consistent = "yes" in result.lower().split("\n")[0].lower()
+
+    return is_consistent, result
+
+
+async def averify_character_consistency(
+    client,
+    character_profiles: Dict[str, Dict],
+    scene_description: str,
+    num_scenes: int = 1,
+    model: str = "gpt-4",
+    temperature: float = 0.7,
+    top_p: float = 0.9
+) -> Tuple[bool, str]:
+    """
+    Async version of `verify_character_consistency` (see `achat_completion` for client handling).
+    """
+    result = await achat_completion(
+        client,
+        _consistency_prompt(character_profiles, scene_description, num_scenes),
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message="Error verifying character consistency"
+    )
+
+    is_consistent = "yes" in result.lower().split("\n")[0].lower()
+
+    return is_consistent, result
+
+
+def _interactions_prompt(character_profiles, scene_description, num_scenes, is_consistent, consistency_result):
     profiles_text = "\n\n".join([
         f"Character: {char}\n{profile_data['profile']}"
         for char, profile_data in character_profiles.items()
     ])
 
-    prompt = f"""
-You are the Head Writer on the sitcom writing team.
+    consistency_context = (
+        f"\n\nNote: The current scene was flagged as inconsistent.\n"
+        f"Here is the critique provided:\n{consistency_result.strip()}\n\n"
+        f"Use this to help adjust or refine the interactions to improve character alignment."
+        if not is_consistent else ""
+    )
+    scenes_label = _profiles_span(character_profiles, num_scenes)
+
+    return f"""
+You are the Co-Executive Producer on the sitcom writing team.
 
-Character Profiles (from the last {num_scenes} scene{'s' if num_scenes > 1 else ''}):
+You will suggest **exactly two meaningful character interactions** for the following scene.
+
+Character Profiles (based on {scenes_label}):
 {profiles_text}
 
 Planned Scene Description:
 {scene_description}
+{consistency_context}
 
-Check:
-- Is each character behaving consistently with their established personality, emotional arc, and speaking style?
-- Are their actions and dialogue logical based on traits or relationships from the last {num_scenes} scene{'s' if num_scenes > 1 else ''}?
-- Identify contradictions based strictly on past scenes — not general sitcom logic or assumed character arcs.
-- Do not invent missing motivations — point them out instead.
+Instructions:
+- Recommend two character interactions that reflect what has happened in {scenes_label}.
+- Refer explicitly to scene numbers when explaining why an interaction fits.
+  Example: "In Scene 2, Jimmy promised to change. This scene builds on that."
+- If a character is new or has no past context, use the current scene only.
+- If the scene has inconsistencies, your suggestions should help resolve those problems while staying true to the profiles.
+- Each recommendation must include a short explanation of **why** it fits, citing specific scenes or behaviors.
+- Keep each suggestion concise—around 2–3 sentences—and justify clearly.
 
-Respond exactly in this format:
-1. Consistency Verdict (Yes/No)
-2. Short Explanation Why (max 5 lines)
+Format your response like this:
+Interaction Recommendations:
+1. [Suggestion] — (justification referencing prior scene(s))
+2. [Suggestion] — (justification referencing prior scene(s))
 """
 
-    for attempt in range(3):
-        try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                top_p=top_p
-            )
-
-            if not response or not response.choices or not response.choices[0].message.content:
-                raise ValueError("Received an empty or malformed response from the API.")
-
-            result = response.choices[0].message.content.strip()
-            is_consistent = "yes" in result.lower().split("\n")[0].lower()
-
-            return is_consistent, result
-
-        except Exception as e:
-            if attempt == 2:
-                raise Exception(f"Error verifying character consistency: {str(e)}")
-            time.sleep(2 ** attempt)
-
 
 def recommend_character_interactions(
     client,
@@ -355,60 +554,237 @@ def recommend_character_interactions(
         ValueError: If the API response is empty or malformed.
         Exception: If the API fails after 3 retry attempts.
     """
-    profiles_text = "\n\n".join([
-        f"Character: {char}\n{profile_data['profile']}"
-        for char, profile_data in character_profiles.items()
+    prompt = _interactions_prompt(character_profiles, scene_description, num_scenes, is_consistent, consistency_result)
+
+    return chat_completion(
+        client,
+        prompt,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message="Error generating character interaction recommendations"
+    )
+
+
+async def arecommend_character_interactions(
+    client,
+    character_profiles,
+    scene_description,
+    num_scenes=1,
+    is_consistent=True,
+    consistency_result="",
+    model: str = "gpt-4",
+    temperature: float = 0.7,
+    top_p: float = 0.9
+) -> str:
+    """
+    Async version of `recommend_character_interactions` (see `achat_completion` for client handling).
+    """
+    return await achat_completion(
+        client,
+        _interactions_prompt(character_profiles, scene_description, num_scenes, is_consistent, consistency_result),
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message="Error generating character interaction recommendations"
+    )
+
+
+def _profile_update_prompt(character, existing_profile, new_scenes):
+    labeled_summaries = "\n\n".join([
+        f"{_scene_heading(scene)}:\n{scene.get('summary', '').strip()}"
+        for scene in new_scenes
     ])
 
-    consistency_context = (
-        f"\n\nNote: The current scene was flagged as inconsistent.\n"
-        f"Here is the critique provided:\n{consistency_result.strip()}\n\n"
-        f"Use this to help adjust or refine the interactions to improve character alignment."
-        if not is_consistent else ""
+    return f"""
+You are the Script Supervisor on the sitcom writing team.
+
+Here is the current character profile for: {character}
+
+{existing_profile}
+
+The following new scenes involving {character} have just been written:
+
+{labeled_summaries}
+
+Update the profile so it stays **explicitly grounded** in the scenes:
+1. Personality traits — keep existing ones and add or revise traits shown in the new scenes. Mention which scene they appeared in.
+2. Speaking style and quirks — cite scene-based examples.
+3. Key relationships — update based only on interactions in the given scenes.
+4. Running jokes or behaviors — describe only if patterns emerge across scenes.
+5. Emotional arc — extend the arc with the new scenes (reference scene numbers clearly).
+
+Do not invent any traits or backstories not present in the profile or the new scenes.
+Return only the full updated profile, formatted clearly.
+"""
+
+
+def update_character_profile(
+    client,
+    character: str,
+    existing_profile: str,
+    new_scenes: List[Dict],
+    model: str = "gpt-4",
+    temperature: float = 0.7,
+    top_p: float = 0.9
+) -> str:
+    """
+    Incrementally updates an existing character profile with newly ingested scenes.
+
+    Instead of rebuilding the profile from every prior summary, this function sends the
+    current profile together with only the new scene summaries, so each new appearance
+    costs a single call.
+
+    Args:
+        client: OpenAI client instance.
+        character: Name of the character whose profile is being updated.
+        existing_profile: The character's current profile text.
+        new_scenes: List of dictionaries with 'scene_number' and 'summary' for the new appearances.
+        model: Language model to use (default: "gpt-4").
+        temperature: Sampling temperature (default: 0.7).
+        top_p: Nucleus sampling parameter (default: 0.9).
+
+    Returns:
+        str: The updated character profile.
+
+    Raises:
+        Exception: If the API fails after all retry attempts.
+    """
+    prompt = _profile_update_prompt(character, existing_profile, new_scenes)
+
+    return chat_completion(
+        client,
+        prompt,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=f"Error updating profile for character '{character}'"
     )
 
-    prompt = f"""
-You are the Co-Executive Producer on the sitcom writing team.
 
-You will suggest **exactly two meaningful character interactions** for the following scene.
+async def aupdate_character_profile(
+    client,
+    character: str,
+    existing_profile: str,
+    new_scenes: List[Dict],
+    model: str = "gpt-4",
+    temperature: float = 0.7,
+    top_p: float = 0.9
+) -> str:
+    """
+    Async version of `update_character_profile` (see `achat_completion` for client handling).
+    """
+    return await achat_completion(
+        client,
+        _profile_update_prompt(character, existing_profile, new_scenes),
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=f"Error updating profile for character '{character}'"
+    )
+
+
+def _fused_review_prompt(character_profiles, scene_description, num_scenes):
+    profiles_text = "\n\n".join([
+        f"Character: {char}\n{profile_data['profile']}"
+        for char, profile_data in character_profiles.items()
+    ]) or "None"
+    scenes_label = _profiles_span(character_profiles, num_scenes)
 
-Character Profiles (based on {'the prior scene' if num_scenes == 1 else f'the last {num_scenes} scenes'}):
+    return f"""
+You are the Head Writer on the sitcom writing team.
+
+Established Character Profiles (based on {scenes_label}):
 {profiles_text}
 
 Planned Scene Description:
 {scene_description}
-{consistency_context}
 
-Instructions:
-- Recommend two character interactions that reflect what has happened in the {'prior scene' if num_scenes == 1 else f'last {num_scenes} scenes'}.
-- Refer explicitly to scene numbers when explaining why an interaction fits.
-  Example: "In Scene 2, Jimmy promised to change. This scene builds on that."
-- If a character is new or has no past context, use the current scene only.
-- If the scene has inconsistencies, your suggestions should help resolve those problems while staying true to the profiles.
-- Each recommendation must include a short explanation of **why** it fits, citing specific scenes or behaviors.
-- Keep each suggestion concise—around 2–3 sentences—and justify clearly.
-
-Format your response like this:
-Interaction Recommendations:
-1. [Suggestion] — (justification referencing prior scene(s))
-2. [Suggestion] — (justification referencing prior scene(s))
+Tasks:
+1. "characters": List every character involved in the planned scene (use the established spelling for returning characters).
+2. "new_characters": List the characters who have no established profile above.
+3. "is_consistent": Is each returning character behaving consistently with their established personality, emotional arc, and speaking style?
+   Identify contradictions based strictly on the profiles — not general sitcom logic or assumed character arcs.
+4. "explanation": Explain the verdict in at most 5 lines. Do not invent missing motivations — point them out instead.
+5. "recommendations": Recommend exactly two meaningful character interactions for the scene, each around 2–3 sentences
+   with a short justification that refers explicitly to scene numbers from the profiles. If the scene is inconsistent,
+   the suggestions should help resolve the problems while staying true to the profiles. For new characters, use the current scene only.
 """
 
-    for attempt in range(3):
-        try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                top_p=top_p
-            )
 
-            if not response or not response.choices or not response.choices[0].message.content:
-                raise ValueError("Received an empty or malformed response from the API.")
+def fused_character_review(
+    client,
+    character_profiles: Dict[str, Dict],
+    scene_description: str,
+    scene_number: int = None,
+    num_scenes: int = 1,
+    model: str = "gpt-4",
+    temperature: float = 0.7,
+    top_p: float = 0.9
+) -> Dict:
+    """
+    Identifies the scene's characters, checks their consistency and recommends interactions in one call.
+
+    This folds the prompts of `characters_extraction`, `verify_character_consistency` and
+    `recommend_character_interactions` into a single structured request over precomputed
+    profiles (see `CharacterAgent.run_fused`).
+
+    Args:
+        client: OpenAI client instance.
+        character_profiles: Profiles of the established characters, keyed by name.
+        scene_description: Text description of the planned scene.
+        scene_number: Index of the current scene (used in error messages).
+        num_scenes: Number of prior scenes the profiles are drawn from (default = 1).
+        model: Language model to use (default: "gpt-4").
+        temperature: Sampling temperature (default: 0.7).
+        top_p: Nucleus sampling parameter (default: 0.9).
+
+    Returns:
+        dict with:
+            - 'characters': Characters in the planned scene (List[str])
+            - 'new_characters': Characters without an established profile (List[str])
+            - 'is_consistent': Consistency verdict (bool)
+            - 'explanation': Short explanation of the verdict (str)
+            - 'recommendations': Exactly two interaction suggestions with justifications (List[str])
+
+    Raises:
+        StructuredOutputError: If the response cannot be parsed into the schema.
+        LLMGatewayError: If the API fails after all retry attempts.
+    """
+    prompt = _fused_review_prompt(character_profiles, scene_description, num_scenes)
+
+    error_message = "Error reviewing characters" if scene_number is None else f"Error reviewing characters for Scene {scene_number}"
+    return structured_completion(
+        client,
+        prompt,
+        FUSED_CHARACTER_REVIEW_SCHEMA,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=error_message
+    )
 
-            return response.choices[0].message.content.strip()
 
-        except Exception as e:
-            if attempt == 2:
-                raise Exception(f"Error generating character interaction recommendations: {str(e)}")
-            time.sleep(2 ** attempt)
+async def afused_character_review(
+    client,
+    character_profiles: Dict[str, Dict],
+    scene_description: str,
+    scene_number: int = None,
+    num_scenes: int = 1,
+    model: str = "gpt-4",
+    temperature: float = 0.7,
+    top_p: float = 0.9
+) -> Dict:
+    """
+    Async version of `fused_character_review` (see `achat_completion` for client handling).
+    """
+    error_message = "Error reviewing characters" if scene_number is None else f"Error reviewing characters for Scene {scene_number}"
+    return await astructured_completion(
+        client,
+        _fused_review_prompt(character_profiles, scene_description, num_scenes),
+        FUSED_CHARACTER_REVIEW_SCHEMA,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message=error_message
+    )
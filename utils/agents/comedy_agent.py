@@ -1,12 +1,15 @@
 
 from typing import Dict, List, Tuple
 from comedy_helpers import (
+    aanalyze_and_verify_comedic_consistency,
     analyze_and_verify_comedic_consistency,
+    arecommend_comedic_improvements,
     recommend_comedic_improvements
 )
+from vector_db_utils import aretrieve_prior_scenes, retrieve_prior_scenes
 
 class ComedicAgent:
-    def __init__(self, client, vector_metadata, num_scenes: int = 3):
+    def __init__(self, client, vector_metadata, num_scenes: int = 3, embedding_model=None, index=None):
         """
         Initializes the ComedicAgent.
 
@@ -14,10 +17,15 @@ class ComedicAgent:
             client: OpenAI client for prompting.
             vector_metadata: List of prior scene metadata (summaries, recurring jokes, etc.).
             num_scenes: Number of prior scenes to consider for tone checking.
+            embedding_model: (Optional) Model used to embed scene descriptions for retrieval.
+            index: (Optional) FAISS index aligned with `vector_metadata`. With `embedding_model`,
+                   the most relevant prior scenes are used instead of the most recent ones.
         """
         self.client = client
         self.vector_metadata = vector_metadata
         self.num_scenes = num_scenes
+        self.embedding_model = embedding_model
+        self.index = index
         self.internal_thoughts = []
 
     def think(self, scene_description: str, scene_number: int) -> None:
@@ -29,13 +37,40 @@ class ComedicAgent:
         print(f"📚 Retrieving script metadata for scene(s): {scene_range}")
         self.internal_thoughts.append(f"Think: Will retrieve summaries and jokes from scene(s) {scene_range} for Scene {scene_number}.")
 
-    def act(self, scene_number: int) -> Dict:
+    def _prior_scenes(self, scene_description: str = None) -> List[Dict]:
+        return retrieve_prior_scenes(
+            self.vector_metadata,
+            self.num_scenes,
+            query_text=scene_description,
+            embedding_model=self.embedding_model,
+            index=self.index
+        )
+
+    async def _aprior_scenes(self, scene_description: str = None) -> List[Dict]:
+        return await aretrieve_prior_scenes(
+            self.vector_metadata,
+            self.num_scenes,
+            query_text=scene_description,
+            embedding_model=self.embedding_model,
+            index=self.index
+        )
+
+    def act(self, scene_number: int, scene_description: str = None) -> Dict:
         """
-        Act step: Retrieve summaries and running jokes from recent scenes.
+        Act step: Retrieve summaries and running jokes from recent (or most relevant) scenes.
         """
-        prior_summaries = [meta["summary"] for meta in self.vector_metadata][-self.num_scenes:]
+        return self._prior_context(self._prior_scenes(scene_description))
+
+    async def aact(self, scene_number: int, scene_description: str = None) -> Dict:
+        """
+        Async version of `act`.
+        """
+        return self._prior_context(await self._aprior_scenes(scene_description))
+
+    def _prior_context(self, prior_scenes: List[Dict]) -> Dict:
+        prior_summaries = [meta["summary"] for meta in prior_scenes]
         prior_jokes = []
-        for meta in self.vector_metadata[-self.num_scenes:]:
+        for meta in prior_scenes:
             prior_jokes.extend(meta.get("recurring_joke", []))
 
         self.internal_thoughts.append("Act: Retrieved summaries and jokes from prior scenes.")
@@ -50,7 +85,22 @@ class ComedicAgent:
         """
         is_consistent, analysis_text = analyze_and_verify_comedic_consistency(
             client=self.client,
-            prior_scene_metadata=self.vector_metadata,
+            prior_scene_metadata=self._prior_scenes(scene_description),
+            scene_description=scene_description,
+            max_scenes=self.num_scenes
+        )
+
+        verdict = "consistent" if is_consistent else "inconsistent"
+        self.internal_thoughts.append(f"Observe: Scene is {verdict} with prior comedic tone.")
+        return is_consistent, analysis_text
+
+    async def aobserve(self, scene_description: str) -> Tuple[bool, str]:
+        """
+        Async version of `observe`.
+        """
+        is_consistent, analysis_text = await aanalyze_and_verify_comedic_consistency(
+            client=self.client,
+            prior_scene_metadata=await self._aprior_scenes(scene_description),
             scene_description=scene_description,
             max_scenes=self.num_scenes
         )
@@ -72,6 +122,19 @@ class ComedicAgent:
         self.internal_thoughts.append("Recommend: Provided comedic improvements.")
         return recommendations
 
+    async def arecommend(self, scene_description: str, is_consistent: bool, analysis_text: str) -> str:
+        """
+        Async version of `recommend`.
+        """
+        recommendations = await arecommend_comedic_improvements(
+            client=self.client,
+            scene_description=scene_description,
+            is_consistent=is_consistent,
+            consistency_result=analysis_text
+        )
+        self.internal_thoughts.append("Recommend: Provided comedic improvements.")
+        return recommendations
+
     def run(self, scene_description: str, scene_number: int) -> Tuple[Dict, bool, str, str, List[str]]:
         """
         Full ReAct cycle: Think ➔ Act ➔ Observe ➔ Recommend
@@ -91,7 +154,18 @@ class ComedicAgent:
             - internal_thoughts (list of str): agent reasoning trace
         """
         self.think(scene_description, scene_number)
-        context = self.act(scene_number)
+        context = self.act(scene_number, scene_description)
         is_consistent, analysis_text = self.observe(scene_description)
         recommendations = self.recommend(scene_description, is_consistent, analysis_text)
         return context, is_consistent, analysis_text, recommendations, self.internal_thoughts
+
+    async def arun(self, scene_description: str, scene_number: int) -> Tuple[Dict, bool, str, str, List[str]]:
+        """
+        Async version of `run`: the same ReAct cycle, awaiting the LLM calls instead of blocking
+        a thread (pass an `AsyncOpenAI` client).
+        """
+        self.think(scene_description, scene_number)
+        context = await self.aact(scene_number, scene_description)
+        is_consistent, analysis_text = await self.aobserve(scene_description)
+        recommendations = await self.arecommend(scene_description, is_consistent, analysis_text)
+        return context, is_consistent, analysis_text, recommendations, self.internal_thoughts
@@ -1,6 +1,45 @@
 
 from typing import Dict, List, Tuple
-import time
+from llm_gateway import achat_completion, chat_completion
+
+def _comedic_consistency_prompt(prior_scene_metadata, scene_description, max_scenes):
+    # Pull prior summaries and recurring jokes
+    relevant_summaries = [meta["summary"] for meta in prior_scene_metadata][-max_scenes:]
+    prior_running_gags = []
+    for meta in prior_scene_metadata[-max_scenes:]:
+        prior_running_gags.extend(meta.get("recurring_joke", []))
+
+    prior_summary_text = "\n".join(relevant_summaries)
+    prior_gags_text = ", ".join(prior_running_gags) if prior_running_gags else "None"
+
+    return f"""
+You are a professional comedy writer who specializes in punch-up work for sitcoms.
+
+Your job is to ensure that the comedic tone remains consistent across scenes and that recurring jokes are used effectively without becoming stale.
+
+Previous Scenes Summaries:
+{prior_summary_text}
+
+Previous Running Jokes:
+{prior_gags_text}
+
+Current Scene Description:
+{scene_description}
+
+Tasks:
+1. Identify the dominant comedic tone in the new scene.
+2. Verify if the tone and humor are consistent with prior scenes.
+3. Check if any running jokes are being overused (appearing too often without variation).
+4. If there are inconsistencies or overuse issues, explain clearly and suggest how to fix it.
+
+Respond exactly in this format:
+1. Detected Tone: [tone]
+2. Consistency Verdict (Yes/No)
+3. Short Explanation (max 5 lines)
+4. Overuse Check: [None / Overused Joke(s): list]
+5. Specific Suggestions if inconsistencies or overuse exist
+"""
+
 
 def analyze_and_verify_comedic_consistency(
     client,
@@ -45,54 +84,40 @@ def analyze_and_verify_comedic_consistency(
         Exception: After 3 failed retry attempts or other runtime issues.
     """
     try:
-        # Pull prior summaries and recurring jokes
-        relevant_summaries = [meta["summary"] for meta in prior_scene_metadata][-max_scenes:]
-        prior_running_gags = []
-        for meta in prior_scene_metadata[-max_scenes:]:
-            prior_running_gags.extend(meta.get("recurring_joke", []))
-
-        prior_summary_text = "\n".join(relevant_summaries)
-        prior_gags_text = ", ".join(prior_running_gags) if prior_running_gags else "None"
-
-        prompt = f"""
-You are a professional comedy writer who specializes in punch-up work for sitcoms.
+        prompt = _comedic_consistency_prompt(prior_scene_metadata, scene_description, max_scenes)
 
-Your job is to ensure that the comedic tone remains consistent across scenes and that recurring jokes are used effectively without becoming stale.
-
-Previous Scenes Summaries:
-{prior_summary_text}
-
-Previous Running Jokes:
-{prior_gags_text}
+        result = chat_completion(
+            client,
+            prompt,
+            model="gpt-4",
+            temperature=0,
+            top_p=1
+        )
+        is_consistent = "yes" in result.lower().split("\n")[1].lower()
 
-Current Scene Description:
-{scene_description}
+        return is_consistent, result
 
-Tasks:
-1. Identify the dominant comedic tone in the new scene.
-2. Verify if the tone and humor are consistent with prior scenes.
-3. Check if any running jokes are being overused (appearing too often without variation).
-4. If there are inconsistencies or overuse issues, explain clearly and suggest how to fix it.
+    except Exception as e:
+        raise Exception(f"Error analyzing comedic consistency: {str(e)}")
 
-Respond exactly in this format:
-1. Detected Tone: [tone]
-2. Consistency Verdict (Yes/No)
-3. Short Explanation (max 5 lines)
-4. Overuse Check: [None / Overused Joke(s): list]
-5. Specific Suggestions if inconsistencies or overuse exist
-"""
 
-        response = client.chat.completions.create(
+async def aanalyze_and_verify_comedic_consistency(
+    client,
+    prior_scene_metadata,
+    scene_description,
+    max_scenes=3
+) -> Tuple[bool, str]:
+    """
+    Async version of `analyze_and_verify_comedic_consistency` (see `achat_completion` for client handling).
+    """
+    try:
+        result = await achat_completion(
+            client,
+            _comedic_consistency_prompt(prior_scene_metadata, scene_description, max_scenes),
             model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
             temperature=0,
             top_p=1
         )
-
-        if not response or not response.choices or not response.choices[0].message.content:
-            raise ValueError("Received an empty or malformed response from the API.")
-
-        result = response.choices[0].message.content.strip()
         is_consistent = "yes" in result.lower().split("\n")[1].lower()
 
         return is_consistent, result
@@ -101,6 +126,38 @@ Respond exactly in this format:
         raise Exception(f"Error analyzing comedic consistency: {str(e)}")
 
 
+def _comedic_improvements_prompt(scene_description, is_consistent, consistency_result):
+    # Include critique context if the scene was flagged as inconsistent
+    consistency_context = (
+        f"\n\nNote: The comedic tone in this scene was flagged as inconsistent.\n"
+        f"Critique:\n{consistency_result.strip()}\n\n"
+        f"Your task is to revise the humor to better align with the prior scenes' tone, while preserving the scene’s intent."
+        if not is_consistent else ""
+    )
+
+    return f"""
+You are the Co-Executive Producer in charge of comedic punch-up for a sitcom writing team.
+
+Your job is to improve scenes by adding natural, grounded humor that fits the characters and tone of the show.
+{consistency_context}
+
+Current Scene Description:
+{scene_description}
+
+Tasks:
+- Suggest 2 realistic, grounded comedic improvements.
+- Build on any humorous situations, dialogue quirks, or character behaviors.
+- Reinforce light running jokes if appropriate, but avoid overusing them.
+- If the scene has tonal issues, your suggestions should help realign it with the intended comedic style.
+- Keep suggestions short, sitcom-appropriate (2–3 min scene).
+
+Format:
+Interaction Recommendations:
+1. [Suggestion] — (justification referencing prior scene(s))
+2. [Suggestion] — (justification referencing prior scene(s))
+"""
+
+
 def recommend_comedic_improvements(
     client,
     scene_description,
@@ -136,47 +193,37 @@ def recommend_comedic_improvements(
         Exception: After 3 failed retry attempts or other runtime issues.
     """
     try:
-        # Include critique context if the scene was flagged as inconsistent
-        consistency_context = (
-            f"\n\nNote: The comedic tone in this scene was flagged as inconsistent.\n"
-            f"Critique:\n{consistency_result.strip()}\n\n"
-            f"Your task is to revise the humor to better align with the prior scenes' tone, while preserving the scene’s intent."
-            if not is_consistent else ""
-        )
-
-        prompt = f"""
-You are the Co-Executive Producer in charge of comedic punch-up for a sitcom writing team.
+        prompt = _comedic_improvements_prompt(scene_description, is_consistent, consistency_result)
 
-Your job is to improve scenes by adding natural, grounded humor that fits the characters and tone of the show.
-{consistency_context}
-
-Current Scene Description:
-{scene_description}
+        return chat_completion(
+            client,
+            prompt,
+            model="gpt-4",
+            temperature=0.7,
+            top_p=0.9
+        )
 
-Tasks:
-- Suggest 2 realistic, grounded comedic improvements.
-- Build on any humorous situations, dialogue quirks, or character behaviors.
-- Reinforce light running jokes if appropriate, but avoid overusing them.
-- If the scene has tonal issues, your suggestions should help realign it with the intended comedic style.
-- Keep suggestions short, sitcom-appropriate (2–3 min scene).
+    except Exception as e:
+        raise Exception(f"Error generating comedic improvement suggestions: {str(e)}")
 
-Format:
-Interaction Recommendations:
-1. [Suggestion] — (justification referencing prior scene(s))
-2. [Suggestion] — (justification referencing prior scene(s))
-"""
 
-        response = client.chat.completions.create(
+async def arecommend_comedic_improvements(
+    client,
+    scene_description,
+    is_consistent=True,
+    consistency_result=""
+) -> str:
+    """
+    Async version of `recommend_comedic_improvements` (see `achat_completion` for client handling).
+    """
+    try:
+        return await achat_completion(
+            client,
+            _comedic_improvements_prompt(scene_description, is_consistent, consistency_result),
             model="gpt-4",
-            messages=[{"role": "user", "content": prompt}],
             temperature=0.7,
             top_p=0.9
         )
 
-        if not response or not response.choices or not response.choices[0].message.content:
-            raise ValueError("Received an empty or malformed response from the API.")
-
-        return response.choices[0].message.content.strip()
-
     except Exception as e:
         raise Exception(f"Error generating comedic improvement suggestions: {str(e)}")
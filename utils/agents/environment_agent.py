@@ -1,17 +1,23 @@
 
 from typing import List, Tuple, Dict
 from environment_helpers import (
+    aanalyze_environment,
     analyze_environment,
+    asuggest_environment_details,
+    averify_environment_transition,
+    environment_analysis_from_scene,
     verify_environment_transition,
     suggest_environment_details
 )
+from vector_db_utils import aretrieve_prior_scenes, retrieve_prior_scenes
 
 class EnvironmentAgent:
     """
     A ReAct agent specialized for maintaining environment and setting continuity across scenes.
     """
 
-    def __init__(self, client, vector_metadata, num_scenes: int = 3):
+    def __init__(self, client, vector_metadata, num_scenes: int = 3, embedding_model=None, index=None,
+                 scene_analysis=None):
         """
         Initializes the EnvironmentAgent.
 
@@ -19,10 +25,18 @@ class EnvironmentAgent:
             client: OpenAI client for prompting.
             vector_metadata: List of prior scene metadata (summaries, locations, etc.).
             num_scenes: Number of prior scenes to use for checking transitions.
+            embedding_model: (Optional) Model used to embed the environment for retrieval.
+            index: (Optional) FAISS index aligned with `vector_metadata`. With `embedding_model`,
+                   the most relevant prior scenes (plus the latest one) are used instead of the most recent ones.
+            scene_analysis: (Optional) `analyze_scene` output for the scene description. Its location and
+                   key details are used instead of a separate `analyze_environment` call.
         """
         self.client = client
         self.vector_metadata = vector_metadata
         self.num_scenes = num_scenes
+        self.embedding_model = embedding_model
+        self.index = index
+        self.scene_analysis = scene_analysis
         self.internal_thoughts = []
 
     def think(self, scene_description: str, scene_number: int) -> Dict:
@@ -41,11 +55,31 @@ class EnvironmentAgent:
         """
         Act step: Analyze the environment and identify key features.
         """
-        environment_analysis = analyze_environment(
-            client=self.client,
-            scene_description=scene_description,
-            scene_number=scene_number
-        )
+        if self.scene_analysis is not None:
+            environment_analysis = environment_analysis_from_scene(self.scene_analysis)
+        else:
+            environment_analysis = analyze_environment(
+                client=self.client,
+                scene_description=scene_description,
+                scene_number=scene_number
+            )
+        return self._environment_context(environment_analysis, scene_number)
+
+    async def aact(self, scene_description: str, scene_number: int) -> Dict:
+        """
+        Async version of `act`.
+        """
+        if self.scene_analysis is not None:
+            environment_analysis = environment_analysis_from_scene(self.scene_analysis)
+        else:
+            environment_analysis = await aanalyze_environment(
+                client=self.client,
+                scene_description=scene_description,
+                scene_number=scene_number
+            )
+        return self._environment_context(environment_analysis, scene_number)
+
+    def _environment_context(self, environment_analysis: str, scene_number: int) -> Dict:
         self.internal_thoughts.append(f"Act: Analyzed environment features for Scene {scene_number}.")
 
         current_environment = ""
@@ -58,15 +92,50 @@ class EnvironmentAgent:
             "environment": current_environment
         }
 
+    def _prior_environments(self, current_environment: str) -> List[str]:
+        prior_scenes = retrieve_prior_scenes(
+            self.vector_metadata,
+            self.num_scenes,
+            query_text=current_environment,
+            embedding_model=self.embedding_model,
+            index=self.index,
+            include_latest=True
+        )
+        return [meta.get("location", "Unknown") for meta in prior_scenes]
+
+    async def _aprior_environments(self, current_environment: str) -> List[str]:
+        prior_scenes = await aretrieve_prior_scenes(
+            self.vector_metadata,
+            self.num_scenes,
+            query_text=current_environment,
+            embedding_model=self.embedding_model,
+            index=self.index,
+            include_latest=True
+        )
+        return [meta.get("location", "Unknown") for meta in prior_scenes]
+
     def observe(self, current_environment: str) -> Tuple[bool, str, str]:
         """
         Observe step: Evaluate if the environment transition is logical and natural.
         """
-        prior_environments = [meta.get("location", "Unknown") for meta in self.vector_metadata]
-
         is_consistent, explanation, formatted_output = verify_environment_transition(
             client=self.client,
-            prior_environments=prior_environments,
+            prior_environments=self._prior_environments(current_environment),
+            current_environment=current_environment,
+            num_scenes=self.num_scenes
+        )
+
+        verdict = "consistent" if is_consistent else "inconsistent"
+        self.internal_thoughts.append(f"Observe: Scene transition is {verdict}.")
+        return is_consistent, explanation, formatted_output
+
+    async def aobserve(self, current_environment: str) -> Tuple[bool, str, str]:
+        """
+        Async version of `observe`.
+        """
+        is_consistent, explanation, formatted_output = await averify_environment_transition(
+            client=self.client,
+            prior_environments=await self._aprior_environments(current_environment),
             current_environment=current_environment,
             num_scenes=self.num_scenes
         )
@@ -88,6 +157,19 @@ class EnvironmentAgent:
         self.internal_thoughts.append("Recommend: Provided environmental enhancement suggestions.")
         return suggestions
 
+    async def arecommend(self, environment_analysis: str, transition_check: str, is_consistent: bool) -> str:
+        """
+        Async version of `recommend`.
+        """
+        suggestions = await asuggest_environment_details(
+            client=self.client,
+            environment_analysis=environment_analysis,
+            transition_check=transition_check,
+            is_consistent=is_consistent
+        )
+        self.internal_thoughts.append("Recommend: Provided environmental enhancement suggestions.")
+        return suggestions
+
     def run(self, scene_description: str, scene_number: int) -> Tuple[Dict, bool, str, str, List[str]]:
         """
         Full ReAct cycle: Think ➔ Act ➔ Observe ➔ Recommend
@@ -104,3 +186,14 @@ class EnvironmentAgent:
         is_consistent, explanation, full_transition_text = self.observe(context["environment"])
         suggestions = self.recommend(context["analysis"], full_transition_text, is_consistent)
         return context, is_consistent, explanation, suggestions, self.internal_thoughts
+
+    async def arun(self, scene_description: str, scene_number: int) -> Tuple[Dict, bool, str, str, List[str]]:
+        """
+        Async version of `run`: the same ReAct cycle, awaiting the LLM calls instead of blocking
+        a thread (pass an `AsyncOpenAI` client).
+        """
+        _ = self.think(scene_description, scene_number)
+        context = await self.aact(scene_description, scene_number)
+        is_consistent, explanation, full_transition_text = await self.aobserve(context["environment"])
+        suggestions = await self.arecommend(context["analysis"], full_transition_text, is_consistent)
+        return context, is_consistent, explanation, suggestions, self.internal_thoughts
@@ -1,6 +1,25 @@
 
 from typing import List, Tuple
-import time
+from llm_gateway import achat_completion, chat_completion
+
+def _environment_prompt(scene_description, scene_number):
+    return f"""
+You are the Writers' Assistant on the sitcom writing team.
+
+Your job is to extract key environmental elements from Scene {scene_number}.
+
+Given the following scene description, identify:
+1. The **main environment or location** where the scene takes place.
+2. A **comma-separated list of key props, scenery, or environmental features** that are important for the tone, humor, or character action.
+
+Scene Description:
+{scene_description}
+
+Respond in this exact format:
+Environment: [concise location name]
+Key Details: [comma-separated list of props or features]
+"""
+
 
 def analyze_environment(
     client,
@@ -40,41 +59,94 @@ def analyze_environment(
         ValueError: If the API response is empty or malformed.
         Exception: After 3 failed retry attempts or other runtime issues.
     """
-    prompt = f"""
-You are the Writers' Assistant on the sitcom writing team.
+    prompt = _environment_prompt(scene_description, scene_number)
+
+    return chat_completion(
+        client,
+        prompt,
+        model="gpt-4",
+        temperature=0,
+        top_p=1,
+        error_message=f"Error analyzing environment for Scene {scene_number}"
+    )
 
-Your job is to extract key environmental elements from Scene {scene_number}.
 
-Given the following scene description, identify:
-1. The **main environment or location** where the scene takes place.
-2. A **comma-separated list of key props, scenery, or environmental features** that are important for the tone, humor, or character action.
+async def aanalyze_environment(
+    client,
+    scene_description,
+    scene_number
+) -> str:
+    """
+    Async version of `analyze_environment` (see `achat_completion` for client handling).
+    """
+    return await achat_completion(
+        client,
+        _environment_prompt(scene_description, scene_number),
+        model="gpt-4",
+        temperature=0,
+        top_p=1,
+        error_message=f"Error analyzing environment for Scene {scene_number}"
+    )
 
-Scene Description:
-{scene_description}
 
-Respond in this exact format:
-Environment: [concise location name]
-Key Details: [comma-separated list of props or features]
+def environment_analysis_from_scene(scene_analysis) -> str:
+    """
+    Formats a fused scene analysis (`analyze_scene`) like `analyze_environment`'s output,
+    so the Environment agent can skip that API call.
+
+    Args:
+        scene_analysis (dict): Output of `analyze_scene` for the scene description.
+
+    Returns:
+        str: "Environment: ...\nKey Details: ..." in the format of `analyze_environment`.
+    """
+    key_details = scene_analysis.get("key_details") or []
+    return (
+        f"Environment: {scene_analysis.get('location') or 'Unknown'}\n"
+        f"Key Details: {', '.join(key_details) if key_details else 'None'}"
+    )
+
+
+def _transition_prompt(prior_environments, current_environment, num_scenes):
+    prior_env_text = ", ".join(prior_environments[-num_scenes:]) if prior_environments else "None"
+
+    return f"""
+You are the Head Writer on the sitcom writing team.
+
+Your task is to evaluate whether the environment change into the current scene makes sense.
+
+Previous Locations (last {num_scenes} scenes):
+{prior_env_text}
+
+Current Scene Environment:
+{current_environment}
+
+Tasks:
+1. Determine whether this transition is logical and believable within the context of the show.
+2. If it's not, suggest a short setup or linking action that could help the audience accept the change.
+
+Respond in the following format:
+
+Transition Check:
+- Logical Transition? (Yes/No)
+- Short Explanation (max 5 lines)
+- Suggested Transition Setup (optional)
 """
 
-    for attempt in range(3):
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0,
-                top_p=1
-            )
 
-            if not response or not response.choices or not response.choices[0].message.content:
-                raise ValueError(f"Received an empty or malformed environment response for Scene {scene_number}.")
+def _parse_transition_check(output):
+    # Parse consistency verdict
+    verdict_line = next((line for line in output.splitlines() if "Logical Transition?" in line), "").lower()
+    is_consistent = "yes" in verdict_line
 
-            return response.choices[0].message.content.strip()
+    # Extract explanation
+    explanation_start = output.find("Short Explanation:")
+    if explanation_start != -1:
+        explanation = output[explanation_start:].strip()
+    else:
+        explanation = "Explanation not found."
 
-        except Exception as e:
-            if attempt == 2:
-                raise Exception(f"Error analyzing environment for Scene {scene_number}: {str(e)}")
-            time.sleep(2 ** attempt)  # Retry delay: 1s, 2s
+    return is_consistent, explanation, output
 
 
 def verify_environment_transition(
@@ -117,62 +189,70 @@ def verify_environment_transition(
         ValueError: If the API response is empty or malformed.
         Exception: After 3 failed retry attempts or other runtime issues.
     """
-    prior_env_text = ", ".join(prior_environments[-num_scenes:]) if prior_environments else "None"
-
-    prompt = f"""
-You are the Head Writer on the sitcom writing team.
+    prompt = _transition_prompt(prior_environments, current_environment, num_scenes)
+
+    output = chat_completion(
+        client,
+        prompt,
+        model="gpt-4",
+        temperature=0,
+        top_p=1,
+        error_message="Error verifying environment transition"
+    )
 
-Your task is to evaluate whether the environment change into the current scene makes sense.
+    return _parse_transition_check(output)
 
-Previous Locations (last {num_scenes} scenes):
-{prior_env_text}
 
-Current Scene Environment:
-{current_environment}
-
-Tasks:
-1. Determine whether this transition is logical and believable within the context of the show.
-2. If it's not, suggest a short setup or linking action that could help the audience accept the change.
-
-Respond in the following format:
+async def averify_environment_transition(
+    client,
+    prior_environments,
+    current_environment,
+    num_scenes
+) -> Tuple[bool, str, str]:
+    """
+    Async version of `verify_environment_transition` (see `achat_completion` for client handling).
+    """
+    output = await achat_completion(
+        client,
+        _transition_prompt(prior_environments, current_environment, num_scenes),
+        model="gpt-4",
+        temperature=0,
+        top_p=1,
+        error_message="Error verifying environment transition"
+    )
+    return _parse_transition_check(output)
 
-Transition Check:
-- Logical Transition? (Yes/No)
-- Short Explanation (max 5 lines)
-- Suggested Transition Setup (optional)
-"""
 
-    for attempt in range(3):
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0,
-                top_p=1
-            )
+def _environment_details_prompt(environment_analysis, transition_check, is_consistent):
+    consistency_note = (
+        "The transition is smooth, so these details should support continuity and tone."
+        if is_consistent else
+        "The transition is jarring, so use details that subtly reinforce the new setting and ease the audience into it."
+    )
 
-            if not response or not response.choices or not response.choices[0].message.content:
-                raise ValueError("Received an empty or malformed response from the API.")
+    return f"""
+You are the Co-Executive Producer on the sitcom writing team.
 
-            output = response.choices[0].message.content.strip()
+Environment Analysis:
+{environment_analysis}
 
-            # Parse consistency verdict
-            verdict_line = next((line for line in output.splitlines() if "Logical Transition?" in line), "").lower()
-            is_consistent = "yes" in verdict_line
+Transition Check:
+{transition_check}
 
-            # Extract explanation
-            explanation_start = output.find("Short Explanation:")
-            if explanation_start != -1:
-                explanation = output[explanation_start:].strip()
-            else:
-                explanation = "Explanation not found."
+Notes:
+{consistency_note}
 
-            return is_consistent, explanation, output
+Tasks:
+- Suggest 2 small environment or sensory details that would naturally enhance the next scene.
+- Examples: sights, sounds, smells, small props, background actions.
+- Focus on realistic, sitcom-appropriate moments (not big changes).
+- Keep suggestions light, natural, and funny where appropriate.
 
-        except Exception as e:
-            if attempt == 2:
-                raise Exception(f"Error verifying environment transition: {str(e)}")
-            time.sleep(2 ** attempt)
+Format:
+Environment Details Suggestions:
+- [Suggestion 1]
+- [Suggestion 2]
+"""
 
 
 def suggest_environment_details(
@@ -209,51 +289,32 @@ def suggest_environment_details(
         ValueError: If the API response is malformed or empty.
         Exception: After 3 failed retry attempts or other runtime issues.
     """
-    consistency_note = (
-        "The transition is smooth, so these details should support continuity and tone."
-        if is_consistent else
-        "The transition is jarring, so use details that subtly reinforce the new setting and ease the audience into it."
+    prompt = _environment_details_prompt(environment_analysis, transition_check, is_consistent)
+
+    return chat_completion(
+        client,
+        prompt,
+        model="gpt-4",
+        temperature=0.7,
+        top_p=0.9,
+        error_message="Error generating environment detail suggestions"
     )
 
-    prompt = f"""
-You are the Co-Executive Producer on the sitcom writing team.
-
-Environment Analysis:
-{environment_analysis}
-
-Transition Check:
-{transition_check}
-
-Notes:
-{consistency_note}
-
-Tasks:
-- Suggest 2 small environment or sensory details that would naturally enhance the next scene.
-- Examples: sights, sounds, smells, small props, background actions.
-- Focus on realistic, sitcom-appropriate moments (not big changes).
-- Keep suggestions light, natural, and funny where appropriate.
-
-Format:
-Environment Details Suggestions:
-- [Suggestion 1]
-- [Suggestion 2]
-"""
-
-    for attempt in range(3):
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.7,
-                top_p=0.9
-            )
-
-            if not response or not response.choices or not response.choices[0].message.content:
-                raise ValueError("Received an empty or malformed response from the API.")
 
-            return response.choices[0].message.content.strip()
-
-        except Exception as e:
-            if attempt == 2:
-                raise Exception(f"Error generating environment detail suggestions: {str(e)}")
-            time.sleep(2 ** attempt)
+async def asuggest_environment_details(
+    client,
+    environment_analysis,
+    transition_check,
+    is_consistent
+) -> str:
+    """
+    Async version of `suggest_environment_details` (see `achat_completion` for client handling).
+    """
+    return await achat_completion(
+        client,
+        _environment_details_prompt(environment_analysis, transition_check, is_consistent),
+        model="gpt-4",
+        temperature=0.7,
+        top_p=0.9,
+        error_message="Error generating environment detail suggestions"
+    )
@@ -0,0 +1,198 @@
+import os
+import re
+
+import numpy as np
+
+DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+ONNX_MIN_COSINE = 0.9999      # Parity required of the float32 ONNX model with SentenceTransformer
+ONNX_INT8_MIN_COSINE = 0.98   # Parity required of the int8 quantized model
+
+PARITY_TEXTS = [
+    "Dave and Maya argue about the broken espresso machine while the landlord listens in.",
+    "Grandpa Lou finally reveals where he hid the lottery ticket, but the dog ate it.",
+    "The locksmith shop floods during the first date, and nobody admits to leaving the tap on.",
+    "A quiet, awkward elevator ride after the office holiday party.",
+    "Running gag: Priya keeps mispronouncing 'quinoa' and insists she is right.",
+    "Interior, kitchen, night. Everyone pretends not to notice the birthday cake is missing."
+]
+
+
+class SentenceTransformerBackend:
+    """
+    Embedding backend that runs a SentenceTransformer model through PyTorch (the reference implementation).
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, device=None):
+        """
+        Loads the SentenceTransformer model.
+
+        Args:
+            model_name (str): Hugging Face model name (default: all-MiniLM-L6-v2).
+            device (str): Torch device, e.g. "cpu" (default: SentenceTransformer's choice).
+        """
+        from sentence_transformers import SentenceTransformer
+
+        self.name = model_name.split("/")[-1]
+        self.model = SentenceTransformer(model_name, device=device)
+
+    def get_sentence_embedding_dimension(self):
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        return self.model.encode(sentences, batch_size=batch_size, **kwargs)
+
+
+class OnnxEmbeddingBackend:
+    """
+    Embedding backend that runs all-MiniLM-L6-v2 (or another mean-pooled BERT encoder) on ONNX Runtime.
+
+    Tokenization uses the model's fast `tokenizer.json` and inference runs on the CPU execution
+    provider, so neither torch nor transformers is imported. Outputs are mean-pooled over the
+    attention mask and L2-normalized, matching the SentenceTransformer pipeline for this model.
+    With `quantized=True` the model's weights are converted to int8 with ONNX Runtime's
+    dynamic quantization (once, cached on disk), which shrinks the model roughly 4x and
+    speeds up CPU inference at a small cost in accuracy (see `check_embedding_parity`).
+    """
+
+    def __init__(self, model_name=DEFAULT_MODEL_NAME, model_dir=None, quantized=False, cache_dir=None,
+                 max_length=256, num_threads=None):
+        """
+        Loads the ONNX model and tokenizer.
+
+        Args:
+            model_name (str): Hugging Face model name, used to download `onnx/model.onnx` and
+                `tokenizer.json` when `model_dir` is not given (default: all-MiniLM-L6-v2).
+            model_dir (str): Local directory containing `model.onnx` and `tokenizer.json` (optional).
+            quantized (bool): Use an int8 dynamically quantized copy of the model (default: False).
+            cache_dir (str): Where the quantized model is written (default: `model_dir`, or
+                ~/.cache/scene_embeddings when the model was downloaded).
+            max_length (int): Maximum tokens per text; longer texts are truncated (default: 256,
+                the SentenceTransformer setting for all-MiniLM-L6-v2).
+            num_threads (int): Intra-op threads for ONNX Runtime (default: ONNX Runtime's choice).
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        if model_dir:
+            model_path = os.path.join(model_dir, "model.onnx")
+            tokenizer_path = os.path.join(model_dir, "tokenizer.json")
+        else:
+            from huggingface_hub import hf_hub_download
+            model_path = hf_hub_download(model_name, "onnx/model.onnx")
+            tokenizer_path = hf_hub_download(model_name, "tokenizer.json")
+
+        self.name = model_name.split("/")[-1] + ("-onnx-int8" if quantized else "-onnx")
+        if quantized:
+            cache_dir = cache_dir or model_dir or os.path.join(os.path.expanduser("~"), ".cache", "scene_embeddings")
+            quantized_path = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", self.name) + ".onnx")
+            if not os.path.exists(quantized_path):
+                quantize_onnx_model(model_path, quantized_path)
+            model_path = quantized_path
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.no_padding()  # Batches are padded by hand to their own longest text
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self._dimension = self.session.get_outputs()[0].shape[-1]
+
+    def get_sentence_embedding_dimension(self):
+        return self._dimension
+
+    def _encode_batch(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        length = max(len(encoding.ids) for encoding in encodings)
+        input_ids = np.zeros((len(texts), length), dtype="int64")
+        attention_mask = np.zeros((len(texts), length), dtype="int64")
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = 1
+
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._input_names:
+            inputs["token_type_ids"] = np.zeros_like(input_ids)
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        # Mean pooling over real tokens, then L2 normalization
+        mask = attention_mask[..., None].astype("float32")
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+    def encode(self, sentences, batch_size=32, **kwargs):
+        """
+        Encodes a string or list of strings.
+
+        Texts are grouped by length before batching so little work is spent on padding.
+        Extra keyword arguments accepted by SentenceTransformer.encode are ignored.
+
+        Returns:
+            np.ndarray: A 1-D float32 vector for a single string, or a 2-D array for a list.
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        embeddings = np.zeros((len(texts), self._dimension), dtype="float32")
+
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            embeddings[batch] = self._encode_batch([texts[i] for i in batch])
+
+        return embeddings[0] if single else embeddings
+
+
+def quantize_onnx_model(model_path, output_path):
+    """
+    Writes an int8 dynamically quantized copy of an ONNX model.
+
+    Args:
+        model_path (str): Path of the float32 ONNX model.
+        output_path (str): Path for the quantized model.
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_path = f"{output_path}.tmp"
+    quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, output_path)
+
+
+def check_embedding_parity(backend, reference, texts=None, min_cosine=0.99):
+    """
+    Compares a backend's embeddings with a reference backend's (e.g., ONNX vs SentenceTransformer).
+
+    Args:
+        backend: Embedding backend under test.
+        reference: Reference embedding backend.
+        texts (list of str): Texts to embed (default: a small set of scene-like sentences).
+        min_cosine (float): Minimum cosine similarity each pair must reach (default: 0.99).
+
+    Returns:
+        dict: 'min_cosine', 'mean_cosine' and 'passed' (bool).
+    """
+    texts = texts or PARITY_TEXTS
+    a = np.asarray(backend.encode(texts), dtype="float32")
+    b = np.asarray(reference.encode(texts), dtype="float32")
+    cosine = (a * b).sum(axis=1) / (np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1))
+    return {
+        "min_cosine": float(cosine.min()),
+        "mean_cosine": float(cosine.mean()),
+        "passed": bool(cosine.min() >= min_cosine)
+    }
+
+
+if __name__ == "__main__":
+    # Parity check: python embedding_backends.py (exits non-zero if a backend drifts from SentenceTransformer)
+    import sys
+
+    reference = SentenceTransformerBackend()
+    passed = True
+    for quantized, threshold in ((False, ONNX_MIN_COSINE), (True, ONNX_INT8_MIN_COSINE)):
+        result = check_embedding_parity(OnnxEmbeddingBackend(quantized=quantized), reference, min_cosine=threshold)
+        print(f"{'onnx-int8' if quantized else 'onnx'}: {result}")
+        passed = passed and result["passed"]
+    sys.exit(0 if passed else 1)
@@ -1,6 +1,7 @@
 
 import pandas as pd
 import re
+from llm_gateway import chat_completion
 
 def evaluate_scene_block(
     client,
@@ -73,17 +74,15 @@ Respond like this:
 - Overall Quality: X – explanation
 """
 
-    response = client.chat.completions.create(
+    return chat_completion(
+        client,
+        prompt,
         model=model,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=temperature
+        temperature=temperature,
+        top_p=None,
+        error_message="Error evaluating scene block"
     )
 
-    if not response or not response.choices or not response.choices[0].message.content:
-        raise ValueError("API returned an empty or malformed response.")
-
-    return response.choices[0].message.content.strip()
-
 
 def evaluate_episode_blocks(
     client,
@@ -172,3 +171,26 @@ def extract_evaluation_scores(evaluation_dict, episode_number, version_label):
                     print(f"⚠️ Skipped unmatched line in {block_name}: {line}")
 
     return pd.DataFrame(rows)
+
+
+def scene_metadata_frame(vector_metadata):
+    """
+    Returns stored scene metadata as a DataFrame, e.g. to join evaluation scores with scene tags.
+
+    A SceneMetadataStore is exported through its Arrow columns (no per-record dict copies)
+    when pyarrow is installed; otherwise the frame is built from the records directly.
+
+    Args:
+        vector_metadata: SceneMetadataStore or list of scene metadata dicts.
+
+    Returns:
+        pd.DataFrame: One row per scene with columns such as
+            ['scene_id', 'episode', 'scene_number', 'summary', 'characters', 'location',
+             'recurring_joke', 'emotional_tone']
+    """
+    if hasattr(vector_metadata, "to_pandas"):
+        try:
+            return vector_metadata.to_pandas()
+        except ImportError:
+            pass
+    return pd.DataFrame([dict(meta) for meta in vector_metadata])
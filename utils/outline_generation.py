@@ -1,5 +1,31 @@
 
-import time
+from llm_gateway import achat_completion, chat_completion
+
+def _sitcom_pitch_prompt(keywords_dict=None):
+    idea_string = ""
+    if keywords_dict:
+        lines = ["\nIncorporate the following elements if relevant:"]
+        for category, keywords in keywords_dict.items():
+            if keywords:
+                lines.append(f"- **{category.capitalize()}**: {', '.join([k.strip() for k in keywords])}")
+        idea_string = "\n" + "\n".join(lines)
+
+    return f"""
+You are a professional comedy screenwriter.
+
+Generate an original sitcom concept in 1 paragraph.
+Be specific about the premise, the main characters and their dynamics,
+and the general tone of the show.{idea_string}
+
+The sitcom should be original and feel like it could exist on a major streaming platform.
+Avoid copying existing shows directly.
+
+Always follow this exact structure:
+
+Title: "<title of the sitcom in quotation marks>"
+<1-paragraph description of the show>
+"""
+
 
 def generate_sitcom_pitch(client, keywords_dict=None, model="gpt-4", temperature=0.7, top_p=0.9):
     """
@@ -27,49 +53,54 @@ def generate_sitcom_pitch(client, keywords_dict=None, model="gpt-4", temperature
         ValueError: If the API response is empty or not formatted correctly.
         Exception: After 3 failed retry attempts or for any runtime error.
     """
-    idea_string = ""
-    if keywords_dict:
-        lines = ["\nIncorporate the following elements if relevant:"]
-        for category, keywords in keywords_dict.items():
-            if keywords:
-                lines.append(f"- **{category.capitalize()}**: {', '.join([k.strip() for k in keywords])}")
-        idea_string = "\n" + "\n".join(lines)
+    prompt = _sitcom_pitch_prompt(keywords_dict)
 
-    prompt = f"""
-You are a professional comedy screenwriter.
+    return chat_completion(
+        client,
+        prompt,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message="Error generating sitcom pitch"
+    )
 
-Generate an original sitcom concept in 1 paragraph.
-Be specific about the premise, the main characters and their dynamics,
-and the general tone of the show.{idea_string}
 
-The sitcom should be original and feel like it could exist on a major streaming platform.
-Avoid copying existing shows directly.
+async def agenerate_sitcom_pitch(client, keywords_dict=None, model="gpt-4", temperature=0.7, top_p=0.9):
+    """
+    Async version of `generate_sitcom_pitch` (see `achat_completion` for client handling).
+    """
+    return await achat_completion(
+        client,
+        _sitcom_pitch_prompt(keywords_dict),
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message="Error generating sitcom pitch"
+    )
+
+
+def _pilot_outline_prompt(sitcom_pitch, num_scenes):
+    return f"""
+You are a professional sitcom writer, pitching a new sitcom to your network.
 
-Always follow this exact structure:
+Here is the pitch for a new sitcom:
+{sitcom_pitch}
 
-Title: "<title of the sitcom in quotation marks>"
-<1-paragraph description of the show>
-"""
+Write a detailed outline for the **pilot episode** of this sitcom.
 
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                top_p=top_p,
-            )
+First, write a short **Episode Concept** in 1–2 sentences.
 
-            if not response or not response.choices or not response.choices[0].message.content:
-                raise ValueError("Received an empty or malformed response from the API.")
+Then break the episode into approximately {num_scenes} scenes.
 
-            return response.choices[0].message.content.strip()
+For each scene, use the following format exactly:
 
-        except Exception as e:
-            if attempt == max_retries - 1:
-                raise Exception(f"Error generating sitcom pitch: {str(e)}")
-            time.sleep(2 ** attempt)  # Exponential backoff: 1s, 2s, 4s
+Scene <number>: "<Scene Title>" <1–2 sentence description>
+
+Guidelines:
+- The scene title should be in quotation marks.
+- Each description should include what happens, who is involved, and the tone (e.g., funny, awkward, heartfelt).
+- Return only the full pilot episode outline, formatted clearly and consistently as shown.
+"""
 
 
 def generate_pilot_episode_outline(client, sitcom_pitch, num_scenes=20, model="gpt-4", temperature=0.7, top_p=0.9):
@@ -98,44 +129,28 @@ def generate_pilot_episode_outline(client, sitcom_pitch, num_scenes=20, model="g
         ValueError: If the API response is empty or improperly formatted.
         Exception: If all retries fail or another API-related issue occurs.
     """
-    prompt = f"""
-You are a professional sitcom writer, pitching a new sitcom to your network.
+    prompt = _pilot_outline_prompt(sitcom_pitch, num_scenes)
 
-Here is the pitch for a new sitcom:
-{sitcom_pitch}
-
-Write a detailed outline for the **pilot episode** of this sitcom.
-
-First, write a short **Episode Concept** in 1–2 sentences.
+    return chat_completion(
+        client,
+        prompt,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message="Error generating pilot episode outline"
+    )
 
-Then break the episode into approximately {num_scenes} scenes.
 
-For each scene, use the following format exactly:
-
-Scene <number>: "<Scene Title>" <1–2 sentence description>
-
-Guidelines:
-- The scene title should be in quotation marks.
-- Each description should include what happens, who is involved, and the tone (e.g., funny, awkward, heartfelt).
-- Return only the full pilot episode outline, formatted clearly and consistently as shown.
-"""
-
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                top_p=top_p,
-            )
-
-            if not response or not response.choices or not response.choices[0].message.content:
-                raise ValueError("Received an empty or malformed response from the API.")
-
-            return response.choices[0].message.content.strip()
-
-        except Exception as e:
-            if attempt == max_retries - 1:
-                raise Exception(f"Error generating pilot episode outline: {str(e)}")
-            time.sleep(2 ** attempt)  # Waits 1s, then 2s, then 4s on retries
+async def agenerate_pilot_episode_outline(client, sitcom_pitch, num_scenes=20, model="gpt-4", temperature=0.7,
+                                          top_p=0.9):
+    """
+    Async version of `generate_pilot_episode_outline` (see `achat_completion` for client handling).
+    """
+    return await achat_completion(
+        client,
+        _pilot_outline_prompt(sitcom_pitch, num_scenes),
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message="Error generating pilot episode outline"
+    )
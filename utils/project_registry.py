@@ -0,0 +1,245 @@
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from vector_store import PersistentVectorStore
+from script_store import ScriptStore
+from character_profile_store import CharacterProfileStore
+from vector_index import DEFAULT_TRAIN_THRESHOLD
+
+PROJECT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+REAP_INTERVAL = 60.0  # Seconds between idle-eviction passes
+
+
+class Project:
+    """
+    Continuity state for one project: its vector store, scene metadata, character profiles and scripts.
+    """
+
+    def __init__(self, project_id, directory, dimension, index_type="flat", index_options=None,
+                 train_threshold=DEFAULT_TRAIN_THRESHOLD):
+        """
+        Loads (or creates) a project's stores from its directory.
+
+        Args:
+            project_id (str): Project identifier.
+            directory (str): Directory holding this project's files.
+            dimension (int): Embedding dimension for a new index.
+            index_type (str): Index type for the vector store (default: "flat").
+            index_options (dict): Extra arguments for `create_index` (optional).
+            train_threshold (int): Number of scenes at which an "ivfpq" store is trained.
+        """
+        self.project_id = project_id
+        self.directory = directory
+        self.vector_store = PersistentVectorStore.open(
+            os.path.join(directory, "vectors"),
+            dimension,
+            index_type=index_type,
+            index_options=index_options,
+            train_threshold=train_threshold
+        )
+        self.metadata = self.vector_store.metadata
+        self.profile_store = CharacterProfileStore(os.path.join(directory, "profiles.json"))
+        self.script_store = ScriptStore(os.path.join(directory, "scripts.db"))
+        self.last_access = time.monotonic()
+        self.active_requests = 0
+
+    @property
+    def index(self):
+        """The project's FAISS index (replaced when an "ivfpq" store is trained)."""
+        return self.vector_store.index
+
+    def close(self):
+        """Checkpoints the project's stores to disk."""
+        self.vector_store.close()
+        self.profile_store.save()
+        self.script_store.close()
+
+
+class ProjectRegistry:
+    """
+    Lazily created, per-project continuity stores with LRU eviction to disk.
+
+    Each project (e.g., one writer's sitcom in the web app) gets its own index, metadata
+    and character profiles, so concurrent users never read each other's history. At most
+    `max_projects` are kept in memory; the least recently used idle project is
+    checkpointed and dropped when the limit is reached, and a background thread drops
+    projects that have been inactive for longer than `idle_timeout` seconds every
+    `reap_interval` seconds. An evicted project is reloaded from disk on its next request.
+
+    Projects are loaded and checkpointed outside the registry lock, so a slow load or
+    snapshot only holds up requests for that project. A request for a project that is
+    still loading, or still being checkpointed after eviction, waits for that to finish.
+    """
+
+    def __init__(self, base_dir, dimension, max_projects=16, idle_timeout=1800, index_type="flat",
+                 index_options=None, train_threshold=DEFAULT_TRAIN_THRESHOLD, reap_interval=REAP_INTERVAL):
+        """
+        Initializes the ProjectRegistry and starts its idle-eviction thread.
+
+        Args:
+            base_dir (str): Directory under which each project's files are stored.
+            dimension (int or callable): Embedding dimension for new indexes, or a zero-argument
+                callable returning it (resolved when the first project is loaded, so the
+                embedding model does not have to be loaded up front).
+            max_projects (int): Maximum number of projects kept in memory (default: 16).
+            idle_timeout (float): Seconds of inactivity before a project is evicted (default: 1800).
+            index_type (str): Index type for new project stores: "flat", "hnsw" or "ivfpq" (default: "flat").
+            index_options (dict): Extra arguments for `create_index` (optional).
+            train_threshold (int): Number of scenes at which an "ivfpq" store is trained.
+            reap_interval (float): Seconds between idle-eviction passes; 0 or None disables
+                the background thread (default: REAP_INTERVAL).
+        """
+        self.base_dir = base_dir
+        self._dimension = dimension
+        self.max_projects = max_projects
+        self.idle_timeout = idle_timeout
+        self.index_type = index_type
+        self.index_options = index_options
+        self.train_threshold = train_threshold
+        self._projects = {}
+        self._pending = {}  # project_id -> Event set once the project's load or close finishes
+        self._lock = threading.Lock()
+        self._dimension_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._reaper = None
+        if reap_interval:
+            self._reaper = threading.Thread(
+                target=self._reap, args=(reap_interval,), name="project-reaper", daemon=True
+            )
+            self._reaper.start()
+
+    @property
+    def dimension(self):
+        """Embedding dimension for new indexes, resolved on first access."""
+        if callable(self._dimension):
+            with self._dimension_lock:
+                if callable(self._dimension):
+                    self._dimension = self._dimension()
+        return self._dimension
+
+    @contextmanager
+    def project(self, project_id):
+        """
+        Context manager yielding the Project for `project_id`, loading it if needed.
+
+        A project is never evicted while a request is inside this block.
+
+        Raises:
+            ValueError: If the project ID contains characters other than letters, digits, '-' or '_'.
+        """
+        if not project_id or not PROJECT_ID_PATTERN.match(project_id):
+            raise ValueError("Project ID must be 1-64 letters, digits, '-' or '_'.")
+
+        project = self._acquire(project_id)
+        try:
+            yield project
+        finally:
+            self._release(project)
+
+    def _acquire(self, project_id):
+        while True:
+            with self._lock:
+                project = self._projects.get(project_id)
+                if project is not None:
+                    project.active_requests += 1
+                    project.last_access = time.monotonic()
+                    evicted = self._evict_idle() + self._evict_over_capacity()
+                    break
+                pending = self._pending.get(project_id)
+                if pending is None:
+                    pending = self._pending[project_id] = threading.Event()
+                    break
+            pending.wait()
+
+        if project is None:
+            try:
+                project = Project(
+                    project_id,
+                    os.path.join(self.base_dir, project_id),
+                    self.dimension,
+                    index_type=self.index_type,
+                    index_options=self.index_options,
+                    train_threshold=self.train_threshold
+                )
+            finally:
+                with self._lock:
+                    del self._pending[project_id]
+                    if project is not None:
+                        project.active_requests = 1
+                        self._projects[project_id] = project
+                        evicted = self._evict_idle() + self._evict_over_capacity()
+                pending.set()
+
+        try:
+            self._close_evicted(evicted)
+        except BaseException:
+            # The caller never gets the project, so give back the slot taken above
+            self._release(project)
+            raise
+        return project
+
+    def _release(self, project):
+        with self._lock:
+            project.active_requests -= 1
+            project.last_access = time.monotonic()
+
+    def _detach(self, project):
+        # Called with the lock held; requests for the project wait until it is closed
+        del self._projects[project.project_id]
+        self._pending[project.project_id] = threading.Event()
+        return project
+
+    def _close_evicted(self, projects):
+        error = None
+        for project in projects:
+            try:
+                project.close()
+            except Exception as exc:
+                error = error or exc
+            finally:
+                with self._lock:
+                    self._pending.pop(project.project_id).set()
+        if error is not None:
+            raise error
+
+    def _evict_over_capacity(self):
+        idle = sorted(
+            (project for project in self._projects.values() if project.active_requests == 0),
+            key=lambda project: project.last_access
+        )
+        evicted = []
+        while len(self._projects) > self.max_projects and idle:
+            evicted.append(self._detach(idle.pop(0)))
+        return evicted
+
+    def _evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        return [
+            self._detach(project) for project in list(self._projects.values())
+            if project.active_requests == 0 and project.last_access < cutoff
+        ]
+
+    def _reap(self, interval):
+        while not self._closed.wait(interval):
+            try:
+                self.evict_idle()
+            except Exception as exc:
+                print(f"Error evicting idle projects: {exc}")
+
+    def evict_idle(self):
+        """Checkpoints and drops every project inactive for longer than `idle_timeout`."""
+        with self._lock:
+            evicted = self._evict_idle()
+        self._close_evicted(evicted)
+
+    def close(self):
+        """Stops the idle-eviction thread and checkpoints every loaded project (e.g., at shutdown)."""
+        self._closed.set()
+        if self._reaper is not None and self._reaper is not threading.current_thread():
+            self._reaper.join()
+        with self._lock:
+            projects = [self._detach(project) for project in list(self._projects.values())]
+        self._close_evicted(projects)
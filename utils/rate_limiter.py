@@ -0,0 +1,436 @@
+import asyncio
+import collections
+import re
+import threading
+import time
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; token counts fall back to a character estimate
+    tiktoken = None
+
+EXPECTED_OUTPUT_TOKENS = 512   # Completion tokens reserved per request before the real usage is known
+MESSAGE_OVERHEAD_TOKENS = 4    # Role/formatting tokens OpenAI adds per chat message
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_SECONDS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+
+def estimate_tokens(messages, model="gpt-4", expected_output_tokens=EXPECTED_OUTPUT_TOKENS):
+    """
+    Estimates the tokens a chat request will count against a tokens-per-minute limit.
+
+    Prompt tokens are counted with tiktoken when it is installed (about 4 characters per
+    token otherwise), and `expected_output_tokens` are reserved for the completion. The
+    estimate is corrected with the response's reported usage afterwards (see
+    `RateLimiter.reconcile`).
+
+    Args:
+        messages (list): Chat messages.
+        model (str): Model the request is for (default: "gpt-4").
+        expected_output_tokens (int): Completion tokens to reserve (default: EXPECTED_OUTPUT_TOKENS).
+
+    Returns:
+        int: Estimated total tokens.
+    """
+    encoding = None
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+
+    total = expected_output_tokens
+    for message in messages:
+        content = message.get("content") or ""
+        if not isinstance(content, str):
+            content = str(content)
+        total += MESSAGE_OVERHEAD_TOKENS
+        total += len(encoding.encode(content)) if encoding is not None else len(content) // 4 + 1
+    return total
+
+
+def parse_duration(value):
+    """
+    Parses a rate limit reset duration (e.g., "1s", "6m0s", "20ms", "1h2m3.5s") or plain seconds.
+
+    Returns:
+        float: Seconds, or None if the value is missing or malformed.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_PART.findall(value)
+    if not parts or "".join(number + unit for number, unit in parts) != value:
+        return None
+    return sum(float(number) * _DURATION_SECONDS[unit] for number, unit in parts)
+
+
+def retry_after_seconds(headers):
+    """
+    Returns how long the server asked callers to wait, from `retry-after-ms`, `retry-after`
+    or the `x-ratelimit-reset-*` headers, or None if no wait was requested.
+    """
+    if not headers:
+        return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms is not None:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+    retry_after = parse_duration(headers.get("retry-after"))
+    if retry_after is not None:
+        return retry_after
+    resets = [
+        parse_duration(headers.get(name))
+        for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+    ]
+    resets = [reset for reset in resets if reset is not None]
+    return max(resets) if resets else None
+
+
+class _Bucket:
+    """Token bucket refilled continuously at `limit` units per minute (unlimited if `limit` is None)."""
+
+    def __init__(self, limit=None):
+        self.limit = None
+        self.level = 0.0
+        self.updated = time.monotonic()
+        self.set_limit(limit)
+
+    def set_limit(self, limit):
+        self.refill(time.monotonic())
+        if limit is not None and limit != self.limit:
+            # Start a newly limited bucket full; rescale an existing one's level
+            self.level = float(limit) if self.limit is None else min(self.level, float(limit))
+        self.limit = limit
+
+    def refill(self, now):
+        if self.limit is not None:
+            self.level = min(float(self.limit), self.level + (now - self.updated) * self.limit / 60.0)
+        self.updated = now
+
+    def wait_time(self, amount):
+        """Seconds until `amount` units are available (requests larger than the bucket wait for a full bucket)."""
+        if self.limit is None:
+            return 0.0
+        amount = min(amount, self.limit)
+        missing = amount - self.level
+        return 0.0 if missing <= 0 else missing * 60.0 / self.limit
+
+    def consume(self, amount):
+        if self.limit is not None:
+            self.level -= amount
+
+
+class _ThreadWaiter:
+    """A blocked thread in a wait queue, woken through its own condition on the queue's lock."""
+
+    def __init__(self, lock):
+        self._condition = threading.Condition(lock)
+        self.granted = False  # Set when a FairSemaphore hands this waiter a permit
+
+    def wait(self, timeout=None):
+        self._condition.wait(timeout)
+
+    def wake(self):
+        self._condition.notify()
+        return True
+
+
+class _TaskWaiter:
+    """A waiting coroutine in a wait queue, woken from any thread through its event loop."""
+
+    def __init__(self):
+        self._loop = asyncio.get_running_loop()
+        self._event = asyncio.Event()
+        self.granted = False  # Set when a FairSemaphore hands this waiter a permit
+
+    def clear(self):
+        self._event.clear()
+
+    async def wait(self, timeout=None):
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def wake(self):
+        """Returns False if the waiter's event loop has already closed."""
+        try:
+            self._loop.call_soon_threadsafe(self._event.set)
+        except RuntimeError:
+            return False
+        return True
+
+
+class FairSemaphore:
+    """
+    Bounded semaphore shared by threads and coroutines, granted in FIFO order.
+
+    A released permit is handed directly to the longest waiting caller, sync or async,
+    which is the only one woken. `acquire` blocks the calling thread; `aacquire` waits on
+    the event loop. Both `with` and `async with` take and release one permit.
+    """
+
+    def __init__(self, value=1):
+        """
+        Initializes the semaphore.
+
+        Args:
+            value (int): Number of permits (default: 1).
+        """
+        if value < 1:
+            raise ValueError("value must be at least 1.")
+        self._lock = threading.Lock()
+        self._queue = collections.deque()
+        self._value = value
+        self._max_value = value
+
+    def acquire(self):
+        """Blocks until a permit is available."""
+        with self._lock:
+            if self._value > 0 and not self._queue:
+                self._value -= 1
+                return True
+            waiter = _ThreadWaiter(self._lock)
+            self._queue.append(waiter)
+            try:
+                while not waiter.granted:
+                    waiter.wait()
+            except BaseException:
+                self._abandon(waiter)
+                raise
+            return True
+
+    async def aacquire(self):
+        """Async version of `acquire`: waits on the event loop for a permit."""
+        with self._lock:
+            if self._value > 0 and not self._queue:
+                self._value -= 1
+                return True
+            waiter = _TaskWaiter()
+            self._queue.append(waiter)
+        try:
+            while True:
+                with self._lock:
+                    if waiter.granted:
+                        return True
+                await waiter.wait()
+        except BaseException:
+            with self._lock:
+                self._abandon(waiter)
+            raise
+
+    def _abandon(self, waiter):
+        # Called with the lock held when a waiter gives up (e.g., is cancelled)
+        if waiter.granted:
+            self._release()
+        else:
+            self._queue.remove(waiter)
+
+    def release(self):
+        """Hands a permit to the next waiter, or returns it to the semaphore."""
+        with self._lock:
+            self._release()
+
+    def _release(self):
+        while self._queue:
+            waiter = self._queue.popleft()
+            waiter.granted = True
+            if waiter.wake():
+                return
+        if self._value >= self._max_value:
+            raise ValueError("Semaphore released too many times.")
+        self._value += 1
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    async def __aenter__(self):
+        await self.aacquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute token buckets with a FIFO wait queue.
+
+    Every call reserves one request and its estimated tokens before it is sent. Callers are
+    served strictly in arrival order, so a large request near the quota is not starved by a
+    stream of small ones, and waiting callers are released at the bucket's refill rate
+    instead of all retrying at once. The buckets follow the server: `x-ratelimit-*` headers
+    set the limits and lower the buckets to the remaining quota, and `Retry-After` pauses
+    every caller until the server's reset time.
+
+    Only the caller at the head of the queue is woken when capacity may have changed, and
+    it wakes the next caller when it leaves, so neither threads nor coroutines poll.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        """
+        Initializes the limiter.
+
+        Args:
+            requests_per_minute (int, optional): Request quota; learned from response headers if None.
+            tokens_per_minute (int, optional): Token quota; learned from response headers if None.
+        """
+        self._lock = threading.Lock()
+        self._queue = collections.deque()
+        self._requests = _Bucket(requests_per_minute)
+        self._tokens = _Bucket(tokens_per_minute)
+        self._paused_until = 0.0
+
+    @property
+    def requests_per_minute(self):
+        return self._requests.limit
+
+    @property
+    def tokens_per_minute(self):
+        return self._tokens.limit
+
+    def _wait_time(self, tokens, now):
+        self._requests.refill(now)
+        self._tokens.refill(now)
+        return max(self._paused_until - now, self._requests.wait_time(1), self._tokens.wait_time(tokens))
+
+    def acquire(self, tokens=0, timeout=None):
+        """
+        Blocks until this caller is first in line and one request plus `tokens` tokens are available.
+
+        Args:
+            tokens (int): Estimated tokens for the request (default: 0).
+            timeout (float, optional): Maximum seconds to wait.
+
+        Returns:
+            float: Seconds spent waiting.
+
+        Raises:
+            TimeoutError: If the capacity was not available within `timeout`.
+        """
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        waiter = _ThreadWaiter(self._lock)
+
+        with self._lock:
+            self._queue.append(waiter)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_time(tokens, now) if self._queue[0] is waiter else None
+                    if wait is not None and wait <= 0:
+                        self._requests.consume(1)
+                        self._tokens.consume(tokens)
+                        return now - start
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            raise TimeoutError("Timed out waiting for LLM rate limit capacity.")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    waiter.wait(wait)
+            finally:
+                self._leave(waiter)
+
+    async def aacquire(self, tokens=0, timeout=None):
+        """
+        Async version of `acquire`.
+
+        Waits on the event loop instead of blocking a thread: the caller takes its place in
+        the same FIFO queue and sleeps until it is woken or its bucket wait elapses, so sync
+        and async callers share one quota and one arrival order.
+        """
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        waiter = _TaskWaiter()
+
+        with self._lock:
+            self._queue.append(waiter)
+        try:
+            while True:
+                with self._lock:
+                    waiter.clear()
+                    now = time.monotonic()
+                    wait = self._wait_time(tokens, now) if self._queue[0] is waiter else None
+                    if wait is not None and wait <= 0:
+                        self._requests.consume(1)
+                        self._tokens.consume(tokens)
+                        return now - start
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        raise TimeoutError("Timed out waiting for LLM rate limit capacity.")
+                    wait = remaining if wait is None else min(wait, remaining)
+                await waiter.wait(wait)
+        finally:
+            with self._lock:
+                self._leave(waiter)
+
+    def _leave(self, waiter):
+        # Called with the lock held; the next caller in line rechecks the buckets
+        self._queue.remove(waiter)
+        self._wake_head()
+
+    def _wake_head(self):
+        if self._queue:
+            self._queue[0].wake()
+
+    def reconcile(self, estimated_tokens, actual_tokens):
+        """Corrects the token bucket once a response reports its real usage."""
+        if actual_tokens is None:
+            return
+        with self._lock:
+            self._tokens.refill(time.monotonic())
+            self._tokens.level += estimated_tokens - actual_tokens
+            if self._tokens.limit is not None:
+                self._tokens.level = min(self._tokens.level, float(self._tokens.limit))
+            self._wake_head()
+
+    def pause(self, seconds):
+        """Holds back every caller for `seconds` (e.g., after a 429 with Retry-After)."""
+        if seconds is None or seconds <= 0:
+            return
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._wake_head()
+
+    def update_from_headers(self, headers):
+        """
+        Syncs the buckets with OpenAI's `x-ratelimit-*` response headers.
+
+        `x-ratelimit-limit-*` sets each quota, and `x-ratelimit-remaining-*` lowers the local
+        bucket when the server reports less capacity than expected (e.g., because other
+        processes share the API key).
+        """
+        if not headers:
+            return
+        with self._lock:
+            now = time.monotonic()
+            for bucket, kind in ((self._requests, "requests"), (self._tokens, "tokens")):
+                limit = _header_number(headers, f"x-ratelimit-limit-{kind}")
+                if limit:
+                    bucket.set_limit(limit)
+                remaining = _header_number(headers, f"x-ratelimit-remaining-{kind}")
+                if remaining is not None and bucket.limit is not None:
+                    bucket.refill(now)
+                    bucket.level = min(bucket.level, float(remaining))
+            self._wake_head()
+
+
+def _header_number(headers, name):
+    value = headers.get(name)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
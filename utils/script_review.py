@@ -1,5 +1,27 @@
 
-import time
+from llm_gateway import achat_completion, chat_completion
+
+def _outline_review_prompt(sitcom_pitch, outline_text):
+    return f"""
+You are a veteran sitcom script editor.
+
+Below is a sitcom concept and a 20-scene outline for the pilot episode. Your task is to determine whether the outline is coherent — meaning it fits the premise, has consistent tone, logical character/plot progression, and could realistically work as the structure of an episode.
+
+Return your answer in the following format:
+
+Coherence: [Yes/No]
+
+Reasoning:
+- [List 2–4 bullet points explaining your decision]
+- If the answer is "No", include suggestions for improving coherence.
+
+Sitcom Pitch:
+{sitcom_pitch}
+
+Episode Outline:
+{outline_text}
+"""
+
 
 def validate_episode_outline(client, sitcom_pitch, outline_text, model="gpt-4", temperature=0.5, top_p=1.0):
     """
@@ -27,42 +49,27 @@ def validate_episode_outline(client, sitcom_pitch, outline_text, model="gpt-4",
         ValueError: If the API response is empty or malformed.
         Exception: If the API fails after 3 attempts or another runtime error occurs.
     """
-    prompt = f"""
-You are a veteran sitcom script editor.
-
-Below is a sitcom concept and a 20-scene outline for the pilot episode. Your task is to determine whether the outline is coherent — meaning it fits the premise, has consistent tone, logical character/plot progression, and could realistically work as the structure of an episode.
-
-Return your answer in the following format:
+    prompt = _outline_review_prompt(sitcom_pitch, outline_text)
 
-Coherence: [Yes/No]
+    return chat_completion(
+        client,
+        prompt,
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message="Error validating episode outline"
+    )
 
-Reasoning:
-- [List 2–4 bullet points explaining your decision]
-- If the answer is "No", include suggestions for improving coherence.
 
-Sitcom Pitch:
-{sitcom_pitch}
-
-Episode Outline:
-{outline_text}
-"""
-
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            response = client.chat.completions.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=temperature,
-                top_p=top_p,
-            )
-
-            if not response or not response.choices or not response.choices[0].message.content:
-                raise ValueError("Received an empty or malformed response from the API.")
-
-            return response.choices[0].message.content.strip()
-
-        except Exception as e:
-            if attempt == max_retries - 1:
-                raise Exception(f"Error validating episode outline: {str(e)}")
-            time.sleep(2 ** attempt)
+async def avalidate_episode_outline(client, sitcom_pitch, outline_text, model="gpt-4", temperature=0.5, top_p=1.0):
+    """
+    Async version of `validate_episode_outline` (see `achat_completion` for client handling).
+    """
+    return await achat_completion(
+        client,
+        _outline_review_prompt(sitcom_pitch, outline_text),
+        model=model,
+        temperature=temperature,
+        top_p=top_p,
+        error_message="Error validating episode outline"
+    )
@@ -14,6 +14,11 @@ def extract_scene(outline_text, scene_number):
     return match.group(1).strip() if match else None
 
 
+def get_scene_numbers(outline_text):
+    """Returns the scene numbers found in an outline ('Scene <number>:' headers), in ascending order."""
+    return sorted({int(number) for number in re.findall(r"^\s*Scene (\d+):", outline_text, re.MULTILINE)})
+
+
 def extract_title(text):
     """Extracts the sitcom title from a string that starts with 'Title: "Your Title"'."""
     for line in text.splitlines():
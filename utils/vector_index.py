@@ -0,0 +1,210 @@
+import time
+
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+# IVF-PQ needs ~39 training points per centroid; 8-bit PQ codebooks have 256 centroids
+PQ_CENTROIDS = 256
+DEFAULT_TRAIN_THRESHOLD = 39 * PQ_CENTROIDS
+
+
+def _default_pq_m(dimension):
+    """Picks the number of PQ sub-quantizers: about 8 dimensions each, and a divisor of `dimension`."""
+    for m in range(max(1, dimension // 8), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def create_index(dimension, index_type="flat", hnsw_m=32, ef_construction=80, ef_search=64,
+                 nlist=None, pq_m=None, nprobe=16, training_vectors=None):
+    """
+    Creates a FAISS index for scene embeddings.
+
+    - "flat": exact brute-force L2 search (`IndexFlatL2`); best for up to a few thousand scenes.
+    - "hnsw": graph-based approximate search (`IndexHNSWFlat`); no training, fast queries, but
+      stores full vectors plus graph links.
+    - "ivfpq": inverted file with product quantization; needs training, and stores `pq_m` bytes
+      per vector instead of 4 * dimension (48 vs 1536 bytes for all-MiniLM-L6-v2).
+
+    Args:
+        dimension (int): Embedding dimension.
+        index_type (str): One of INDEX_TYPES (default: "flat").
+        hnsw_m (int): HNSW neighbours per node (default: 32).
+        ef_construction (int): HNSW build-time search depth (default: 80).
+        ef_search (int): HNSW query-time search depth (default: 64).
+        nlist (int): Number of IVF lists (default: about 4 * sqrt(number of training vectors)).
+        pq_m (int): Number of PQ sub-quantizers; must divide `dimension` (default: dimension / 8).
+        nprobe (int): IVF lists visited per query (default: 16).
+        training_vectors: 2-D float32 array used to train an "ivfpq" index (required for it).
+
+    Returns:
+        A FAISS index, trained if the index type requires it.
+
+    Raises:
+        ValueError: If the index type is unknown, or "ivfpq" is requested without training vectors.
+    """
+    if index_type == "flat":
+        return faiss.IndexFlatL2(dimension)
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, hnsw_m)
+        index.hnsw.efConstruction = ef_construction
+        index.hnsw.efSearch = ef_search
+        return index
+
+    if index_type == "ivfpq":
+        if training_vectors is None or len(training_vectors) == 0:
+            raise ValueError("An 'ivfpq' index needs training vectors.")
+        training_vectors = np.ascontiguousarray(training_vectors, dtype="float32")
+        nlist = nlist or max(1, min(int(4 * np.sqrt(len(training_vectors))), len(training_vectors) // 39))
+        pq_m = pq_m or _default_pq_m(dimension)
+        index = faiss.index_factory(dimension, f"IVF{nlist},PQ{pq_m}")
+        index.train(training_vectors)
+        index.nprobe = min(nprobe, nlist)
+        return index
+
+    raise ValueError(f"Unknown index type: {index_type}. Expected one of {INDEX_TYPES}.")
+
+
+def create_id_index(dimension, index_type="flat", training_vectors=None, **index_options):
+    """
+    Creates an index whose labels are caller-chosen int64 IDs (`add_with_ids` / `remove_ids`).
+
+    IVF indexes store IDs natively; flat and HNSW indexes are wrapped in `IndexIDMap2`.
+    Arguments are the same as for `create_index`.
+    """
+    index = create_index(dimension, index_type, training_vectors=training_vectors, **index_options)
+    if faiss.try_extract_index_ivf(index) is not None:
+        return index
+    return faiss.IndexIDMap2(index)
+
+
+def _base_index(index):
+    return faiss.downcast_index(index.index) if isinstance(index, faiss.IndexIDMap) else index
+
+
+def id_map_vectors(index):
+    """Returns (ids, vectors) for every vector in an `IndexIDMap` index."""
+    ids = faiss.vector_to_array(index.id_map).astype("int64")
+    vectors = _base_index(index).reconstruct_n(0, index.ntotal)
+    return ids, vectors
+
+
+def remove_from_index(index, ids, index_type="flat", **index_options):
+    """
+    Removes vectors by ID and returns the index to use afterwards.
+
+    Flat and IVF indexes support removal directly. HNSW graphs do not, so the index is rebuilt
+    without the removed vectors; that costs a full rebuild, but it only happens when a scene is
+    regenerated or deleted.
+    """
+    ids = np.asarray(ids, dtype="int64")
+    try:
+        index.remove_ids(ids)
+        return index
+    except RuntimeError:
+        all_ids, vectors = id_map_vectors(index)
+        keep = ~np.isin(all_ids, ids)
+        rebuilt = create_id_index(index.d, index_type, **index_options)
+        rebuilt.add_with_ids(vectors[keep], all_ids[keep])
+        return rebuilt
+
+
+def needs_upgrade(index, index_type, train_threshold=DEFAULT_TRAIN_THRESHOLD):
+    """
+    Returns True when a flat staging index should be rebuilt as the configured index type.
+
+    "hnsw" indexes are created directly, but "ivfpq" cannot be trained until enough vectors
+    exist, so stores start with a flat index and switch once `train_threshold` is reached.
+    """
+    return (
+        index_type == "ivfpq"
+        and isinstance(_base_index(index), faiss.IndexFlat)
+        and index.ntotal >= max(train_threshold, PQ_CENTROIDS)
+    )
+
+
+def upgrade_index(index, index_type, **index_options):
+    """
+    Rebuilds a flat `IndexIDMap` index as `index_type`, training on (and re-adding) all of its vectors.
+
+    Every vector keeps its ID, so metadata keyed by the same IDs stays valid.
+    """
+    ids, vectors = id_map_vectors(index)
+    upgraded = create_id_index(index.d, index_type, training_vectors=vectors, **index_options)
+    upgraded.add_with_ids(vectors, ids)
+    return upgraded
+
+
+def benchmark_indexes(dimension=384, num_vectors=20000, num_queries=200, k=5, index_types=INDEX_TYPES,
+                      vectors=None, queries=None, seed=0, **index_options):
+    """
+    Measures recall@k against exact search, query latency and memory per vector for each index type.
+
+    Args:
+        dimension (int): Embedding dimension for synthetic data (default: 384).
+        num_vectors (int): Number of synthetic database vectors (default: 20000).
+        num_queries (int): Number of synthetic queries (default: 200).
+        k (int): Neighbours per query (default: 5).
+        index_types (tuple): Index types to compare (default: all).
+        vectors: Real embeddings to use instead of synthetic data (optional).
+        queries: Real query embeddings to use instead of synthetic data (optional).
+        seed (int): Random seed for synthetic data (default: 0).
+        **index_options: Extra arguments for `create_index` (e.g., nprobe, ef_search).
+
+    Returns:
+        List[dict]: One row per index type with 'index_type', 'recall_at_k', 'avg_query_ms',
+        'build_seconds' and 'bytes_per_vector'.
+    """
+    rng = np.random.default_rng(seed)
+    if vectors is None:
+        # Clustered, normalized vectors behave more like sentence embeddings than uniform noise
+        centers = rng.normal(size=(max(1, num_vectors // 100), dimension))
+        vectors = centers[rng.integers(len(centers), size=num_vectors)] + 0.3 * rng.normal(size=(num_vectors, dimension))
+    if queries is None:
+        queries = vectors[rng.integers(len(vectors), size=num_queries)] + 0.1 * rng.normal(size=(num_queries, vectors.shape[1]))
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    queries = np.ascontiguousarray(queries, dtype="float32")
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    exact = faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    rows = []
+    for index_type in index_types:
+        start = time.perf_counter()
+        index = create_index(vectors.shape[1], index_type, training_vectors=vectors, **index_options)
+        index.add(vectors)
+        build_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for query in queries:
+            index.search(query.reshape(1, -1), k)  # One query at a time, like the agents
+        avg_query_ms = 1000 * (time.perf_counter() - start) / len(queries)
+
+        _, found = index.search(queries, k)
+        hits = sum(len(set(found[row]) & set(truth[row])) for row in range(len(queries)))
+        rows.append({
+            "index_type": index_type,
+            "recall_at_k": hits / (k * len(queries)),
+            "avg_query_ms": avg_query_ms,
+            "build_seconds": build_seconds,
+            "bytes_per_vector": len(faiss.serialize_index(index)) / len(vectors)
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    # Recall-vs-latency benchmark: python vector_index.py [num_vectors]
+    import sys
+
+    num_vectors = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"{'index':<8}{'recall@5':>10}{'query ms':>10}{'build s':>10}{'bytes/vec':>11}")
+    for row in benchmark_indexes(num_vectors=num_vectors):
+        print(f"{row['index_type']:<8}{row['recall_at_k']:>10.3f}{row['avg_query_ms']:>10.3f}"
+              f"{row['build_seconds']:>10.2f}{row['bytes_per_vector']:>11.1f}")